@@ -0,0 +1,131 @@
+"""
+Compares the pooled HTTP/1.1 transport with the multiplexed HTTP/2 transport of `RawKeboolaClient`.
+
+The benchmark starts two local stub servers, one speaking HTTP/1.1 with keep-alive and one speaking HTTP/2
+with prior knowledge (h2c), both answering every request with a small JSON body after a simulated service
+latency. Then it fires batches of concurrent GET requests through `RawKeboolaClient` backed by `HttpClientPool`
+and reports the wall-clock time and the number of TCP connections the server had to accept.
+
+Usage:
+    pip install 'keboola-mcp-server[http2]'
+    python benchmarks/bench_http2.py [--concurrency 50] [--rounds 20] [--latency-ms 20]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+
+from keboola_mcp_server.client import HttpClientPool, RawKeboolaClient
+
+_BODY = json.dumps({'id': 'in.c-bench.table', 'name': 'table', 'columns': ['id', 'name', 'value']}).encode('utf-8')
+
+
+class _StubStats:
+    def __init__(self) -> None:
+        self.connections = 0
+        self.requests = 0
+
+
+async def _serve_http1(stats: _StubStats, latency: float) -> asyncio.Server:
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        stats.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                if not head:
+                    break
+                stats.requests += 1
+                await asyncio.sleep(latency)
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    + f'Content-Length: {len(_BODY)}\r\n\r\n'.encode('ascii')
+                    + _BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, '127.0.0.1', 0)
+
+
+async def _serve_http2(stats: _StubStats, latency: float) -> asyncio.Server:
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        stats.connections += 1
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+
+        async def respond(stream_id: int) -> None:
+            await asyncio.sleep(latency)
+            conn.send_headers(
+                stream_id,
+                [(':status', '200'), ('content-type', 'application/json'), ('content-length', str(len(_BODY)))],
+            )
+            conn.send_data(stream_id, _BODY, end_stream=True)
+            writer.write(conn.data_to_send())
+
+        try:
+            while data := await reader.read(65536):
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        stats.requests += 1
+                        asyncio.create_task(respond(event.stream_id))
+                writer.write(conn.data_to_send())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, '127.0.0.1', 0)
+
+
+async def _run(name: str, server: asyncio.Server, stats: _StubStats, pool: HttpClientPool, args) -> None:
+    port = server.sockets[0].getsockname()[1]
+    client = RawKeboolaClient(f'http://127.0.0.1:{port}/v2/storage', 'bench-token', http_pool=pool)
+    durations: list[float] = []
+    try:
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            await asyncio.gather(*(client.get(f'tables/in.c-bench.table-{i}') for i in range(args.concurrency)))
+            durations.append(time.perf_counter() - start)
+    finally:
+        await pool.aclose()
+        server.close()
+
+    print(
+        f'{name:<16} rounds={args.rounds} concurrency={args.concurrency} '
+        f'median={statistics.median(durations) * 1000:.1f}ms '
+        f'p95={sorted(durations)[int(len(durations) * 0.95) - 1] * 1000:.1f}ms '
+        f'requests={stats.requests} connections={stats.connections}'
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=50, help='Number of concurrent requests per round.')
+    parser.add_argument('--rounds', type=int, default=20, help='Number of rounds.')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated service latency.')
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    stats = _StubStats()
+    await _run('HTTP/1.1 pooled', await _serve_http1(stats, latency), stats, HttpClientPool(), args)
+
+    stats = _StubStats()
+    # the stub server does not use TLS, so HTTP/2 is used with the prior knowledge instead of ALPN negotiation
+    pool = HttpClientPool(transport=httpx.AsyncHTTPTransport(http1=False, http2=True), http2=True)
+    await _run('HTTP/2', await _serve_http2(stats, latency), stats, pool, args)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+Compares the JSON codec of `RawKeboolaClient` backed by orjson with the standard library fallback.
+
+The benchmark decodes and encodes payloads shaped like the responses of the Storage API `components` listing
+with `include=configuration,rows` and of the Jobs Queue API `search/jobs` endpoint. The payloads are generated
+with the given number of items, so their size can be scaled to the size of the real projects.
+
+Usage:
+    pip install 'keboola-mcp-server[fastjson]'
+    python benchmarks/bench_json_codec.py [--components 40] [--configurations 25] [--jobs 500] [--rounds 20]
+"""
+
+import argparse
+import contextlib
+import statistics
+import time
+from typing import Any, Callable
+from unittest import mock
+
+from keboola_mcp_server.client import decode_json, encode_json
+
+
+def _component_list(components: int, configurations: int) -> list[dict[str, Any]]:
+    return [
+        {
+            'id': f'keboola.ex-component-{c}',
+            'type': 'extractor',
+            'name': f'Component {c}',
+            'description': 'Extracts the data from the source system. ' * 5,
+            'flags': ['genericDockerUI', 'genericDockerUI-authorization'],
+            'configurations': [
+                {
+                    'id': str(10_000_000 + c * 1000 + i),
+                    'name': f'Configuration {i} of the component {c}',
+                    'description': 'Loads the tables of the main database.',
+                    'created': '2025-01-15T10:25:03+0100',
+                    'version': i,
+                    'isDisabled': False,
+                    'configuration': {
+                        'parameters': {
+                            'db': {'host': 'db.example.com', 'port': 5432, '#password': 'KBC::ProjectSecure::xyz'},
+                            'tables': [
+                                {'name': f'table_{t}', 'incremental': t % 2 == 0, 'primaryKey': ['id']}
+                                for t in range(10)
+                            ],
+                        },
+                        'storage': {'output': {'tables': [{'destination': f'in.c-db.table_{t}'} for t in range(10)]}},
+                    },
+                    'rows': [
+                        {'id': str(r), 'name': f'Row {r}', 'configuration': {'parameters': {'query': 'SELECT 1'}}}
+                        for r in range(3)
+                    ],
+                }
+                for i in range(configurations)
+            ],
+        }
+        for c in range(components)
+    ]
+
+
+def _job_list(jobs: int) -> list[dict[str, Any]]:
+    return [
+        {
+            'id': str(1_000_000_000 + j),
+            'runId': str(1_000_000_000 + j),
+            'component': 'keboola.snowflake-transformation',
+            'config': str(12345 + j % 50),
+            'mode': 'run',
+            'type': 'standard',
+            'status': 'success' if j % 7 else 'error',
+            'desiredStatus': 'processing',
+            'createdTime': '2025-06-01T08:00:00+00:00',
+            'startTime': '2025-06-01T08:00:05+00:00',
+            'endTime': '2025-06-01T08:03:42+00:00',
+            'durationSeconds': 217,
+            'result': {'message': 'Transformation finished successfully.', 'output': {'tables': []}},
+            'metrics': {'storage': {'inputTablesBytesSum': 123456789}, 'backend': {'size': 'small'}},
+            'tags': [],
+        }
+        for j in range(jobs)
+    ]
+
+
+def _measure(func: Callable[[], Any], rounds: int) -> float:
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def _run(name: str, payload: Any, rounds: int) -> None:
+    content = encode_json(payload)
+    results = {}
+    for codec in ('orjson', 'stdlib'):
+        with mock.patch('keboola_mcp_server.client.orjson', None) if codec == 'stdlib' else contextlib.nullcontext():
+            results[codec] = (
+                _measure(lambda: decode_json(content), rounds),
+                _measure(lambda: encode_json(payload), rounds),
+            )
+
+    print(
+        f'{name:<16} size={len(content) / 1024 / 1024:.2f}MB '
+        + ' '.join(f'{codec}: decode={dec:.2f}ms encode={enc:.2f}ms' for codec, (dec, enc) in results.items())
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--components', type=int, default=40, help='Number of components in the listing.')
+    parser.add_argument('--configurations', type=int, default=25, help='Number of configurations per component.')
+    parser.add_argument('--jobs', type=int, default=500, help='Number of jobs in the search result.')
+    parser.add_argument('--rounds', type=int, default=20, help='Number of rounds.')
+    args = parser.parse_args()
+
+    _run('component_list', _component_list(args.components, args.configurations), args.rounds)
+    _run('search/jobs', _job_list(args.jobs), args.rounds)
+
+
+if __name__ == '__main__':
+    main()
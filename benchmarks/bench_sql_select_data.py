@@ -0,0 +1,115 @@
+"""
+Compares the row-dictionary representation of SQL SELECT results with the columnar `SqlSelectData`.
+
+The benchmark generates a synthetic workspace query response with the given number of rows and columns, shaped
+like the response of the Storage API `workspaces/{id}/query` endpoint. Then it turns the response into the CSV
+returned by the `query_table` tool, once the way it was done with the rows kept as dictionaries (a `TypeAdapter`
+built per query and `csv.DictWriter`) and once with `SqlSelectData` (a module-level adapter, the rows packed to
+tuples and `csv.writer`). It reports the median time of the conversion, the peak memory allocated during it
+and the memory retained by the validated rows.
+
+Usage:
+    python benchmarks/bench_sql_select_data.py [--rows 100000] [--columns 20] [--rounds 5]
+"""
+
+import argparse
+import csv
+import gc
+import statistics
+import time
+import tracemalloc
+from io import StringIO
+from typing import Any, Callable, Mapping, Sequence
+
+from pydantic import Field, TypeAdapter
+from pydantic.dataclasses import dataclass
+
+from keboola_mcp_server.workspace import _QUERY_RESULT_ADAPTER
+
+
+@dataclass(frozen=True)
+class _DictSelectData:
+    columns: Sequence[str] = Field()
+    rows: Sequence[Mapping[str, Any]] = Field()
+
+
+@dataclass(frozen=True)
+class _DictQueryResult:
+    status: str = Field()
+    data: _DictSelectData | None = Field(None)
+    message: str | None = Field(None)
+
+
+def _response(rows: int, columns: int) -> dict[str, Any]:
+    names = [f'COLUMN_{c}' for c in range(columns)]
+    return {
+        'status': 'ok',
+        'data': {
+            'columns': names,
+            'rows': [
+                {name: (str(r * columns + c) if c % 2 else f'value {r}-{c}') for c, name in enumerate(names)}
+                for r in range(rows)
+            ],
+        },
+    }
+
+
+def _dict_rows(response: dict[str, Any]) -> tuple[Any, str]:
+    result = TypeAdapter(_DictQueryResult).validate_python(response)
+    output = StringIO()
+    writer = csv.DictWriter(output, fieldnames=result.data.columns)
+    writer.writeheader()
+    writer.writerows(result.data.rows)
+    return result, output.getvalue()
+
+
+def _columnar(response: dict[str, Any]) -> tuple[Any, str]:
+    result = _QUERY_RESULT_ADAPTER.validate_python(response)
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(result.data.columns)
+    writer.writerows(result.data.rows)
+    return result, output.getvalue()
+
+
+def _run(name: str, convert: Callable[[dict[str, Any]], tuple[Any, str]], args) -> None:
+    durations = []
+    for _ in range(args.rounds):
+        response = _response(args.rows, args.columns)
+        gc.collect()
+        start = time.perf_counter()
+        convert(response)
+        durations.append(time.perf_counter() - start)
+
+    # the rows of the response are dropped, so only the memory held by the validated result is retained
+    response = _response(args.rows, args.columns)
+    gc.collect()
+    tracemalloc.start()
+    result, csv_data = convert(response)
+    _, peak = tracemalloc.get_traced_memory()
+    del response, csv_data
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f'{name:<10} rows={args.rows} columns={args.columns} '
+        f'median={statistics.median(durations) * 1000:.1f}ms '
+        f'peak={peak / 1024 / 1024:.1f}MB retained={retained / 1024 / 1024:.1f}MB'
+    )
+    assert result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000, help='Number of rows in the result.')
+    parser.add_argument('--columns', type=int, default=20, help='Number of columns in the result.')
+    parser.add_argument('--rounds', type=int, default=5, help='Number of rounds.')
+    args = parser.parse_args()
+
+    _run('dict rows', _dict_rows, args)
+    _run('columnar', _columnar, args)
+
+
+if __name__ == '__main__':
+    main()
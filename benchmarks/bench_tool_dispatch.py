@@ -0,0 +1,95 @@
+"""
+Measures the per-call overhead of the decorators wrapping the MCP tools.
+
+The benchmark calls a no-op tool decorated by `tool_errors` and `with_session_state` the same way the tools
+are decorated and compares it with calling the undecorated function. The session state is already set on the
+context, as it is for all but the first tool call in a session. The `--new-session` option clears the state
+before each call, so that the session state is looked up for each call like in the short-lived sessions
+on the streamable-http transport, whose HTTP headers are read into the configuration.
+
+Usage:
+    python benchmarks/bench_tool_dispatch.py [--calls 100000] [--new-session]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any
+from unittest import mock
+
+from fastmcp import Context
+from starlette.requests import Request
+
+from keboola_mcp_server.config import Config
+from keboola_mcp_server.errors import tool_errors
+from keboola_mcp_server.mcp import ServerState, with_session_state
+
+
+async def noop_tool(ctx: Context, table_id: str, limit: int = 10) -> str:
+    return table_id
+
+
+class _Session:
+    state: dict[str, Any] | None = None
+
+
+def _create_context() -> Context:
+    config = Config(
+        storage_api_url='https://connection.keboola.com', storage_token='token', workspace_schema='WORKSPACE'
+    )
+    ctx = mock.MagicMock(Context)
+    ctx.session = _Session()
+    ctx.request_context.lifespan_context = ServerState(config=config)
+    return ctx
+
+
+def _create_http_request() -> Request:
+    headers = {
+        'host': 'mcp.keboola.com',
+        'accept': 'application/json, text/event-stream',
+        'content-type': 'application/json',
+        'mcp-session-id': '0123456789abcdef',
+        'user-agent': 'python-httpx/0.28.1',
+        'x-storage-token': 'token',
+        'x-workspace-schema': 'WORKSPACE',
+    }
+    return Request({
+        'type': 'http',
+        'method': 'POST',
+        'path': '/mcp',
+        'query_string': b'',
+        'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()],
+    })
+
+
+async def _measure(tool, ctx: Context, calls: int, new_session: bool) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        if new_session:
+            ctx.session.state = None
+        await tool(ctx=ctx, table_id='in.c-foo.bar', limit=i)
+    return (time.perf_counter() - start) / calls * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=100_000, help='Number of tool calls.')
+    parser.add_argument('--new-session', action='store_true', help='Clear the session state before each call.')
+    args = parser.parse_args()
+
+    decorated_tool = tool_errors()(with_session_state()(noop_tool))
+    ctx = _create_context()
+    with mock.patch('keboola_mcp_server.mcp._get_http_request', return_value=_create_http_request()):
+        # warm up
+        await _measure(decorated_tool, ctx, 1000, args.new_session)
+
+        bare = await _measure(noop_tool, ctx, args.calls, False)
+        decorated = await _measure(decorated_tool, ctx, args.calls, args.new_session)
+    print(
+        f'calls={args.calls} new_session={args.new_session} '
+        f'bare={bare:.2f}us decorated={decorated:.2f}us overhead={decorated - bare:.2f}us per call'
+    )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
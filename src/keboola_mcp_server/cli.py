@@ -43,6 +43,22 @@ def parse_args(args: Optional[list[str]] = None) -> argparse.Namespace:
         help='(NOT RECOMMENDED) Read Storage API token and other configuration parameters from the query part '
              'of the MCP server URL. Please note that the URL query parameters are not secure '
              'for sending sensitive information.')
+    parser.add_argument(
+        '--http2', action='store_true',
+        help='Use HTTP/2 for the requests to Keboola services. Concurrent requests to the same service are '
+             "multiplexed over a single connection. Requires the 'http2' extra to be installed.")
+    parser.add_argument(
+        '--workspace-prewarm', action='store_true',
+        help='Look up or create the workspace for SQL queries in the background as soon as the session starts, '
+             'or as soon as the server starts if the Storage API token is given.')
+    parser.add_argument(
+        '--query-output-dir', metavar='PATH',
+        help='The local directory where the SQL query results in the binary formats (Arrow, Parquet) are written to. '
+             "The binary formats require the 'arrow' extra to be installed.")
+    parser.add_argument(
+        '--metrics-endpoint', action='store_true',
+        help='Serve the metrics of the requests to Keboola services at the /metrics HTTP route. The route is not '
+             'authenticated and the metrics include the hashes of the tokens, enable it on internal deployments only.')
     parser.add_argument('--log-config', type=pathlib.Path, metavar='PATH', help='Logging config file.')
 
     return parser.parse_args(args)
@@ -69,6 +85,10 @@ async def run_server(args: Optional[list[str]] = None) -> None:
         storage_token=parsed_args.storage_token,
         workspace_schema=parsed_args.workspace_schema,
         accept_secrets_in_url=parsed_args.accept_secrets_in_url,
+        http2=parsed_args.http2,
+        workspace_prewarm=parsed_args.workspace_prewarm,
+        query_output_dir=parsed_args.query_output_dir,
+        metrics_endpoint=parsed_args.metrics_endpoint,
     )
 
     try:
@@ -1,13 +1,50 @@
 """Keboola Storage API client wrapper."""
 
+import asyncio
+import codecs
+import copy
+import email.utils
+import hashlib
 import importlib.metadata
+import importlib.util
+import json
 import logging
 import os
-from typing import Any, Literal, Mapping, Optional, Union, cast
+import random
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Collection,
+    Iterable,
+    Iterator,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import httpx
 from pydantic import BaseModel, Field
 
+from keboola_mcp_server.metrics import METRICS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 LOG = logging.getLogger(__name__)
 
 JsonPrimitive = Union[int, float, str, bool, None]
@@ -16,9 +53,249 @@ JsonList = list[Union[JsonPrimitive, 'JsonStruct']]
 JsonStruct = Union[JsonDict, JsonList]
 
 ComponentResource = Literal['configuration', 'rows', 'state']
+HedgedRequest = Literal['table_detail', 'configuration_detail', 'job_detail']
+
+T = TypeVar('T')
 
 ORCHESTRATOR_COMPONENT_ID = 'keboola.orchestrator'
 
+DEFAULT_TIMEOUT = httpx.Timeout(connect=5.0, read=60.0, write=10.0, pool=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+
+# the larger response bodies are decoded in a worker thread not to block the event loop
+_THREAD_DECODE_MIN_SIZE = 1024 * 1024
+
+
+def decode_json(content: bytes) -> Any:
+    """
+    Decodes the JSON document, using orjson if it is installed.
+
+    :param content: The UTF-8 encoded JSON document
+    :return: The decoded value
+    """
+    if orjson:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def encode_json(value: Any) -> bytes:
+    """
+    Encodes the value to the compact UTF-8 encoded JSON document, using orjson if it is installed.
+
+    :param value: The value to encode
+    :return: The JSON document
+    """
+    if orjson:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+def row_to_tuple(columns: Sequence[str]) -> Callable[[Any], tuple[Any, ...]]:
+    """
+    Creates the function converting a row of a SQL query result to the tuple of values in the order of the columns.
+
+    The rows can be dictionaries of column: value pairs, the missing columns have None values, or sequences
+    of values.
+    """
+    if len(columns) == 1:
+        getter: Callable[[Any], Any] = itemgetter(columns[0])
+
+        def get_values(row: Any) -> tuple[Any, ...]:
+            return (getter(row),)
+
+    elif columns:
+        # itemgetter of several keys returns the tuple of their values
+        get_values = itemgetter(*columns)
+    else:
+
+        def get_values(row: Any) -> tuple[Any, ...]:
+            return ()
+
+    def convert(row: Any) -> tuple[Any, ...]:
+        if not isinstance(row, Mapping):
+            return tuple(row)
+        try:
+            return get_values(row)
+        except KeyError:
+            return tuple(row.get(col) for col in columns)
+
+    return convert
+
+
+class _QueryResponseParser:
+    """
+    Parses the response of a workspace query incrementally as its chunks arrive.
+
+    The selected rows in `data.rows` are decoded one by one and converted to tuples of values in the order
+    of the columns, so that neither the whole response body nor the dictionaries of all rows are held in memory.
+    The rest of the response is small and it is decoded at the end.
+
+    The rows beyond the limits are not kept. The response gets `data.truncated` set to True if any rows were
+    dropped, and `data.rows_size` set to the size of the JSON of the kept rows.
+    """
+
+    _WHITESPACE = ' \t\n\r'
+
+    def __init__(self, max_rows: int | None = None, max_bytes: int | None = None) -> None:
+        """
+        :param max_rows: The maximum number of the kept rows
+        :param max_bytes: The maximum total size of the JSON of the kept rows, in characters
+        """
+        self._max_rows = max_rows
+        self._max_bytes = max_bytes
+        self._rows_size = 0
+        self._truncated = False
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        # the text of the response except for the rows
+        self._envelope: list[str] = []
+        self._rows: list[Any] = []
+        self._in_rows = False
+        self._after_rows = False
+        self._convert_row: Callable[[Any], tuple[Any, ...]] | None = None
+        # the state of the scanner of the JSON structure before the rows
+        self._stack: list[str | None] = []
+        self._closing_chars: list[str] = []
+        self._top_level_keys: set[str] = set()
+        self._key: str | None = None
+        self._last_string: str | None = None
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._columns_start: int | None = None
+
+    @property
+    def done(self) -> bool:
+        """True if the rest of the response is not needed, because no more rows are kept."""
+        return (
+            self._truncated
+            and self._in_rows
+            # the envelope before the rows is complete
+            and self._convert_row is not None
+            and 'status' in self._top_level_keys
+        )
+
+    def feed(self, chunk: bytes) -> None:
+        self._buffer += self._decoder.decode(chunk)
+        self._parse(final=False)
+
+    def close(self) -> JsonDict:
+        """Parses the rest of the response and returns the response with the rows as tuples."""
+        if self.done:
+            # the rest of the response is not read, the envelope is closed as it was open before the rows
+            self._envelope.append(''.join(reversed(self._closing_chars)))
+        else:
+            self._buffer += self._decoder.decode(b'', final=True)
+            self._parse(final=True)
+            if self._in_rows:
+                raise ValueError('Unexpected end of the workspace query response.')
+            self._envelope.append(self._buffer)
+
+        response = cast(JsonDict, json.loads(''.join(self._envelope)))
+        if self._after_rows or self.done:
+            data = cast(JsonDict, response['data'])
+            if self._convert_row:
+                data['rows'] = self._rows
+            else:
+                # the columns follow the rows in the response
+                convert_row = row_to_tuple(cast(list[str], data.get('columns') or []))
+                data['rows'] = [convert_row(row) for row in self._rows]
+            data['truncated'] = self._truncated
+            data['rows_size'] = self._rows_size
+        return response
+
+    def _parse(self, final: bool) -> None:
+        if not self._in_rows and not self._after_rows:
+            self._scan_envelope()
+        if self._in_rows:
+            self._parse_rows(final)
+
+    def _scan_envelope(self) -> None:
+        """Scans the JSON structure until the rows array starts."""
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            c = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start:i + 1]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ':':
+                self._key = json.loads(self._last_string) if self._last_string else None
+                if len(self._stack) == 1 and self._key is not None:
+                    self._top_level_keys.add(self._key)
+            elif c == ',':
+                self._key = None
+            elif c in '[{':
+                if c == '[' and self._stack == [None, 'data']:
+                    if self._key == 'rows':
+                        self._envelope.append(buffer[:i] + '[]')
+                        self._buffer = buffer[i + 1:]
+                        self._pos = 0
+                        self._in_rows = True
+                        return
+                    if self._key == 'columns':
+                        self._columns_start = i
+                self._stack.append(self._key)
+                self._closing_chars.append(']' if c == '[' else '}')
+                self._key = None
+            elif c in ']}':
+                if self._stack and self._stack[-1] == 'columns' and self._columns_start is not None:
+                    self._convert_row = row_to_tuple(json.loads(buffer[self._columns_start:i + 1]))
+                    self._columns_start = None
+                if self._stack:
+                    self._stack.pop()
+                    self._closing_chars.pop()
+            i += 1
+        self._pos = i
+
+    def _parse_rows(self, final: bool) -> None:
+        buffer = self._buffer
+        pos = 0
+        while True:
+            while pos < len(buffer) and (buffer[pos] in self._WHITESPACE or buffer[pos] == ','):
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                # the rest of the response is kept as a part of the envelope
+                self._in_rows = False
+                self._after_rows = True
+                pos += 1
+                break
+            try:
+                row, pos_end = self._json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                # the row is not complete yet
+                break
+            row_size = pos_end - pos
+            if not self._truncated and (
+                (self._max_rows is not None and len(self._rows) >= self._max_rows)
+                or (self._max_bytes is not None and self._rows_size + row_size > self._max_bytes)
+            ):
+                self._truncated = True
+            if not self._truncated:
+                self._rows.append(self._convert_row(row) if self._convert_row else row)
+                self._rows_size += row_size
+            pos = pos_end
+            if self.done:
+                break
+        self._buffer = buffer[pos:]
+        if self._after_rows:
+            # the envelope after the rows is not scanned any more
+            self._pos = len(self._buffer)
+
 
 class KeboolaClient:
     """Class holding clients for Keboola APIs: Storage API, Job Queue API, and AI Service."""
@@ -40,7 +317,10 @@ class KeboolaClient:
         self,
         storage_api_token: str,
         storage_api_url: str,
-        bearer_token: str | None = None
+        bearer_token: str | None = None,
+        http_pool: 'HttpClientPool | None' = None,
+        storage_cache_ttl: float | None = None,
+        hedged_requests: Collection[HedgedRequest] = (),
     ) -> None:
         """
         Initialize the client.
@@ -48,6 +328,10 @@ class KeboolaClient:
         :param storage_api_token: Keboola Storage API token
         :param storage_api_url: Keboola Storage API URL
         :param bearer_token: The access token issued by Keboola OAuth server
+        :param http_pool: The pool of long-lived HTTP clients shared by all sessions
+        :param storage_cache_ttl: The number of seconds the Storage API metadata responses are cached for,
+            no caching if not set
+        :param hedged_requests: The requests that are hedged by a second request when the first one is slow
         """
         self.token = storage_api_token
         # Ensure the base URL has a scheme
@@ -64,13 +348,22 @@ class KeboolaClient:
         # Initialize clients for individual services
         bearer_or_sapi_token = f'Bearer {bearer_token}' if bearer_token else storage_api_token
         self.storage_client = AsyncStorageClient.create(
-            root_url=storage_api_url, token=bearer_or_sapi_token, headers=self._get_headers()
+            root_url=storage_api_url,
+            token=bearer_or_sapi_token,
+            headers=self._get_headers(),
+            http_pool=http_pool,
+            cache=ResponseCache(ttl=storage_cache_ttl) if storage_cache_ttl else None,
+            hedged_requests=hedged_requests,
         )
         self.jobs_queue_client = JobsQueueClient.create(
-            root_url=queue_api_url, token=self.token, headers=self._get_headers()
+            root_url=queue_api_url,
+            token=self.token,
+            headers=self._get_headers(),
+            http_pool=http_pool,
+            hedged_requests=hedged_requests,
         )
         self.ai_service_client = AIServiceClient.create(
-            root_url=ai_service_api_url, token=self.token, headers=self._get_headers()
+            root_url=ai_service_api_url, token=self.token, headers=self._get_headers(), http_pool=http_pool
         )
 
     @classmethod
@@ -94,6 +387,499 @@ class KeboolaClient:
         return {'User-Agent': cls._get_user_agent()}
 
 
+class HttpClientPool:
+    """
+    Long-lived `httpx.AsyncClient` instances shared by all sessions of the MCP server.
+
+    One client is kept per service origin (scheme, host and port), so that the TCP connections and TLS sessions
+    to the Storage API, Job Queue API and AI Service are reused across the tool calls instead of being
+    re-established for every HTTP request.
+
+    In the HTTP/2 mode the concurrent requests to the same service are multiplexed over a single connection.
+    """
+
+    def __init__(
+        self,
+        limits: httpx.Limits | None = None,
+        timeout: httpx.Timeout | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        http2: bool = False,
+    ) -> None:
+        """
+        :param limits: The connection pool limits applied to each of the pooled clients
+        :param timeout: The default timeout of the pooled clients
+        :param transport: Custom transport for the pooled clients, mainly for testing
+        :param http2: If True, HTTP/2 is negotiated with the services that support it
+        :raises RuntimeError: If HTTP/2 is requested, but the 'h2' package is not installed
+        """
+        if http2 and importlib.util.find_spec('h2') is None:
+            raise RuntimeError(
+                "HTTP/2 requires the 'h2' package, install the server with the 'http2' extra: "
+                "pip install 'keboola-mcp-server[http2]'"
+            )
+        self._limits = limits or DEFAULT_LIMITS
+        self._timeout = timeout or DEFAULT_TIMEOUT
+        self._transport = transport
+        self._http2 = http2
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    @property
+    def http2(self) -> bool:
+        return self._http2
+
+    @staticmethod
+    def _get_origin(url: str) -> str:
+        parsed_url = httpx.URL(url)
+        return f'{parsed_url.scheme}://{parsed_url.netloc.decode("ascii")}'
+
+    def get(self, base_api_url: str) -> httpx.AsyncClient:
+        """
+        Gets the pooled client for the service, the client is created on the first use.
+
+        :param base_api_url: The base URL of the service API
+        :return: The shared `httpx.AsyncClient` instance
+        """
+        origin = self._get_origin(base_api_url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            LOG.info(f'Creating pooled HTTP client for {origin}, limits={self._limits}, http2={self._http2}')
+            client = httpx.AsyncClient(
+                limits=self._limits, timeout=self._timeout, transport=self._transport, http2=self._http2
+            )
+            self._clients[origin] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Closes all pooled clients and their connections."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+        LOG.info(f'Closed {len(clients)} pooled HTTP clients.')
+
+
+_IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Retry policy of the requests sent to Keboola services.
+
+    The failed requests are retried with exponential backoff and full jitter, the `Retry-After` response header
+    takes precedence over the computed backoff. Only idempotent requests are retried after a server error.
+    The requests that were rejected by rate limiting (429) or that could not have been sent at all (connection
+    errors) are safe to retry regardless of the HTTP method. The requests that were sent, but failed to return
+    a response in time or broke off, are only retried if their HTTP method is idempotent. The POST requests marked
+    as idempotent, e.g. the read-only SQL queries, are not retried then, they may have been running for the whole
+    read timeout and they would be run again.
+    """
+
+    max_attempts: int = 4
+    """The maximum number of attempts including the first one."""
+    backoff_base: float = 0.5
+    """The backoff of the first retry in seconds, it doubles with each next retry."""
+    backoff_max: float = 10.0
+    """The upper limit of the backoff in seconds."""
+    retry_after_max: float = 30.0
+    """The request is not retried if the server asks to wait longer than this number of seconds."""
+    retry_statuses: frozenset[int] = frozenset({429, 502, 503, 504})
+    """HTTP statuses of the responses that can be retried."""
+
+    def is_retryable_response(self, response: httpx.Response, idempotent: bool) -> bool:
+        if response.status_code not in self.retry_statuses:
+            return False
+        return idempotent or response.status_code == 429
+
+    @staticmethod
+    def is_retryable_error(error: httpx.TransportError, method: str) -> bool:
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            # the request has not reached the server
+            return True
+        return method in _IDEMPOTENT_METHODS
+
+    @staticmethod
+    def _parse_retry_after(response: httpx.Response) -> float | None:
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def get_delay(self, attempt: int, response: httpx.Response | None = None) -> float | None:
+        """
+        Computes how long to wait before the next attempt.
+
+        :param attempt: The number of the attempt that has just failed, starting from 1
+        :param response: The response of the failed attempt, if any
+        :return: The delay in seconds or None if the request should not be retried
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if response is not None and (retry_after := self._parse_retry_after(response)) is not None:
+            return retry_after if retry_after <= self.retry_after_max else None
+        return random.uniform(0.0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of concurrent requests sent with one token to one Keboola service.
+
+    The limit follows the AIMD (additive increase, multiplicative decrease) rule. Each healthy response increases
+    the limit by `1 / limit`, so the limit grows by roughly one per round of requests. A 429 or 503 response halves
+    the limit, at most once per `decrease_interval` seconds so that a single burst of rejected requests does not
+    collapse the limit. Since the request latency is roughly constant, limiting the concurrency also keeps
+    the request rate close to what the service can sustain.
+
+    The limiters are process-wide, all sessions using the same token share a single limiter per service.
+    """
+
+    _INSTANCES: 'OrderedDict[tuple[str, str], AdaptiveConcurrencyLimiter]' = OrderedDict()
+    _MAX_INSTANCES = 1024
+
+    def __init__(
+        self,
+        initial_limit: float = 8.0,
+        min_limit: float = 1.0,
+        max_limit: float = 64.0,
+        decrease_interval: float = 1.0,
+    ) -> None:
+        self._limit = initial_limit
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._decrease_interval = decrease_interval
+        self._last_decrease_ts = 0.0
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @classmethod
+    def for_token(cls, token_identity: str, service: str) -> 'AdaptiveConcurrencyLimiter':
+        """
+        Gets the process-wide limiter for the token and the service.
+
+        :param token_identity: The hash of the token used for the requests
+        :param service: The host name of the service
+        """
+        key = (token_identity, service)
+        if limiter := cls._INSTANCES.get(key):
+            cls._INSTANCES.move_to_end(key)
+            return limiter
+
+        limiter = cls._INSTANCES[key] = cls()
+        if len(cls._INSTANCES) > cls._MAX_INSTANCES:
+            # forget the least recently used limiters that are idle
+            for old_key, old_limiter in list(cls._INSTANCES.items())[:-cls._MAX_INSTANCES]:
+                if old_limiter.in_flight == 0:
+                    del cls._INSTANCES[old_key]
+        return limiter
+
+    @property
+    def limit(self) -> float:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _has_capacity(self) -> bool:
+        return self._in_flight < int(self._limit)
+
+    async def acquire(self) -> bool:
+        """
+        Waits until a request can be sent.
+
+        :return: True if the request had to wait for a free slot
+        """
+        if self._has_capacity() and not self._waiters:
+            self._in_flight += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was granted to the cancelled request, pass it on
+                self._in_flight -= 1
+                self._wake_up_waiters()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return True
+
+    def release(self, status_code: int | None) -> None:
+        """
+        Releases the slot and adapts the limit.
+
+        :param status_code: The status of the response or None if no response was received
+        """
+        self._in_flight -= 1
+        if status_code in (429, 503):
+            now = time.monotonic()
+            if now - self._last_decrease_ts >= self._decrease_interval:
+                self._limit = max(self._min_limit, self._limit / 2)
+                self._last_decrease_ts = now
+        elif status_code is not None:
+            self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+        self._wake_up_waiters()
+
+    def _wake_up_waiters(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is rejected without being sent because the service is failing."""
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a failing service for a while.
+
+    The breaker opens when `failure_threshold` consecutive requests fail, i.e. they end with a transport error
+    (a timeout, a refused connection) or a 5xx response. While open, the requests are rejected immediately
+    by `CircuitOpenError`. After `reset_timeout` seconds the breaker is half-open and lets a single probe request
+    through; its success closes the breaker, its failure opens it again.
+
+    The breakers are process-wide, all sessions share a single breaker per service.
+    """
+
+    CLOSED = 'closed'
+    HALF_OPEN = 'half_open'
+    OPEN = 'open'
+
+    _INSTANCES: dict[str, 'CircuitBreaker'] = {}
+    _STATE_GAUGE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, service: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        """
+        :param service: The host name of the service, used in the metrics
+        :param failure_threshold: The number of consecutive failures that opens the breaker
+        :param reset_timeout: The number of seconds the breaker stays open before a probe request is let through
+        """
+        self._service = service
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_ts: float | None = None
+        self._probe_in_flight = False
+
+    @classmethod
+    def for_service(cls, service: str) -> 'CircuitBreaker':
+        """
+        Gets the process-wide breaker for the service.
+
+        :param service: The host name of the service
+        """
+        if (breaker := cls._INSTANCES.get(service)) is None:
+            breaker = cls._INSTANCES[service] = cls(service)
+        return breaker
+
+    @property
+    def state(self) -> str:
+        if self._opened_ts is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_ts >= self._reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        """
+        Checks whether a request can be sent; each allowed request must be followed by a call to `record`.
+
+        :return: False if the request should be rejected
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            self._set_state_gauge()
+            return True
+        METRICS.inc('circuit_breaker_rejections', service=self._service)
+        return False
+
+    def record(self, healthy: bool | None) -> None:
+        """
+        Records the outcome of an allowed request.
+
+        :param healthy: True if the service responded, False if the request failed, None if the request
+            was not completed for other reasons (e.g. it was cancelled)
+        """
+        was_probe, self._probe_in_flight = self._probe_in_flight, False
+        if healthy:
+            self._failures = 0
+            self._opened_ts = None
+        elif healthy is not None:
+            self._failures += 1
+            if was_probe or self._failures >= self._failure_threshold:
+                if self._opened_ts is None or was_probe:
+                    LOG.warning(f'Circuit breaker for {self._service} opened after {self._failures} failures.')
+                self._opened_ts = time.monotonic()
+        self._set_state_gauge()
+
+    def _set_state_gauge(self) -> None:
+        METRICS.set_gauge('circuit_breaker_state', self._STATE_GAUGE_VALUES[self.state], service=self._service)
+
+
+@dataclass(frozen=True)
+class HedgingPolicy:
+    """
+    The policy of hedging the slow requests.
+
+    If the response does not arrive within the `quantile` of the recent response times, a second identical request
+    is sent and the response that arrives first is used, the other request is cancelled. The hedging starts once
+    `min_samples` response times are known. The number of hedging requests is capped to the `budget` fraction
+    of all requests, so that the hedging does not overload the service when all its responses are slow.
+    """
+
+    quantile: float = 0.95
+    min_delay: float = 0.05
+    max_delay: float = 5.0
+    budget: float = 0.05
+    min_samples: int = 20
+    window: int = 200
+
+
+DEFAULT_HEDGING_POLICY = HedgingPolicy()
+
+
+class RequestHedger:
+    """
+    Sends the hedging requests for one kind of request to one service and tracks the response times.
+
+    The hedgers are process-wide, all sessions share a single hedger per service and kind of request.
+    """
+
+    _INSTANCES: dict[tuple[str, str], 'RequestHedger'] = {}
+
+    def __init__(self, service: str, name: str, policy: HedgingPolicy = DEFAULT_HEDGING_POLICY) -> None:
+        """
+        :param service: The host name of the service, used in the metrics
+        :param name: The name of the kind of request, e.g. 'table_detail', used in the metrics
+        :param policy: The hedging policy
+        """
+        self._service = service
+        self._name = name
+        self._policy = policy
+        self._durations: deque[float] = deque(maxlen=policy.window)
+        # one token is needed to send one hedging request, each request adds the budget fraction of the token
+        self._budget_tokens = 0.0
+
+    @classmethod
+    def for_request(cls, service: str, name: str) -> 'RequestHedger':
+        """
+        Gets the process-wide hedger for the service and the kind of request.
+
+        :param service: The host name of the service
+        :param name: The name of the kind of request
+        """
+        key = (service, name)
+        if (hedger := cls._INSTANCES.get(key)) is None:
+            hedger = cls._INSTANCES[key] = cls(service, name)
+        return hedger
+
+    def get_delay(self) -> float | None:
+        """
+        :return: The number of seconds to wait for the response before hedging, None if not enough response times
+            are known yet
+        """
+        if len(self._durations) < self._policy.min_samples:
+            return None
+        durations = sorted(self._durations)
+        delay = durations[min(len(durations) - 1, int(len(durations) * self._policy.quantile))]
+        return min(self._policy.max_delay, max(self._policy.min_delay, delay))
+
+    async def run(self, send: Callable[[], Awaitable[T]]) -> T:
+        """
+        Sends the request and hedges it if its response is slow.
+
+        :param send: The function sending the request, it is called once more for the hedging request
+        :return: The first successful response
+        """
+        self._budget_tokens = min(self._budget_tokens + self._policy.budget, 1.0 + self._policy.budget)
+        delay = self.get_delay()
+        tasks = [asyncio.ensure_future(self._timed(send))]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._budget_tokens >= 1.0:
+                    self._budget_tokens -= 1.0
+                    METRICS.inc('http_hedged_requests', service=self._service, request=self._name)
+                    tasks.append(asyncio.ensure_future(self._timed(send)))
+
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task in done and not task.exception():
+                        if task is not tasks[0]:
+                            METRICS.inc('http_hedged_wins', service=self._service, request=self._name)
+                        return task.result()
+                if not pending:
+                    # all requests failed, raise the error of the first one
+                    return tasks[0].result()
+        finally:
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    # marks the error of the losing request as retrieved
+                    task.exception()
+                task.cancel()
+
+    async def _timed(self, send: Callable[[], Awaitable[T]]) -> T:
+        start_ts = time.monotonic()
+        result = await send()
+        self._durations.append(time.monotonic() - start_ts)
+        return result
+
+
+@dataclass
+class _InFlightRequest:
+    task: asyncio.Future[JsonStruct]
+    followers: int = 0
+
+
+# decodes the values of the kept response bodies ahead of the next callers; the kept responses are shared across
+# the event loops, so their decoding is not bound to the executor of any loop
+_SPARE_DECODE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='json-decode')
+
+
+@dataclass
+class _ValidatedResponse:
+    content: bytes  # the body is kept rather than its value, decoding it is cheaper than copying the value
+    digest: str
+    etag: str | None
+    last_modified: str | None
+    # the value decoded from the large body ahead of the next caller, it is given to a single caller only
+    spare_value: Future[Any] | None = None
+
+    async def take_value(self) -> JsonStruct:
+        """
+        Gets a new value decoded from the kept body, the callers are free to modify it.
+
+        The value of a large body decoded ahead is returned if it is ready, and the value for the next caller
+        starts decoding in a worker thread. So the callers reusing an unchanged body do not wait for its decoding.
+        """
+        if len(self.content) < _THREAD_DECODE_MIN_SIZE:
+            return cast(JsonStruct, decode_json(self.content))
+        spare_value, self.spare_value = self.spare_value, _SPARE_DECODE_EXECUTOR.submit(decode_json, self.content)
+        if spare_value is None:
+            return cast(JsonStruct, await asyncio.to_thread(decode_json, self.content))
+        return cast(JsonStruct, await asyncio.wrap_future(spare_value))
+
+
 class RawKeboolaClient:
     """
     Raw async client for Keboola services.
@@ -102,13 +888,31 @@ class RawKeboolaClient:
     and can be used to implement high-level functions in clients for individual services.
     """
 
+    # process-wide GET requests in flight, shared by the identical concurrent requests
+    _IN_FLIGHT_GETS: dict[tuple[Any, ...], _InFlightRequest] = {}
+    # process-wide last responses of the revalidated GET requests, the least recently used are evicted first
+    _VALIDATED_RESPONSES: OrderedDict[tuple[Any, ...], _ValidatedResponse] = OrderedDict()
+    _MAX_VALIDATED_RESPONSES = 64
+
     def __init__(
         self,
         base_api_url: str,
         api_token: str,
         headers: dict[str, Any] | None = None,
         timeout: httpx.Timeout | None = None,
+        http_pool: HttpClientPool | None = None,
+        retry_policy: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
     ) -> None:
+        """
+        :param base_api_url: The base URL of the service API
+        :param api_token: The Keboola Storage API token or the 'Bearer <access-token>' string
+        :param headers: Additional headers for the requests
+        :param timeout: The timeout of the requests
+        :param http_pool: The pool of long-lived HTTP clients; if not set, each request opens its own connection
+        :param retry_policy: The policy for retrying the failed requests
+        :param circuit_breaker: The breaker that rejects the requests while the service is failing
+        """
         self.base_api_url = base_api_url
         self.headers = {
             'Content-Type': 'application/json',
@@ -118,33 +922,281 @@ class RawKeboolaClient:
             self.headers['Authorization'] = api_token
         else:
             self.headers['X-StorageAPI-Token'] = api_token
-        self.timeout = timeout or httpx.Timeout(connect=5.0, read=60.0, write=10.0, pool=5.0)
+        self.timeout = timeout or DEFAULT_TIMEOUT
+        self._http_pool = http_pool
+        self.retry_policy = retry_policy or DEFAULT_RETRY_POLICY
+        self.circuit_breaker = circuit_breaker
+        self._service = httpx.URL(base_api_url).host
+        # identifies the token without keeping it in the keys of the process-wide structures
+        self._token_identity = hashlib.sha256(api_token.encode('utf-8')).hexdigest()[:16]
+        self._limiter = AdaptiveConcurrencyLimiter.for_token(self._token_identity, self._service)
         if headers:
             self.headers.update(headers)
 
+    @property
+    def token_hash(self) -> str:
+        """The hash identifying the token without revealing it."""
+        return self._token_identity
+
+    @asynccontextmanager
+    async def _http_client(self) -> AsyncIterator[httpx.AsyncClient]:
+        if self._http_pool:
+            yield self._http_pool.get(self.base_api_url)
+        else:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                yield client
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
+        idempotent: bool = False,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """
+        Sends the HTTP request to the service API and retries it according to the retry policy.
+
+        :param method: HTTP method
+        :param endpoint: API endpoint to call
+        :param params: Query parameters for the request
+        :param headers: Additional headers for the request
+        :param json: Request payload
+        :param idempotent: If True, the request is retried after the server errors even if its HTTP method
+            is not idempotent
+        :param stream: If True, the body of the successful response is not read and the caller must close
+            the response
+        :return: The HTTP response, it has the 304 status if the request was conditional and the resource
+            has not been modified
+        :raises httpx.HTTPStatusError: If the response status is 4xx or 5xx
+        :raises CircuitOpenError: If the request is rejected by the circuit breaker
+        """
+        headers = self.headers | (headers or {})
+        idempotent = idempotent or method in _IDEMPOTENT_METHODS
+        attempt = 0
+
+        while True:
+            attempt += 1
+            try:
+                response = await self._send(
+                    method, endpoint, params=params, headers=headers, json=json, stream=stream
+                )
+            except httpx.TransportError as e:
+                if (
+                    self.retry_policy.is_retryable_error(e, method)
+                    and (delay := self.retry_policy.get_delay(attempt)) is not None
+                ):
+                    await self._wait_before_retry(method, endpoint, attempt, delay, repr(e))
+                    continue
+                raise
+
+            if (
+                self.retry_policy.is_retryable_response(response, idempotent)
+                and (delay := self.retry_policy.get_delay(attempt, response)) is not None
+            ):
+                await response.aclose()
+                await self._wait_before_retry(method, endpoint, attempt, delay, f'HTTP {response.status_code}')
+                continue
+
+            if response.status_code != httpx.codes.NOT_MODIFIED and not response.is_success:
+                # the error details are in the body that has not been read if the response is streamed
+                await response.aread()
+                response.raise_for_status()
+            return response
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict[str, Any] | None,
+        headers: dict[str, Any],
+        json: dict[str, Any] | None,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """Sends a single HTTP request unless the circuit breaker rejects it."""
+        if not self.circuit_breaker:
+            return await self._send_limited(method, endpoint, params, headers, json, stream)
+
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError(
+                f'The service {self._service} is failing, the request {method} {endpoint} was rejected.'
+            )
+        healthy: bool | None = None
+        try:
+            response = await self._send_limited(method, endpoint, params, headers, json, stream)
+            healthy = response.status_code < 500
+            return response
+        except httpx.TransportError:
+            healthy = False
+            raise
+        finally:
+            self.circuit_breaker.record(healthy)
+
+    async def _send_limited(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict[str, Any] | None,
+        headers: dict[str, Any],
+        json: dict[str, Any] | None,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """Sends a single HTTP request within the concurrency limit for the token and the service."""
+        if await self._limiter.acquire():
+            METRICS.inc('http_throttled_requests', service=self._service)
+        status_code: int | None = None
+        try:
+            async with self._http_client() as client:
+                request = client.build_request(
+                    method,
+                    f'{self.base_api_url}/{endpoint}',
+                    params=params,
+                    headers=headers,
+                    content=encode_json(json) if json is not None else None,
+                    timeout=self.timeout,
+                )
+                # the client that is not pooled is closed right away, so its response must be read
+                response = await client.send(request, stream=stream and self._http_pool is not None)
+            status_code = response.status_code
+            return response
+        finally:
+            self._limiter.release(status_code)
+            METRICS.set_gauge(
+                'http_concurrency_limit', self._limiter.limit, service=self._service, token=self._token_identity[:8]
+            )
+
+    @staticmethod
+    async def _decode(response: httpx.Response) -> Any:
+        """Decodes the JSON body of the response."""
+        return await RawKeboolaClient._decode_content(response.content)
+
+    @staticmethod
+    async def _decode_content(content: bytes) -> Any:
+        """Decodes the JSON document, the large documents are decoded in a worker thread."""
+        if len(content) >= _THREAD_DECODE_MIN_SIZE:
+            return await asyncio.to_thread(decode_json, content)
+        return decode_json(content)
+
+    async def _wait_before_retry(self, method: str, endpoint: str, attempt: int, delay: float, reason: str) -> None:
+        LOG.warning(
+            f'Retrying {method} {self._service}/{endpoint} after {reason}: '
+            f'attempt={attempt}, delay={delay:.2f} seconds'
+        )
+        METRICS.inc('http_retries', service=self._service, method=method)
+        METRICS.inc('http_retry_wait_seconds', delay, service=self._service, method=method)
+        start_ts = time.perf_counter()
+        await asyncio.sleep(delay)
+        METRICS.inc('http_retry_time_seconds', time.perf_counter() - start_ts, service=self._service, method=method)
+
     async def get(
         self,
         endpoint: str,
         params: dict[str, Any] | None = None,
         headers: dict[str, Any] | None = None,
+        revalidate: bool = False,
+        hedger: RequestHedger | None = None,
     ) -> JsonStruct:
         """
         Makes a GET request to the service API.
 
+        Identical GET requests that are issued while the same request is already in flight do not hit the API,
+        they wait for the in-flight request and share its result. The requests are identical if they go
+        to the same URL with the same query parameters and the same token.
+
         :param endpoint: API endpoint to call
         :param params: Query parameters for the request
         :param headers: Additional headers for the request
+        :param revalidate: If True, the last response is kept and the request is made conditional on its
+            validators (ETag, Last-Modified); the kept response is reused if the resource has not been modified
+            or if the new response body is identical. Meant for the large responses.
+        :param hedger: The hedger that sends a second request if the response is slow
         :return: API response as dictionary
         """
-        headers = self.headers | (headers or {})
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(
-                f'{self.base_api_url}/{endpoint}',
-                params=params,
-                headers=headers,
-            )
-            response.raise_for_status()
-            return cast(JsonStruct, response.json())
+        key = self._get_request_key(endpoint, params, headers)
+        if in_flight := self._IN_FLIGHT_GETS.get(key):
+            METRICS.inc('http_coalesced_requests', service=self._service)
+            in_flight.followers += 1
+            # each caller gets its own copy of the shared result to be free to modify it
+            return copy.deepcopy(await asyncio.shield(in_flight.task))
+
+        if revalidate:
+            get = self._get_revalidated(key, endpoint, params, headers)
+        else:
+            get = self._get(endpoint, params, headers, hedger)
+        in_flight = _InFlightRequest(asyncio.ensure_future(get))
+        self._IN_FLIGHT_GETS[key] = in_flight
+        in_flight.task.add_done_callback(lambda _: self._IN_FLIGHT_GETS.pop(key, None))
+        result = await asyncio.shield(in_flight.task)
+        return copy.deepcopy(result) if in_flight.followers else result
+
+    async def _get(
+        self,
+        endpoint: str,
+        params: dict[str, Any] | None,
+        headers: dict[str, Any] | None,
+        hedger: RequestHedger | None = None,
+    ) -> JsonStruct:
+        if hedger:
+            response = await hedger.run(lambda: self._request('GET', endpoint, params=params, headers=headers))
+        else:
+            response = await self._request('GET', endpoint, params=params, headers=headers)
+        return cast(JsonStruct, await self._decode(response))
+
+    async def _get_revalidated(
+        self,
+        key: tuple[Any, ...],
+        endpoint: str,
+        params: dict[str, Any] | None,
+        headers: dict[str, Any] | None,
+    ) -> JsonStruct:
+        # the validated responses are shared across the event loops
+        key = key[1:]
+        headers = dict(headers or {})
+        if validated := self._VALIDATED_RESPONSES.get(key):
+            if validated.etag:
+                headers['If-None-Match'] = validated.etag
+            if validated.last_modified:
+                headers['If-Modified-Since'] = validated.last_modified
+
+        response = await self._request('GET', endpoint, params=params, headers=headers)
+
+        if validated and response.status_code == httpx.codes.NOT_MODIFIED:
+            result = 'not_modified'
+        else:
+            digest = hashlib.sha256(response.content).hexdigest()
+            if validated and validated.digest == digest:
+                # the upstream does not send the validators, but the kept body and its decoded value are reused
+                result = 'unchanged'
+            else:
+                result = 'modified'
+                validated = _ValidatedResponse(
+                    content=response.content,
+                    digest=digest,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                )
+
+        METRICS.inc('http_revalidated_responses', service=self._service, result=result)
+        self._VALIDATED_RESPONSES[key] = validated
+        self._VALIDATED_RESPONSES.move_to_end(key)
+        while len(self._VALIDATED_RESPONSES) > self._MAX_VALIDATED_RESPONSES:
+            self._VALIDATED_RESPONSES.popitem(last=False)
+        return await validated.take_value()
+
+    def _get_request_key(
+        self, endpoint: str, params: dict[str, Any] | None, headers: dict[str, Any] | None
+    ) -> tuple[Any, ...]:
+        return (
+            # the tasks must not be shared across event loops
+            id(asyncio.get_running_loop()),
+            self.base_api_url,
+            endpoint,
+            tuple(sorted((k, str(v)) for k, v in (params or {}).items())),
+            tuple(sorted((k, str(v)) for k, v in (headers or {}).items())),
+            self._token_identity,
+        )
 
     async def post(
         self,
@@ -152,6 +1204,7 @@ class RawKeboolaClient:
         data: dict[str, Any] | None = None,
         params: dict[str, Any] | None = None,
         headers: dict[str, Any] | None = None,
+        idempotent: bool = False,
     ) -> JsonStruct:
         """
         Makes a POST request to the service API.
@@ -160,18 +1213,42 @@ class RawKeboolaClient:
         :param data: Request payload
         :param params: Query parameters for the request
         :param headers: Additional headers for the request
+        :param idempotent: If True, the request is retried after the server errors like the GET requests,
+            but not after the read timeouts
         :return: API response as dictionary
         """
-        headers = self.headers | (headers or {})
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f'{self.base_api_url}/{endpoint}',
-                params=params,
-                headers=headers,
-                json=data or {},
-            )
-            response.raise_for_status()
-            return cast(JsonStruct, response.json())
+        response = await self._request(
+            'POST', endpoint, params=params, headers=headers, json=data or {}, idempotent=idempotent
+        )
+        return cast(JsonStruct, await self._decode(response))
+
+    @asynccontextmanager
+    async def post_stream(
+        self,
+        endpoint: str,
+        data: dict[str, Any] | None = None,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, Any] | None = None,
+        idempotent: bool = False,
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        """
+        Makes a POST request to the service API and yields the chunks of the response body as they arrive.
+
+        :param endpoint: API endpoint to call
+        :param data: Request payload
+        :param params: Query parameters for the request
+        :param headers: Additional headers for the request
+        :param idempotent: If True, the request is retried after the server errors like the GET requests,
+            but not after the read timeouts; the request is never retried once the response body is being read
+        :return: The async iterator of the decoded chunks of the response body
+        """
+        response = await self._request(
+            'POST', endpoint, params=params, headers=headers, json=data or {}, idempotent=idempotent, stream=True
+        )
+        try:
+            yield response.aiter_bytes()
+        finally:
+            await response.aclose()
 
     async def put(
         self,
@@ -189,16 +1266,8 @@ class RawKeboolaClient:
         :param headers: Additional headers for the request
         :return: API response as dictionary
         """
-        headers = self.headers | (headers or {})
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.put(
-                f'{self.base_api_url}/{endpoint}',
-                params=params,
-                headers=headers,
-                json=data or {},
-            )
-            response.raise_for_status()
-            return cast(JsonStruct, response.json())
+        response = await self._request('PUT', endpoint, params=params, headers=headers, json=data or {})
+        return cast(JsonStruct, await self._decode(response))
 
     async def delete(
         self,
@@ -212,18 +1281,12 @@ class RawKeboolaClient:
         :param headers: Additional headers for the request
         :return: API response as dictionary
         """
-        headers = self.headers | (headers or {})
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.delete(
-                f'{self.base_api_url}/{endpoint}',
-                headers=headers,
-            )
-            response.raise_for_status()
+        response = await self._request('DELETE', endpoint, headers=headers)
 
-            if response.content:
-                return cast(JsonStruct, response.json())
+        if response.content:
+            return cast(JsonStruct, await self._decode(response))
 
-            return None
+        return None
 
 
 class KeboolaServiceClient:
@@ -234,7 +1297,7 @@ class KeboolaServiceClient:
     and is used as a base class for clients for individual services.
     """
 
-    def __init__(self, raw_client: RawKeboolaClient) -> None:
+    def __init__(self, raw_client: RawKeboolaClient, hedged_requests: Collection[HedgedRequest] = ()) -> None:
         """
         Creates a client instance.
 
@@ -242,39 +1305,62 @@ class KeboolaServiceClient:
         rather than overriding this constructor.
 
         :param raw_client: The raw client to use
+        :param hedged_requests: The requests that are hedged by a second request when the first one is slow
         """
         self.raw_client = raw_client
+        self._hedged_requests = frozenset(hedged_requests)
+
+    @property
+    def token_hash(self) -> str:
+        """The hash identifying the token without revealing it."""
+        return self.raw_client.token_hash
+
+    def _get_hedger(self, name: HedgedRequest) -> RequestHedger | None:
+        if name not in self._hedged_requests:
+            return None
+        return RequestHedger.for_request(httpx.URL(self.raw_client.base_api_url).host, name)
 
     @classmethod
-    def create(cls, root_url: str, token: str) -> 'KeboolaServiceClient':
+    def create(cls, root_url: str, token: str, http_pool: HttpClientPool | None = None) -> 'KeboolaServiceClient':
         """
         Creates a KeboolaServiceClient from a Keboola Storage API token.
 
         :param root_url: The root URL of the service API
         :param token: The Keboola Storage API token
+        :param http_pool: The pool of long-lived HTTP clients
         :return: A new instance of KeboolaServiceClient
         """
-        return cls(raw_client=RawKeboolaClient(base_api_url=root_url, api_token=token))
+        return cls(raw_client=RawKeboolaClient(base_api_url=root_url, api_token=token, http_pool=http_pool))
 
     async def get(
         self,
         endpoint: str,
         params: Optional[dict[str, Any]] = None,
+        revalidate: bool = False,
+        hedged_as: HedgedRequest | None = None,
     ) -> JsonStruct:
         """
         Makes a GET request to the service API.
 
         :param endpoint: API endpoint to call
         :param params: Query parameters for the request
+        :param revalidate: If True, the last response is reused if the resource has not been modified
+        :param hedged_as: The kind of request, it is hedged if this kind is enabled in the client
         :return: API response as dictionary
         """
-        return await self.raw_client.get(endpoint=endpoint, params=params)
+        return await self.raw_client.get(
+            endpoint=endpoint,
+            params=params,
+            revalidate=revalidate,
+            hedger=self._get_hedger(hedged_as) if hedged_as else None,
+        )
 
     async def post(
         self,
         endpoint: str,
         data: Optional[dict[str, Any]] = None,
         params: Optional[dict[str, Any]] = None,
+        idempotent: bool = False,
     ) -> JsonStruct:
         """
         Makes a POST request to the service API.
@@ -282,9 +1368,34 @@ class KeboolaServiceClient:
         :param endpoint: API endpoint to call
         :param data: Request payload
         :param params: Query parameters for the request
+        :param idempotent: If True, the request is retried after the server errors like the GET requests,
+            but not after the read timeouts
         :return: API response as dictionary
         """
-        return await self.raw_client.post(endpoint=endpoint, data=data, params=params)
+        return await self.raw_client.post(endpoint=endpoint, data=data, params=params, idempotent=idempotent)
+
+    @asynccontextmanager
+    async def post_stream(
+        self,
+        endpoint: str,
+        data: Optional[dict[str, Any]] = None,
+        params: Optional[dict[str, Any]] = None,
+        idempotent: bool = False,
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        """
+        Makes a POST request to the service API and yields the chunks of the response body as they arrive.
+
+        :param endpoint: API endpoint to call
+        :param data: Request payload
+        :param params: Query parameters for the request
+        :param idempotent: If True, the request is retried after the server errors like the GET requests,
+            but not after the read timeouts
+        :return: The async iterator of the decoded chunks of the response body
+        """
+        async with self.raw_client.post_stream(
+            endpoint=endpoint, data=data, params=params, idempotent=idempotent
+        ) as chunks:
+            yield chunks
 
     async def put(
         self,
@@ -315,17 +1426,158 @@ class KeboolaServiceClient:
         return await self.raw_client.delete(endpoint=endpoint)
 
 
+_READ_ONLY_SQL_PREFIXES = ('select', 'with', 'show', 'describe', 'explain')
+
+
+@dataclass
+class _CacheEntry:
+    content: bytes  # the value encoded to JSON
+    expires_at: float
+    tags: frozenset[str]
+
+
+class ResponseCache:
+    """
+    The cache of API responses bounded by the time-to-live of its entries and by their number.
+
+    Each entry is labeled by tags naming the resources the response describes, e.g. 'bucket:in.c-foo'.
+    The write operations invalidate all entries labeled by the tags of the resources they modify.
+    The cached values are kept encoded to JSON and decoded on the way out, so the callers are free to modify them.
+    Encoding and decoding is several times faster than deep copying the values.
+    """
+
+    DEFAULT_TTL = 60.0
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = 512) -> None:
+        """
+        :param ttl: The number of seconds the entries are valid for
+        :param max_entries: The maximum number of entries, the least recently used entries are evicted first
+        """
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Any, _CacheEntry] = OrderedDict()
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """The version is incremented by each invalidation."""
+        return self._version
+
+    def get(self, key: Any) -> JsonStruct | None:
+        if (entry := self._entries.get(key)) is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return cast(JsonStruct, decode_json(entry.content))
+
+    def put(self, key: Any, value: JsonStruct, tags: Iterable[str], version: int | None = None) -> None:
+        """
+        Stores the value in the cache.
+
+        :param key: The cache key
+        :param value: The value to store
+        :param tags: The tags of the resources described by the value
+        :param version: The cache version observed before the value was retrieved; if the cache was invalidated
+            since then, the value may be stale and is not stored
+        """
+        if version is not None and version != self._version:
+            return
+        self._entries[key] = _CacheEntry(encode_json(value), time.monotonic() + self._ttl, frozenset(tags))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *tags: str) -> None:
+        """Removes all entries labeled by any of the tags."""
+        self._version += 1
+        tags_set = set(tags)
+        for key in [key for key, entry in self._entries.items() if entry.tags & tags_set]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._version += 1
+        self._entries.clear()
+
+
+@dataclass(frozen=True)
+class TokenIdentity:
+    """The project and the organization the Storage API token belongs to."""
+
+    project_id: str
+    project_name: str
+    organization_id: str
+    default_backend: str | None
+    expires_at: datetime | None
+
+    @staticmethod
+    def _parse_datetime(value: str) -> datetime:
+        """Parses the Storage API timestamp, e.g. '2025-07-01T12:00:00+0200', the naive timestamps are in UTC."""
+        try:
+            # Python 3.10 `datetime.fromisoformat()` does not accept the offsets without a colon
+            parsed = datetime.strptime(value, '%Y-%m-%dT%H:%M:%S%z')
+        except ValueError:
+            parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed
+
+    @classmethod
+    def from_token_data(cls, token_data: JsonDict) -> 'TokenIdentity':
+        """
+        :param token_data: The response of the Storage API `tokens/verify` endpoint
+        """
+        owner = cast(JsonDict, token_data.get('owner') or {})
+        organization = cast(JsonDict, token_data.get('organization') or {})
+        expires_at: datetime | None = None
+        if expires := token_data.get('expires'):
+            try:
+                expires_at = cls._parse_datetime(cast(str, expires))
+            except ValueError:
+                LOG.warning(f'Invalid token expiration: {expires}')
+        return cls(
+            project_id=str(owner.get('id', '')),
+            project_name=str(owner.get('name', '')),
+            organization_id=str(organization.get('id', '')),
+            default_backend=cast(str | None, owner.get('defaultBackend')),
+            expires_at=expires_at,
+        )
+
+
+@dataclass
+class _VerifiedToken:
+    token_data: JsonDict
+    identity: TokenIdentity
+    expires_at: float
+
+
 class AsyncStorageClient(KeboolaServiceClient):
 
-    def __init__(self, raw_client: RawKeboolaClient, branch_id: str = 'default') -> None:
+    # process-wide verified tokens, keyed by the Storage API URL and the token hash
+    _VERIFIED_TOKENS: OrderedDict[tuple[str, str], _VerifiedToken] = OrderedDict()
+    _MAX_VERIFIED_TOKENS = 1024
+    # the token privileges can change, so even the non-expiring tokens are verified again after a while
+    _VERIFIED_TOKEN_MAX_AGE = 3600.0
+
+    def __init__(
+        self,
+        raw_client: RawKeboolaClient,
+        branch_id: str = 'default',
+        cache: ResponseCache | None = None,
+        hedged_requests: Collection[HedgedRequest] = (),
+    ) -> None:
         """
         Creates an AsyncStorageClient from a RawKeboolaClient and a branch id.
 
         :param raw_client: The raw client to use
         :param branch_id: The id of the branch
+        :param cache: The cache of the responses of the read-only metadata endpoints, no caching if not set
+        :param hedged_requests: The requests that are hedged by a second request when the first one is slow
         """
-        super().__init__(raw_client=raw_client)
+        super().__init__(raw_client=raw_client, hedged_requests=hedged_requests)
         self._branch_id: str = branch_id
+        self._cache = cache
 
     @property
     def branch_id(self) -> str:
@@ -343,6 +1595,9 @@ class AsyncStorageClient(KeboolaServiceClient):
         version: str = 'v2',
         branch_id: str = 'default',
         headers: dict[str, Any] | None = None,
+        http_pool: HttpClientPool | None = None,
+        cache: ResponseCache | None = None,
+        hedged_requests: Collection[HedgedRequest] = (),
     ) -> 'AsyncStorageClient':
         """
         Creates an AsyncStorageClient from a Keboola Storage API token.
@@ -352,6 +1607,9 @@ class AsyncStorageClient(KeboolaServiceClient):
         :param version: The version of the API to use (default: 'v2')
         :param branch_id: The id of the branch
         :param headers: Additional headers for the requests
+        :param http_pool: The pool of long-lived HTTP clients
+        :param cache: The cache of the responses of the read-only metadata endpoints
+        :param hedged_requests: The requests that are hedged by a second request when the first one is slow
         :return: A new instance of AsyncStorageClient
         """
         return cls(
@@ -359,17 +1617,81 @@ class AsyncStorageClient(KeboolaServiceClient):
                 base_api_url=f'{root_url}/{version}/storage',
                 api_token=token,
                 headers=headers,
+                http_pool=http_pool,
             ),
             branch_id=branch_id,
+            cache=cache,
+            hedged_requests=hedged_requests,
         )
 
-    async def branch_metadata_get(self) -> list[JsonDict]:
+    async def _cached_get(
+        self,
+        endpoint: str,
+        tags: Iterable[str],
+        params: dict[str, Any] | None = None,
+        revalidate: bool = False,
+        hedged_as: HedgedRequest | None = None,
+        use_cache: bool = True,
+    ) -> JsonStruct:
+        """
+        Makes a GET request to the Storage API and caches its response.
+
+        :param endpoint: API endpoint to call
+        :param tags: The tags of the resources described by the response, used for the cache invalidation
+        :param params: Query parameters for the request
+        :param revalidate: If True, the response is revalidated rather than downloaded again when not cached
+        :param hedged_as: The kind of request, it is hedged if this kind is enabled in the client
+        :param use_cache: If False, the cached response is not used, but the new response is cached
+        :return: API response as dictionary
+        """
+        if not self._cache:
+            return await self.get(endpoint=endpoint, params=params, revalidate=revalidate, hedged_as=hedged_as)
+
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        if use_cache and (value := self._cache.get(key)) is not None:
+            METRICS.inc('storage_cache_hits')
+            return value
+
+        METRICS.inc('storage_cache_misses')
+        version = self._cache.version
+        value = await self.get(endpoint=endpoint, params=params, revalidate=revalidate, hedged_as=hedged_as)
+        self._cache.put(key, value, tags, version=version)
+        return value
+
+    @contextmanager
+    def _invalidating(self, *tags: str) -> Iterator[None]:
+        """Invalidates the cached responses labeled by the tags after the enclosed write request is done."""
+        try:
+            yield
+        finally:
+            if self._cache:
+                self._cache.invalidate(*tags)
+
+    @staticmethod
+    def _bucket_tag(bucket_id: str) -> str:
+        return f'bucket:{bucket_id}'
+
+    @staticmethod
+    def _table_tags(table_id: str) -> tuple[str, ...]:
+        # the table is also described by the listing of the tables in its bucket
+        return f'table:{table_id}', f'bucket:{table_id.rsplit(".", maxsplit=1)[0]}'
+
+    @staticmethod
+    def _component_tags(component_id: str) -> tuple[str, ...]:
+        # the configurations are also included in the listing of all components
+        return f'component:{component_id}', 'components'
+
+    async def branch_metadata_get(self, use_cache: bool = True) -> list[JsonDict]:
         """
         Retrieves metadata for the current branch.
 
+        :param use_cache: If False, the metadata are read from the Storage API even if they are cached
         :return: Branch metadata as a list of dictionaries. Each dictionary contains the 'key' and 'value' keys.
         """
-        return cast(list[JsonDict], await self.get(endpoint=f'branch/{self.branch_id}/metadata'))
+        return cast(
+            list[JsonDict],
+            await self._cached_get(endpoint=f'branch/{self.branch_id}/metadata', tags=['branch'], use_cache=use_cache),
+        )
 
     async def branch_metadata_update(self, metadata: dict[str, Any]) -> list[JsonDict]:
         """
@@ -381,7 +1703,8 @@ class AsyncStorageClient(KeboolaServiceClient):
         payload = {
             'metadata': [{'key': key, 'value': value} for key, value in metadata.items()],
         }
-        return cast(list[JsonDict], await self.post(endpoint=f'branch/{self.branch_id}/metadata', data=payload))
+        with self._invalidating('branch'):
+            return cast(list[JsonDict], await self.post(endpoint=f'branch/{self.branch_id}/metadata', data=payload))
 
     async def bucket_detail(self, bucket_id: str) -> JsonStruct:
         """
@@ -390,7 +1713,7 @@ class AsyncStorageClient(KeboolaServiceClient):
         :param bucket_id: The id of the bucket
         :return: Bucket details as dictionary
         """
-        return await self.get(endpoint=f'buckets/{bucket_id}')
+        return await self._cached_get(endpoint=f'buckets/{bucket_id}', tags=[self._bucket_tag(bucket_id)])
 
     async def bucket_list(self) -> JsonList:
         """
@@ -398,7 +1721,7 @@ class AsyncStorageClient(KeboolaServiceClient):
 
         :return: List of buckets as dictionary
         """
-        return cast(JsonList, await self.get(endpoint='buckets'))
+        return cast(JsonList, await self._cached_get(endpoint='buckets', tags=['buckets']))
 
     async def bucket_metadata_delete(self, bucket_id: str, metadata_id: str) -> None:
         """
@@ -407,7 +1730,8 @@ class AsyncStorageClient(KeboolaServiceClient):
         :param bucket_id: The id of the bucket
         :param metadata_id: The id of the metadata
         """
-        await self.delete(endpoint=f'buckets/{bucket_id}/metadata/{metadata_id}')
+        with self._invalidating(self._bucket_tag(bucket_id), 'buckets'):
+            await self.delete(endpoint=f'buckets/{bucket_id}/metadata/{metadata_id}')
 
     async def bucket_metadata_get(self, bucket_id: str) -> list[JsonDict]:
         """
@@ -416,7 +1740,10 @@ class AsyncStorageClient(KeboolaServiceClient):
         :param bucket_id: The id of the bucket
         :return: Bucket metadata as a list of dictionaries. Each dictionary contains the 'key' and 'value' keys.
         """
-        return cast(list[JsonDict], await self.get(endpoint=f'buckets/{bucket_id}/metadata'))
+        return cast(
+            list[JsonDict],
+            await self._cached_get(endpoint=f'buckets/{bucket_id}/metadata', tags=[self._bucket_tag(bucket_id)]),
+        )
 
     async def bucket_metadata_update(
         self,
@@ -436,7 +1763,8 @@ class AsyncStorageClient(KeboolaServiceClient):
             'provider': provider,
             'metadata': [{'key': key, 'value': value} for key, value in metadata.items()],
         }
-        return cast(list[JsonDict], await self.post(endpoint=f'buckets/{bucket_id}/metadata', data=payload))
+        with self._invalidating(self._bucket_tag(bucket_id), 'buckets'):
+            return cast(list[JsonDict], await self.post(endpoint=f'buckets/{bucket_id}/metadata', data=payload))
 
     async def bucket_table_list(self, bucket_id: str, include: list[str] | None = None) -> list[JsonDict]:
         """
@@ -449,7 +1777,16 @@ class AsyncStorageClient(KeboolaServiceClient):
         params = {}
         if include is not None and isinstance(include, list):
             params['include'] = ','.join(include)
-        return cast(list[JsonDict], await self.get(endpoint=f'buckets/{bucket_id}/tables', params=params))
+        return cast(
+            list[JsonDict],
+            await self._cached_get(
+                endpoint=f'buckets/{bucket_id}/tables',
+                tags=[self._bucket_tag(bucket_id)],
+                params=params,
+                # the listing with the metadata of all tables and columns is large
+                revalidate=bool(include),
+            ),
+        )
 
     async def component_detail(self, component_id: str) -> JsonDict:
         """
@@ -458,7 +1795,13 @@ class AsyncStorageClient(KeboolaServiceClient):
         :param component_id: The id of the component
         :return: Component details as a dictionary
         """
-        return cast(JsonDict, await self.get(endpoint=f'branch/{self.branch_id}/components/{component_id}'))
+        return cast(
+            JsonDict,
+            await self._cached_get(
+                endpoint=f'branch/{self.branch_id}/components/{component_id}',
+                tags=[f'component:{component_id}'],
+            ),
+        )
 
     async def component_list(
         self, component_type: str, include: list[ComponentResource] | None = None
@@ -476,7 +1819,11 @@ class AsyncStorageClient(KeboolaServiceClient):
         if include is not None and isinstance(include, list):
             params['include'] = ','.join(include)
 
-        return cast(list[JsonDict], await self.get(endpoint=endpoint, params=params))
+        return cast(
+            list[JsonDict],
+            # the listing with the configurations is large
+            await self._cached_get(endpoint=endpoint, tags=['components'], params=params, revalidate=bool(include)),
+        )
 
     async def configuration_create(
         self,
@@ -502,7 +1849,8 @@ class AsyncStorageClient(KeboolaServiceClient):
             'description': description,
             'configuration': configuration,
         }
-        return cast(JsonDict, await self.post(endpoint=endpoint, data=payload))
+        with self._invalidating(*self._component_tags(component_id)):
+            return cast(JsonDict, await self.post(endpoint=endpoint, data=payload))
 
     async def configuration_delete(self, component_id: str, configuration_id: str, skip_trash: bool = False) -> None:
         """
@@ -515,9 +1863,10 @@ class AsyncStorageClient(KeboolaServiceClient):
         :raises httpx.HTTPStatusError: If the (component_id, configuration_id) is not found.
         """
         endpoint = f'branch/{self.branch_id}/components/{component_id}/configs/{configuration_id}'
-        await self.delete(endpoint=endpoint)
-        if skip_trash:
+        with self._invalidating(*self._component_tags(component_id)):
             await self.delete(endpoint=endpoint)
+            if skip_trash:
+                await self.delete(endpoint=endpoint)
 
     async def configuration_detail(self, component_id: str, configuration_id: str) -> JsonDict:
         """
@@ -534,7 +1883,12 @@ class AsyncStorageClient(KeboolaServiceClient):
             raise ValueError(f"Invalid configuration_id '{configuration_id}'.")
         endpoint = f'branch/{self.branch_id}/components/{component_id}/configs/{configuration_id}'
 
-        return cast(JsonDict, await self.get(endpoint=endpoint))
+        return cast(
+            JsonDict,
+            await self._cached_get(
+                endpoint=endpoint, tags=[f'component:{component_id}'], hedged_as='configuration_detail'
+            ),
+        )
 
     async def configuration_list(self, component_id: str) -> list[JsonDict]:
         """
@@ -548,7 +1902,11 @@ class AsyncStorageClient(KeboolaServiceClient):
             raise ValueError(f"Invalid component_id '{component_id}'.")
         endpoint = f'branch/{self.branch_id}/components/{component_id}/configs'
 
-        return cast(list[JsonDict], await self.get(endpoint=endpoint))
+        return cast(
+            list[JsonDict],
+            # the configurations (e.g. the flows with all their phases) are large
+            await self._cached_get(endpoint=endpoint, tags=[f'component:{component_id}'], revalidate=True),
+        )
 
     async def configuration_metadata_get(self, component_id: str, configuration_id: str) -> list[JsonDict]:
         """
@@ -559,7 +1917,7 @@ class AsyncStorageClient(KeboolaServiceClient):
         :return: Configuration metadata as a list of dictionaries. Each dictionary contains the 'key' and 'value' keys.
         """
         endpoint = f'branch/{self.branch_id}/components/{component_id}/configs/{configuration_id}/metadata'
-        return cast(list[JsonDict], await self.get(endpoint=endpoint))
+        return cast(list[JsonDict], await self._cached_get(endpoint=endpoint, tags=[f'component:{component_id}']))
 
     async def configuration_metadata_update(
         self,
@@ -579,7 +1937,8 @@ class AsyncStorageClient(KeboolaServiceClient):
         payload = {
             'metadata': [{'key': key, 'value': value} for key, value in metadata.items()],
         }
-        return cast(list[JsonDict], await self.post(endpoint=endpoint, data=payload))
+        with self._invalidating(*self._component_tags(component_id)):
+            return cast(list[JsonDict], await self.post(endpoint=endpoint, data=payload))
 
     async def configuration_update(
         self,
@@ -620,7 +1979,8 @@ class AsyncStorageClient(KeboolaServiceClient):
         if is_disabled:
             payload['isDisabled'] = is_disabled
 
-        return cast(JsonDict, await self.put(endpoint=endpoint, data=payload))
+        with self._invalidating(*self._component_tags(component_id)):
+            return cast(JsonDict, await self.put(endpoint=endpoint, data=payload))
 
     async def configuration_row_create(
         self,
@@ -646,12 +2006,14 @@ class AsyncStorageClient(KeboolaServiceClient):
             'configuration': configuration,
         }
 
-        return cast(
-            JsonDict,
-            await self.post(
-                endpoint=f'branch/{self.branch_id}/components/{component_id}/configs/{config_id}/rows', data=payload
-            ),
-        )
+        with self._invalidating(*self._component_tags(component_id)):
+            return cast(
+                JsonDict,
+                await self.post(
+                    endpoint=f'branch/{self.branch_id}/components/{component_id}/configs/{config_id}/rows',
+                    data=payload,
+                ),
+            )
 
     async def configuration_row_update(
         self,
@@ -688,14 +2050,15 @@ class AsyncStorageClient(KeboolaServiceClient):
         if updated_description:
             payload['description'] = updated_description
 
-        return cast(
-            JsonDict,
-            await self.put(
-                endpoint=f'branch/{self.branch_id}/components/{component_id}/configs/{config_id}'
-                f'/rows/{configuration_row_id}',
-                data=payload,
-            ),
-        )
+        with self._invalidating(*self._component_tags(component_id)):
+            return cast(
+                JsonDict,
+                await self.put(
+                    endpoint=f'branch/{self.branch_id}/components/{component_id}/configs/{config_id}'
+                    f'/rows/{configuration_row_id}',
+                    data=payload,
+                ),
+            )
 
     async def job_detail(self, job_id: str | int) -> JsonDict:
         """
@@ -705,7 +2068,7 @@ class AsyncStorageClient(KeboolaServiceClient):
         :param job_id: The id of the job
         :return: Job details as dictionary
         """
-        return cast(JsonDict, await self.get(endpoint=f'jobs/{job_id}'))
+        return cast(JsonDict, await self.get(endpoint=f'jobs/{job_id}', hedged_as='job_detail'))
 
     async def flow_create(
         self,
@@ -791,14 +2154,23 @@ class AsyncStorageClient(KeboolaServiceClient):
             updated_description=description,
         )
 
-    async def table_detail(self, table_id: str) -> JsonDict:
+    async def table_detail(self, table_id: str, use_cache: bool = True) -> JsonDict:
         """
         Retrieves information about a given table.
 
         :param table_id: The id of the table
+        :param use_cache: If False, the table is retrieved from the Storage API even if it is cached
         :return: Table details as dictionary
         """
-        return cast(JsonDict, await self.get(endpoint=f'tables/{table_id}'))
+        return cast(
+            JsonDict,
+            await self._cached_get(
+                endpoint=f'tables/{table_id}',
+                tags=self._table_tags(table_id),
+                hedged_as='table_detail',
+                use_cache=use_cache,
+            ),
+        )
 
     async def table_metadata_delete(self, table_id: str, metadata_id: str) -> None:
         """
@@ -807,7 +2179,8 @@ class AsyncStorageClient(KeboolaServiceClient):
         :param table_id: The id of the table
         :param metadata_id: The id of the metadata
         """
-        await self.delete(endpoint=f'tables/{table_id}/metadata/{metadata_id}')
+        with self._invalidating(*self._table_tags(table_id)):
+            await self.delete(endpoint=f'tables/{table_id}/metadata/{metadata_id}')
 
     async def table_metadata_get(self, table_id: str) -> list[JsonDict]:
         """
@@ -816,7 +2189,10 @@ class AsyncStorageClient(KeboolaServiceClient):
         :param table_id: The id of the table
         :return: Table metadata as a list of dictionaries. Each dictionary contains the 'key' and 'value' keys.
         """
-        return cast(list[JsonDict], await self.get(endpoint=f'tables/{table_id}/metadata'))
+        return cast(
+            list[JsonDict],
+            await self._cached_get(endpoint=f'tables/{table_id}/metadata', tags=self._table_tags(table_id)),
+        )
 
     async def table_metadata_update(
         self,
@@ -847,7 +2223,8 @@ class AsyncStorageClient(KeboolaServiceClient):
         if columns_metadata:
             payload['columnsMetadata'] = columns_metadata
 
-        return cast(JsonDict, await self.post(endpoint=f'tables/{table_id}/metadata', data=payload))
+        with self._invalidating(*self._table_tags(table_id)):
+            return cast(JsonDict, await self.post(endpoint=f'tables/{table_id}/metadata', data=payload))
 
     async def workspace_create(self, async_run: bool = True, read_only_storage_access: bool = False) -> JsonDict:
         """
@@ -872,18 +2249,56 @@ class AsyncStorageClient(KeboolaServiceClient):
         """
         return cast(JsonDict, await self.get(endpoint=f'branch/{self.branch_id}/workspaces/{workspace_id}'))
 
-    async def workspace_query(self, workspace_id: int, query: str) -> JsonDict:
+    async def workspace_delete(self, workspace_id: int) -> None:
+        """
+        Deletes a given workspace.
+
+        :param workspace_id: The id of the workspace
+        """
+        await self.delete(endpoint=f'branch/{self.branch_id}/workspaces/{workspace_id}')
+
+    async def workspace_query(
+        self, workspace_id: int, query: str, max_rows: int | None = None, max_bytes: int | None = None
+    ) -> JsonDict:
         """
         Executes a query in a given workspace.
 
+        The response is parsed as it arrives and the selected rows in `data.rows` are returned as tuples
+        of values in the order of `data.columns`. The chunks of the large responses are parsed in batches
+        in a worker thread not to block the event loop. The rows beyond the limits are dropped as they arrive
+        and the rest of the response is not read. `data.truncated` is set to True if any rows were dropped,
+        and `data.rows_size` is set to the size of the JSON of the returned rows.
+
         :param workspace_id: The id of the workspace
         :param query: The query to execute
+        :param max_rows: The maximum number of the returned rows
+        :param max_bytes: The maximum total size of the JSON of the returned rows
         :return: The SAPI call response - query result or raise an error.
         """
-        return cast(JsonDict, await self.post(
+        parser = _QueryResponseParser(max_rows=max_rows, max_bytes=max_bytes)
+        async with self.post_stream(
             endpoint=f'branch/{self.branch_id}/workspaces/{workspace_id}/query',
             data={'query': query},
-        ))
+            # read-only queries can be safely retried
+            idempotent=query.lstrip().lower().startswith(_READ_ONLY_SQL_PREFIXES),
+        ) as chunks:
+            batch: list[bytes] = []
+            batch_size = 0
+            parsed_in_thread = False
+            async for chunk in chunks:
+                batch.append(chunk)
+                batch_size += len(chunk)
+                if batch_size >= _THREAD_DECODE_MIN_SIZE:
+                    await asyncio.to_thread(parser.feed, b''.join(batch))
+                    batch, batch_size, parsed_in_thread = [], 0, True
+                    if parser.done:
+                        break
+        if batch:
+            parser.feed(b''.join(batch))
+        if parsed_in_thread:
+            # the rows may need converting to tuples if the columns follow them
+            return await asyncio.to_thread(parser.close)
+        return parser.close()
 
     async def workspace_list(self) -> list[JsonDict]:
         """
@@ -897,17 +2312,51 @@ class AsyncStorageClient(KeboolaServiceClient):
         """
         Checks the token privileges and returns information about the project to which the token belongs.
 
+        The information is cached until the token expires, but at most for an hour.
+
         :return: Token and project information
         """
-        return cast(JsonDict, await self.get(endpoint='tokens/verify'))
+        return copy.deepcopy((await self._get_verified_token()).token_data)
+
+    async def token_identity(self) -> TokenIdentity:
+        """
+        Retrieves the project and the organization the token belongs to.
+
+        :return: The token identity
+        """
+        return (await self._get_verified_token()).identity
+
+    def verified_token_identity(self) -> TokenIdentity | None:
+        """Gets the identity of the token if the token has been verified and not expired, without calling the API."""
+        verified = self._VERIFIED_TOKENS.get((self.raw_client.base_api_url, self.token_hash))
+        if verified and verified.expires_at > time.time():
+            return verified.identity
+        return None
 
     async def project_id(self) -> str:
         """
         Retrieves the project id.
         :return: Project id.
         """
-        raw_data = cast(JsonDict, await self.get(endpoint='tokens/verify'))
-        return str(raw_data['owner']['id'])
+        return (await self.token_identity()).project_id
+
+    async def _get_verified_token(self) -> _VerifiedToken:
+        key = (self.raw_client.base_api_url, self.raw_client.token_hash)
+        if (verified := self._VERIFIED_TOKENS.get(key)) and verified.expires_at > time.time():
+            self._VERIFIED_TOKENS.move_to_end(key)
+            return verified
+
+        token_data = cast(JsonDict, await self.get(endpoint='tokens/verify'))
+        identity = TokenIdentity.from_token_data(token_data)
+        expires_at = time.time() + self._VERIFIED_TOKEN_MAX_AGE
+        if identity.expires_at:
+            expires_at = min(expires_at, identity.expires_at.timestamp())
+
+        verified = self._VERIFIED_TOKENS[key] = _VerifiedToken(token_data, identity, expires_at)
+        self._VERIFIED_TOKENS.move_to_end(key)
+        while len(self._VERIFIED_TOKENS) > self._MAX_VERIFIED_TOKENS:
+            self._VERIFIED_TOKENS.popitem(last=False)
+        return verified
 
 
 class JobsQueueClient(KeboolaServiceClient):
@@ -916,16 +2365,28 @@ class JobsQueueClient(KeboolaServiceClient):
     """
 
     @classmethod
-    def create(cls, root_url: str, token: str, headers: dict[str, Any] | None = None) -> 'JobsQueueClient':
+    def create(
+        cls,
+        root_url: str,
+        token: str,
+        headers: dict[str, Any] | None = None,
+        http_pool: HttpClientPool | None = None,
+        hedged_requests: Collection[HedgedRequest] = (),
+    ) -> 'JobsQueueClient':
         """
         Creates a JobsQueue client.
 
         :param root_url: Root url of API. e.g. "https://queue.keboola.com/".
         :param token: A key for the Storage API. Can be found in the storage console.
         :param headers: Additional headers for the requests.
+        :param http_pool: The pool of long-lived HTTP clients.
+        :param hedged_requests: The requests that are hedged by a second request when the first one is slow.
         :return: A new instance of JobsQueueClient.
         """
-        return cls(raw_client=RawKeboolaClient(base_api_url=root_url, api_token=token, headers=headers))
+        return cls(
+            raw_client=RawKeboolaClient(base_api_url=root_url, api_token=token, headers=headers, http_pool=http_pool),
+            hedged_requests=hedged_requests,
+        )
 
     async def get_job_detail(self, job_id: str) -> JsonDict:
         """
@@ -935,7 +2396,7 @@ class JobsQueueClient(KeboolaServiceClient):
         :return: Job details as dictionary.
         """
 
-        return cast(JsonDict, await self.get(endpoint=f'jobs/{job_id}'))
+        return cast(JsonDict, await self.get(endpoint=f'jobs/{job_id}', hedged_as='job_detail'))
 
     async def search_jobs_by(
         self,
@@ -1060,19 +2521,67 @@ class ComponentSuggestionResponse(BaseModel):
 
 
 class AIServiceClient(KeboolaServiceClient):
-    """Async client for Keboola AI Service."""
+    """
+    Async client for Keboola AI Service.
+
+    The component details are also available from the Storage API, so they are requested with a short timeout
+    and without retries, and the tools fall back to the Storage API rather than wait for the slow service.
+    """
+
+    CATALOG_TIMEOUT = httpx.Timeout(connect=5.0, read=10.0, write=10.0, pool=5.0)
+    CATALOG_RETRY_POLICY = RetryPolicy(max_attempts=1)
+
+    def __init__(
+        self,
+        raw_client: RawKeboolaClient,
+        catalog_client: RawKeboolaClient | None = None,
+        hedged_requests: Collection[HedgedRequest] = (),
+    ) -> None:
+        """
+        :param raw_client: The raw client to use
+        :param catalog_client: The raw client to get the component details with, the raw client is used if not set
+        :param hedged_requests: The requests that are hedged by a second request when the first one is slow
+        """
+        super().__init__(raw_client=raw_client, hedged_requests=hedged_requests)
+        self._catalog_client = catalog_client or raw_client
 
     @classmethod
-    def create(cls, root_url: str, token: str, headers: dict[str, Any] | None = None) -> 'AIServiceClient':
+    def create(
+        cls,
+        root_url: str,
+        token: str,
+        headers: dict[str, Any] | None = None,
+        http_pool: HttpClientPool | None = None,
+    ) -> 'AIServiceClient':
         """
         Creates an AIServiceClient from a Keboola Storage API token.
 
         :param root_url: The root URL of the AI service API.
         :param token: The Keboola Storage API token.
         :param headers: Additional headers for the requests.
+        :param http_pool: The pool of long-lived HTTP clients.
         :return: A new instance of AIServiceClient.
         """
-        return cls(raw_client=RawKeboolaClient(base_api_url=root_url, api_token=token, headers=headers))
+        # the tools fail fast or fall back to the Storage API rather than waiting for the failing service
+        circuit_breaker = CircuitBreaker.for_service(httpx.URL(root_url).host)
+        return cls(
+            raw_client=RawKeboolaClient(
+                base_api_url=root_url,
+                api_token=token,
+                headers=headers,
+                http_pool=http_pool,
+                circuit_breaker=circuit_breaker,
+            ),
+            catalog_client=RawKeboolaClient(
+                base_api_url=root_url,
+                api_token=token,
+                headers=headers,
+                timeout=cls.CATALOG_TIMEOUT,
+                http_pool=http_pool,
+                retry_policy=cls.CATALOG_RETRY_POLICY,
+                circuit_breaker=circuit_breaker,
+            ),
+        )
 
     async def get_component_detail(self, component_id: str) -> JsonDict:
         """
@@ -1081,7 +2590,7 @@ class AIServiceClient(KeboolaServiceClient):
         :param component_id: The id of the component.
         :return: Component details as dictionary.
         """
-        return cast(JsonDict, await self.get(endpoint=f'docs/components/{component_id}'))
+        return cast(JsonDict, await self._catalog_client.get(endpoint=f'docs/components/{component_id}'))
 
     async def docs_question(self, query: str) -> DocsQuestionResponse:
         """
@@ -1093,6 +2602,8 @@ class AIServiceClient(KeboolaServiceClient):
             endpoint='docs/question',
             data={'query': query},
             headers={'Accept': 'application/json'},
+            # the question does not modify anything and can be safely retried
+            idempotent=True,
         )
 
         return DocsQuestionResponse.model_validate(response)
@@ -1107,6 +2618,7 @@ class AIServiceClient(KeboolaServiceClient):
             endpoint='suggest/component',
             data={'prompt': query},
             headers={'Accept': 'application/json'},
+            idempotent=True,
         )
 
         return ComponentSuggestionResponse.model_validate(response)
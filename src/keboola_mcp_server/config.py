@@ -11,7 +11,13 @@ _NO_VALUE_MARKER = '__NO_VALUE_MARKER__'
 
 @dataclass(frozen=True)
 class Config:
-    """Server configuration."""
+    """
+    Server configuration.
+
+    The fields with the 'server_only' metadata bound the memory, the disk space and the connections used by
+    the server, or the load the server puts on the Keboola services. They can only be set by the server's command
+    line options or environment variables, not by the HTTP headers or the URL query parameters of the MCP clients.
+    """
 
     storage_api_url: Optional[str] = None
     """The URL to the Storage API."""
@@ -35,6 +41,34 @@ class Config:
     """The secret key for encoding and decoding JWT tokens."""
     bearer_token: Optional[str] = None
     """The access-token issued by Keboola OAuth server to be sent in 'Authorization: Bearer <access-token>' header."""
+    http_max_connections: Optional[int] = field(default=None, metadata={'server_only': True})
+    """The maximum number of concurrent connections to a single Keboola service."""
+    http_max_keepalive_connections: Optional[int] = field(default=None, metadata={'server_only': True})
+    """The maximum number of idle connections kept alive to a single Keboola service."""
+    http_keepalive_expiry: Optional[float] = field(default=None, metadata={'server_only': True})
+    """The number of seconds after which the idle connections are closed."""
+    http2: Optional[bool] = field(default=None, metadata={'server_only': True})
+    """If true, the requests to Keboola services are multiplexed over HTTP/2 connections."""
+    storage_cache_ttl: Optional[float] = field(default=None, metadata={'server_only': True})
+    """The number of seconds the Storage API metadata responses are cached for, 0 disables the cache."""
+    workspace_prewarm: Optional[bool] = field(default=None, metadata={'server_only': True})
+    """If true, the workspace is looked up or created in the background as soon as the session starts."""
+    hedged_requests: Optional[str] = field(default=None, metadata={'server_only': True})
+    """
+    Comma-separated kinds of requests that are hedged by a second request when the first one is slow,
+    any of 'table_detail', 'configuration_detail' and 'job_detail'.
+    """
+    query_cache_size: Optional[int] = field(default=None, metadata={'server_only': True})
+    """The maximum total size in bytes of the SQL query results cached for all sessions, 0 disables the cache."""
+    query_buffer_size: Optional[int] = field(default=None, metadata={'server_only': True})
+    """
+    The maximum total size in bytes of the SQL query results of all sessions kept for paging through them,
+    0 disables the buffer and the pages are selected by re-running the queries.
+    """
+    query_output_dir: Optional[str] = field(default=None, metadata={'server_only': True})
+    """The local directory where the SQL query results in the binary formats (Arrow, Parquet) are written to."""
+    metrics_endpoint: Optional[bool] = field(default=None, metadata={'server_only': True})
+    """If true, the metrics of the requests to Keboola services are served at the unauthenticated /metrics route."""
 
     def __post_init__(self) -> None:
         for f in dataclasses.fields(self):
@@ -51,10 +85,12 @@ class Config:
         return name.lower().replace('_', '').replace('-', '')
 
     @classmethod
-    def _read_options(cls, d: Mapping[str, str]) -> Mapping[str, Any]:
+    def _read_options(cls, d: Mapping[str, str], trusted: bool = True) -> Mapping[str, Any]:
         data = {cls._normalize(k): v for k, v, in d.items()}
         options: dict[str, Any] = {}
         for f in dataclasses.fields(cls):
+            if not trusted and f.metadata.get('server_only'):
+                continue
             field_names = [f.name] + f.metadata.get('aliases', [])
 
             for name in field_names:
@@ -76,6 +112,10 @@ class Config:
                         options[f.name] = value.lower() in ('true', 'yes', '1')
                     elif f.type is Optional[str]:
                         options[f.name] = value
+                    elif f.type is Optional[int]:
+                        options[f.name] = int(value) if value is not None else None
+                    elif f.type is Optional[float]:
+                        options[f.name] = float(value) if value is not None else None
                     else:
                         raise ValueError(f'Unsupported type {f.type} for field {f.name}')
                     break
@@ -91,13 +131,17 @@ class Config:
         """
         return cls(**cls._read_options(d))
 
-    def replace_by(self, d: Mapping[str, str]) -> 'Config':
+    def replace_by(self, d: Mapping[str, str], trusted: bool = True) -> 'Config':
         """
         Creates new `Config` instance from the existing one by replacing the values from the input mapping.
         The keys in the input mapping can either be the names of the fields in `Config` class
         or their uppercase variant prefixed with 'KBC_'.
+
+        :param d: The mapping with the new values
+        :param trusted: If False, the mapping comes from the MCP clients (HTTP headers, URL query parameters)
+            and the values of the fields that can only be set by the server are ignored
         """
-        return dataclasses.replace(self, **self._read_options(d))
+        return dataclasses.replace(self, **self._read_options(d, trusted=trusted))
 
     def __repr__(self) -> str:
         params: list[str] = []
@@ -6,6 +6,11 @@ LOG = logging.getLogger(__name__)
 
 F = TypeVar('F', bound=Callable[..., Any])
 
+# The decorators of the tool functions can expose a `(prepare_call, fn)` tuple under this attribute, which lets
+# `tool_errors` call `prepare_call(args, kwargs)` and the tool function `fn` from its own wrapper instead of nesting
+# one more coroutine per call.
+PREPARE_CALL_ATTR = '__keboola_prepare_call__'
+
 
 class ToolException(Exception):
     """Custom tool exception class that wraps tool execution errors."""
@@ -29,10 +34,14 @@ def tool_errors(
 
     def decorator(func: Callable):
 
+        prepare_call, target = getattr(func, PREPARE_CALL_ATTR, (None, func))
+
         @wraps(func)
         async def wrapped(*args, **kwargs):
             try:
-                return await func(*args, **kwargs)
+                if prepare_call:
+                    prepare_call(args, kwargs)
+                return await target(*args, **kwargs)
             except Exception as e:
                 logging.exception(f'Failed to run tool {func.__name__}: {e}')
 
@@ -48,6 +57,8 @@ def tool_errors(
 
                 raise ToolException(e, recovery_msg) from e
 
+        # the wrapped function is called through `prepare_call` and `target` only once
+        wrapped.__dict__.pop(PREPARE_CALL_ATTR, None)
         return cast(F, wrapped)
 
     return decorator
@@ -0,0 +1,268 @@
+"""Output formats of the data selected by SQL queries."""
+
+import abc
+import csv
+import importlib.util
+import logging
+import re
+import time
+import uuid
+from io import StringIO
+from pathlib import Path
+from typing import Any, Mapping
+
+from keboola_mcp_server.client import encode_json
+from keboola_mcp_server.workspace import SqlSelectData
+
+LOG = logging.getLogger(__name__)
+
+
+class ResultFormatter(abc.ABC):
+    """Formats the selected data to the text returned by the tools."""
+
+    name: str
+    description: str
+
+    @abc.abstractmethod
+    def format(self, data: SqlSelectData) -> str:
+        """Formats the data to the text."""
+        pass
+
+
+class ResultFileFormatter(abc.ABC):
+    """Writes the selected data to a local file, the tools only return the path to the file."""
+
+    name: str
+    description: str
+    extension: str
+
+    def check_available(self) -> None:
+        """
+        Checks that the packages needed to write the files are installed.
+
+        :raises ValueError: If a needed package is not installed
+        """
+        pass
+
+    @abc.abstractmethod
+    def write(self, data: SqlSelectData, path: Path) -> None:
+        """Writes the data to the file."""
+        pass
+
+
+class CsvFormatter(ResultFormatter):
+    name = 'csv'
+    description = 'CSV with the header row'
+
+    def format(self, data: SqlSelectData) -> str:
+        output = StringIO()
+        writer = csv.writer(output)
+        writer.writerow(data.columns)
+        writer.writerows(data.rows)
+        return output.getvalue()
+
+
+class JsonFormatter(ResultFormatter):
+    name = 'json'
+    description = 'JSON object with the list of columns and the rows as arrays of values'
+
+    def format(self, data: SqlSelectData) -> str:
+        return encode_json({'columns': list(data.columns), 'rows': [list(row) for row in data.rows]}).decode('utf-8')
+
+
+class JsonLinesFormatter(ResultFormatter):
+    name = 'jsonl'
+    description = 'JSON Lines, one JSON object of column: value pairs per row'
+
+    def format(self, data: SqlSelectData) -> str:
+        columns = list(data.columns)
+        return ''.join(encode_json(dict(zip(columns, row))).decode('utf-8') + '\n' for row in data.rows)
+
+
+class MarkdownFormatter(ResultFormatter):
+    name = 'markdown'
+    description = 'Markdown table'
+
+    @staticmethod
+    def _cell(value: Any) -> str:
+        if value is None:
+            return ''
+        return str(value).replace('\\', '\\\\').replace('|', '\\|').replace('\r\n', '<br>').replace('\n', '<br>')
+
+    def format(self, data: SqlSelectData) -> str:
+        lines = [
+            '| ' + ' | '.join(self._cell(column) for column in data.columns) + ' |',
+            '|' + '---|' * len(data.columns),
+        ]
+        lines.extend('| ' + ' | '.join(self._cell(value) for value in row) + ' |' for row in data.rows)
+        return '\n'.join(lines) + '\n'
+
+
+class _PyArrowFormatter(ResultFileFormatter, abc.ABC):
+    def check_available(self) -> None:
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ValueError(
+                f"The '{self.name}' format requires the 'pyarrow' package, install the server with the 'arrow' extra: "
+                "pip install 'keboola-mcp-server[arrow]'"
+            )
+
+    @staticmethod
+    def _to_table(data: SqlSelectData) -> Any:
+        import pyarrow as pa
+
+        arrays = []
+        for idx in range(len(data.columns)):
+            values = [row[idx] for row in data.rows]
+            try:
+                arrays.append(pa.array(values))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # the values of mixed types are kept as strings
+                arrays.append(pa.array([None if value is None else str(value) for value in values], pa.string()))
+        return pa.Table.from_arrays(arrays, names=list(data.columns))
+
+
+class ArrowFormatter(_PyArrowFormatter):
+    name = 'arrow'
+    description = 'Apache Arrow IPC file'
+    extension = 'arrow'
+
+    def write(self, data: SqlSelectData, path: Path) -> None:
+        import pyarrow as pa
+
+        table = self._to_table(data)
+        with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+class ParquetFormatter(_PyArrowFormatter):
+    name = 'parquet'
+    description = 'Apache Parquet file'
+    extension = 'parquet'
+
+    def write(self, data: SqlSelectData, path: Path) -> None:
+        import pyarrow.parquet as pq
+
+        pq.write_table(self._to_table(data), str(path))
+
+
+_FORMATTERS: dict[str, ResultFormatter | ResultFileFormatter] = {}
+
+
+def register_formatter(formatter: ResultFormatter | ResultFileFormatter) -> None:
+    """
+    Registers the output format, the formatter registered later replaces the one with the same name.
+
+    :param formatter: The formatter of the output format
+    """
+    _FORMATTERS[formatter.name] = formatter
+
+
+def get_formatter(name: str) -> ResultFormatter | ResultFileFormatter:
+    """
+    Gets the formatter of the output format.
+
+    :param name: The name of the output format
+    :return: The formatter
+    :raises ValueError: If no such output format is registered
+    """
+    if (formatter := _FORMATTERS.get(name)) is None:
+        raise ValueError(f'Unsupported output format: {name}, the supported formats are: {", ".join(_FORMATTERS)}.')
+    return formatter
+
+
+def get_formats() -> Mapping[str, str]:
+    """Gets the names and the descriptions of the registered output formats."""
+    return {name: formatter.description for name, formatter in _FORMATTERS.items()}
+
+
+for _formatter in (
+    CsvFormatter(),
+    JsonFormatter(),
+    JsonLinesFormatter(),
+    MarkdownFormatter(),
+    ArrowFormatter(),
+    ParquetFormatter(),
+):
+    register_formatter(_formatter)
+
+
+class ResultFileWriter:
+    """
+    Writes the selected data to the files in the local output directory.
+
+    The files written earlier are removed when they get older than `max_age` seconds or when there are more than
+    `max_files` of them, the oldest files first. Only the files named by this writer are removed.
+    """
+
+    STATE_KEY = 'result_file_writer'
+    DEFAULT_MAX_AGE = 24 * 60 * 60.0
+    DEFAULT_MAX_FILES = 100
+
+    _FILE_NAME = re.compile(r'^query-[0-9a-f]{32}\.\w+$')
+
+    @classmethod
+    def from_state(cls, state: Mapping[str, Any]) -> 'ResultFileWriter':
+        instance = state.get(cls.STATE_KEY)
+        if instance is None:
+            raise ValueError(
+                'The output directory for the query results is not configured, set it by the --query-output-dir '
+                'option or the KBC_QUERY_OUTPUT_DIR environment variable, or use a text output format.'
+            )
+        assert isinstance(instance, ResultFileWriter), f'Expected ResultFileWriter, got: {instance}'
+        return instance
+
+    def __init__(
+        self, output_dir: str | Path, max_age: float = DEFAULT_MAX_AGE, max_files: int = DEFAULT_MAX_FILES
+    ) -> None:
+        """
+        :param output_dir: The directory the files are written to, it is created if it does not exist
+        :param max_age: The number of seconds the written files are kept for
+        :param max_files: The maximum number of the kept files, including the newly written one
+        """
+        self._output_dir = Path(output_dir).expanduser().resolve()
+        self._max_age = max_age
+        self._max_files = max_files
+
+    @property
+    def output_dir(self) -> Path:
+        return self._output_dir
+
+    def write(self, data: SqlSelectData, formatter: ResultFileFormatter) -> Path:
+        """
+        Writes the data to a new file.
+
+        The writing blocks, the callers running in the event loop should run it in a worker thread.
+
+        :param data: The data to write
+        :param formatter: The formatter of the file format
+        :return: The absolute path to the written file
+        """
+        formatter.check_available()
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        self._remove_old_files()
+        path = self._output_dir / f'query-{uuid.uuid4().hex}.{formatter.extension}'
+        formatter.write(data, path)
+        LOG.info(f'Written {len(data.rows)} rows to {path}.')
+        return path
+
+    def _remove_old_files(self) -> None:
+        """Removes the expired files and the oldest files beyond the limit, leaving room for a new file."""
+        files: list[tuple[float, Path]] = []
+        for path in self._output_dir.iterdir():
+            if self._FILE_NAME.match(path.name):
+                try:
+                    files.append((path.stat().st_mtime, path))
+                except OSError:
+                    pass  # removed meanwhile
+
+        files.sort()
+        expires_at = time.time() - self._max_age
+        keep_count = max(0, self._max_files - 1)
+        for idx, (mtime, path) in enumerate(files):
+            if mtime >= expires_at and len(files) - idx <= keep_count:
+                break
+            try:
+                path.unlink(missing_ok=True)
+                LOG.info(f'Removed the old query result file {path}.')
+            except OSError as e:
+                LOG.warning(f'Failed to remove the old query result file {path}: {e}')
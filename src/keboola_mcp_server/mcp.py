@@ -4,31 +4,140 @@ into tool descriptions.
 It also provides a decorator that MCP tool functions can use to inject session state into their Context parameter.
 """
 import dataclasses
+import hashlib
 import inspect
 import logging
 import textwrap
-from dataclasses import dataclass
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from functools import wraps
-from typing import Any, cast
+from typing import Any, cast, get_args
 
 from fastmcp import Context, FastMCP
 from fastmcp.server.dependencies import get_http_request
 from fastmcp.utilities.types import find_kwarg_by_type
 from mcp.server.auth.middleware.bearer_auth import AuthenticatedUser
-from mcp.types import AnyFunction, ToolAnnotations
+from mcp.types import AnyFunction, Tool, ToolAnnotations
 from starlette.requests import Request
 
-from keboola_mcp_server.client import KeboolaClient
+from keboola_mcp_server.client import HedgedRequest, HttpClientPool, KeboolaClient, ResponseCache
 from keboola_mcp_server.config import Config
+from keboola_mcp_server.errors import PREPARE_CALL_ATTR
+from keboola_mcp_server.formats import ResultFileWriter
 from keboola_mcp_server.oauth import ProxyAccessToken
-from keboola_mcp_server.workspace import WorkspaceManager
+from keboola_mcp_server.workspace import QueryResultBuffer, QueryResultCache, WorkspaceManager
 
 LOG = logging.getLogger(__name__)
 
 
+@dataclass
+class _SessionStateEntry:
+    state: dict[str, Any]
+    expires_at: float
+    token_expires_at: float | None
+
+
+class SessionStateRegistry:
+    """
+    The process-wide registry of the session states shared by the sessions with the same configuration.
+
+    Creating the session state for each new session throws away the warm `KeboolaClient` and `WorkspaceManager`
+    instances along with the workspace they found and the table names they resolved. The registry keeps the states
+    keyed by a hash of the configuration, which includes the Storage API URL, the tokens and the workspace schema.
+    The states expire when they are not used for `ttl` seconds or when their token expires, the least recently
+    used states are evicted first. The expiration of a Storage API token is known once the token is verified.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 256) -> None:
+        """
+        :param ttl: The number of seconds the unused session states are kept for
+        :param max_entries: The maximum number of kept session states
+        """
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, _SessionStateEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _get_key(config: Config) -> str:
+        # all configuration values are used, the state must not be shared by sessions with different settings
+        return hashlib.sha256(repr(dataclasses.astuple(config)).encode('utf-8')).hexdigest()
+
+    def get(self, config: Config) -> dict[str, Any] | None:
+        """
+        Gets the session state created for the configuration.
+
+        :param config: The configuration of the session
+        :return: A new dictionary with the shared `KeboolaClient` and `WorkspaceManager` or None if no valid
+            session state exists
+        """
+        key = self._get_key(config)
+        if (entry := self._entries.get(key)) is None:
+            return None
+        now = time.time()
+        if self._is_expired(entry, now):
+            del self._entries[key]
+            return None
+        entry.expires_at = now + self._ttl
+        self._entries.move_to_end(key)
+        # the sessions can set their own keys, only the values are shared
+        return dict(entry.state)
+
+    def put(self, config: Config, state: dict[str, Any], token_expires_at: float | None = None) -> None:
+        """
+        Stores the session state created for the configuration.
+
+        :param config: The configuration of the session
+        :param state: The session state
+        :param token_expires_at: The time when the token in the configuration expires, if known
+        """
+        now = time.time()
+        for expired_key in [key for key, entry in self._entries.items() if self._is_expired(entry, now)]:
+            del self._entries[expired_key]
+        key = self._get_key(config)
+        self._entries[key] = _SessionStateEntry(dict(state), now + self._ttl, token_expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _is_expired(entry: _SessionStateEntry, now: float) -> bool:
+        if entry.token_expires_at is None:
+            client = entry.state.get(KeboolaClient.STATE_KEY)
+            if isinstance(client, KeboolaClient) and (identity := client.storage_client.verified_token_identity()):
+                if identity.expires_at:
+                    entry.token_expires_at = identity.expires_at.timestamp()
+        return entry.expires_at < now or (entry.token_expires_at is not None and entry.token_expires_at < now)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
 @dataclass
 class ServerState:
     config: Config
+    http_pool: HttpClientPool | None = None
+    session_states: SessionStateRegistry = field(default_factory=SessionStateRegistry)
+    # the query results of all sessions share one cache and one buffer bounded by the server configuration
+    query_cache: QueryResultCache | None = field(init=False)
+    result_buffer: QueryResultBuffer | None = field(init=False)
+
+    def __post_init__(self) -> None:
+        query_cache_size = (
+            self.config.query_cache_size
+            if self.config.query_cache_size is not None
+            else QueryResultCache.DEFAULT_MAX_BYTES
+        )
+        query_buffer_size = (
+            self.config.query_buffer_size
+            if self.config.query_buffer_size is not None
+            else QueryResultBuffer.DEFAULT_MAX_BYTES
+        )
+        self.query_cache = QueryResultCache(max_bytes=query_cache_size) if query_cache_size else None
+        self.result_buffer = QueryResultBuffer(max_bytes=query_buffer_size) if query_buffer_size else None
 
     @classmethod
     def from_context(cls, ctx: Context) -> 'ServerState':
@@ -37,6 +146,23 @@ class ServerState:
             raise ValueError('ServerState is not available in the context.')
         return server_state
 
+    def get_session_state(self, config: Config, token_expires_at: float | None = None) -> dict[str, Any]:
+        """
+        Gets the session state shared by the sessions with the same configuration or creates a new one.
+
+        :param config: The configuration of the session
+        :param token_expires_at: The time when the token in the configuration expires, if known
+        :return: The session state
+        """
+        if (state := self.session_states.get(config)) is None:
+            state = _create_session_state(
+                config, self.http_pool, query_cache=self.query_cache, result_buffer=self.result_buffer
+            )
+            self.session_states.put(config, state, token_expires_at=token_expires_at)
+            if config.workspace_prewarm:
+                WorkspaceManager.from_state(state).prewarm()
+        return state
+
 
 class KeboolaMcpServer(FastMCP):
 
@@ -57,9 +183,57 @@ class KeboolaMcpServer(FastMCP):
             annotations=annotations,
         )
 
+    async def _mcp_list_tools(self) -> list[Tool]:
+        # the clients list the tools right after initializing the session
+        self._prewarm_session()
+        return await super()._mcp_list_tools()
+
+    def _prewarm_session(self) -> None:
+        """
+        Creates the session state if the session's configuration enables the workspace prewarming, so that
+        the workspace is looked up or created before the first tool call rather than by it.
+        """
+        try:
+            ctx = Context(fastmcp=self)
+            if getattr(ctx.session, 'state', None):
+                return
+            server_state = ServerState.from_context(ctx)
+            config, token_expires_at = _get_session_config(server_state)
+            if config.workspace_prewarm:
+                ctx.session.state = server_state.get_session_state(config, token_expires_at=token_expires_at)
+        except Exception as e:
+            # the tool calls report the problems with the configuration
+            LOG.warning(f'Failed to prewarm the session: {e}')
 
-def _create_session_state(config: Config) -> dict[str, Any]:
-    """Creates `KeboolaClient` and `WorkspaceManager` instances and returns them in the session state."""
+
+def _parse_hedged_requests(value: str | None) -> list[HedgedRequest]:
+    """Parses the comma-separated kinds of hedged requests, the unknown kinds are ignored."""
+    hedged_requests: list[HedgedRequest] = []
+    for name in (value or '').split(','):
+        if not (name := name.strip()):
+            continue
+        if name in get_args(HedgedRequest):
+            hedged_requests.append(cast(HedgedRequest, name))
+        else:
+            LOG.warning(f'Unknown kind of hedged request: {name}')
+    return hedged_requests
+
+
+def _create_session_state(
+    config: Config,
+    http_pool: HttpClientPool | None = None,
+    query_cache: QueryResultCache | None = None,
+    result_buffer: QueryResultBuffer | None = None,
+) -> dict[str, Any]:
+    """
+    Creates `KeboolaClient` and `WorkspaceManager` instances and returns them in the session state.
+
+    :param config: The configuration of the session
+    :param http_pool: The pool of the HTTP clients shared by the sessions
+    :param query_cache: The cache of the SQL SELECT results shared by the sessions, no results are cached if None
+    :param result_buffer: The buffer of the paged SQL SELECT results shared by the sessions
+    :return: The session state
+    """
     LOG.info(f'Creating SessionState from config: {config}.')
 
     state: dict[str, Any] = {}
@@ -68,7 +242,16 @@ def _create_session_state(config: Config) -> dict[str, Any]:
             raise ValueError('Storage API token is not provided.')
         if not config.storage_api_url:
             raise ValueError('Storage API URL is not provided.')
-        client = KeboolaClient(config.storage_token, config.storage_api_url, bearer_token=config.bearer_token)
+        client = KeboolaClient(
+            config.storage_token,
+            config.storage_api_url,
+            bearer_token=config.bearer_token,
+            http_pool=http_pool,
+            storage_cache_ttl=(
+                config.storage_cache_ttl if config.storage_cache_ttl is not None else ResponseCache.DEFAULT_TTL
+            ),
+            hedged_requests=_parse_hedged_requests(config.hedged_requests),
+        )
         state[KeboolaClient.STATE_KEY] = client
         LOG.info('Successfully initialized Storage API client.')
     except Exception as e:
@@ -76,16 +259,62 @@ def _create_session_state(config: Config) -> dict[str, Any]:
         raise
 
     try:
-        workspace_manager = WorkspaceManager(client, config.workspace_schema)
+        workspace_manager = WorkspaceManager(
+            client, config.workspace_schema, query_cache=query_cache, result_buffer=result_buffer
+        )
         state[WorkspaceManager.STATE_KEY] = workspace_manager
         LOG.info('Successfully initialized Storage API Workspace manager.')
     except Exception as e:
         LOG.error(f'Failed to initialize Storage API Workspace manager: {e}')
         raise
 
+    if config.query_output_dir:
+        state[ResultFileWriter.STATE_KEY] = ResultFileWriter(config.query_output_dir)
+
     return state
 
 
+def _replace_config(config: Config, items: tuple[tuple[str, str], ...]) -> Config:
+    """
+    Replaces the configuration values by the HTTP headers or the query parameters.
+
+    The parsing runs once per session, when its state is set. The result is not memoized: the headers differ
+    per session (e.g. mcp-session-id), and the tokens in them must not be kept in a module-global cache.
+    """
+    return config.replace_by(dict(items), trusted=False)
+
+
+def _get_session_config(server_state: ServerState) -> tuple[Config, float | None]:
+    """
+    Gets the configuration of the current session composed of the server configuration, the HTTP headers,
+    the URL query parameters and the OAuth tokens.
+
+    :param server_state: The state of the server
+    :return: The configuration and the time when its token expires, if known
+    """
+    config = server_state.config
+    accept_secrets_in_url = config.accept_secrets_in_url
+    token_expires_at: float | None = None
+
+    if http_rq := _get_http_request():
+        config = _replace_config(config, tuple(http_rq.headers.items()))
+        if accept_secrets_in_url:
+            config = _replace_config(config, tuple(http_rq.query_params.multi_items()))
+
+        if 'user' in http_rq.scope and isinstance(http_rq.user, AuthenticatedUser):
+            user = cast(AuthenticatedUser, http_rq.user)
+            LOG.debug(f'Injecting bearer and SAPI tokens from ProxyAccessToken: {user.access_token}')
+            assert isinstance(user.access_token, ProxyAccessToken)
+            config = dataclasses.replace(
+                config,
+                storage_token=user.access_token.sapi_token,
+                bearer_token=user.access_token.delegate.token
+            )
+            token_expires_at = user.access_token.expires_at
+
+    return config, token_expires_at
+
+
 def _get_http_request() -> Request | None:
     try:
         return get_http_request()
@@ -108,6 +337,8 @@ def with_session_state() -> AnyFunction:
 
     Note: HTTP headers and URL query parameters are only used when the server runs on HTTP-based transport.
 
+    The sessions with the same configuration share the session state kept in the server's `SessionStateRegistry`.
+
     Usage example:
     ```python
     @with_session_state()
@@ -120,57 +351,54 @@ def with_session_state() -> AnyFunction:
         """
         :param fn: The tool function to decorate.
         """
+        # the signature of the tool function is inspected once, not on each call
+        ctx_kwarg = find_kwarg_by_type(fn, Context)
+        ctx_position = list(inspect.signature(fn).parameters).index(ctx_kwarg) if ctx_kwarg else -1
 
-        @wraps(fn)
-        async def _inject_session_state(*args, **kwargs) -> Any:
+        def _prepare_call(args: tuple[Any, ...], kwargs: dict[str, Any]) -> None:
             """
-            Injects the session state into the Context parameter of the tool function. The injection is executed
-            by the MCP server when the annotated tool function is called.
+            Injects the session state into the Context parameter of the tool function.
+
             :param args: Positional arguments of the tool function
             :param kwargs: Keyword arguments of the tool function
             :raises TypeError: If no Context argument is found in the function parameters
-            :returns: Result of the tool function
             """
-            # finds the Context type argument name in the function parameters
-            ctx_kwarg = find_kwarg_by_type(fn, Context)
             if ctx_kwarg is None:
                 raise TypeError(
                     'Context argument is required, add "ctx: Context" parameter to the function parameters.'
                 )
-            # convert positional args to kwargs using inspect.signature in case context is passed as positional arg
-            updated_kwargs = inspect.signature(fn).bind(*args, **kwargs).arguments
-            ctx = updated_kwargs.get(ctx_kwarg) if ctx_kwarg else None
+            if ctx_kwarg in kwargs:
+                ctx = kwargs[ctx_kwarg]
+            else:
+                # the context is passed as a positional argument
+                ctx = args[ctx_position] if len(args) > ctx_position else None
 
             if not isinstance(ctx, Context):
                 raise TypeError(f'The "ctx" argument must be of type Context, got {type(ctx)}.')
 
             if not getattr(ctx.session, 'state', None):
                 # This is here to allow mocking the context.session.state in tests.
-                config = ServerState.from_context(ctx).config
-                accept_secrets_in_url = config.accept_secrets_in_url
-
-                if http_rq := _get_http_request():
-                    config = config.replace_by(http_rq.headers)
-                    if accept_secrets_in_url:
-                        config = config.replace_by(http_rq.query_params)
-
-                    if 'user' in http_rq.scope and isinstance(http_rq.user, AuthenticatedUser):
-                        user = cast(AuthenticatedUser, http_rq.user)
-                        LOG.debug(f'Injecting bearer and SAPI tokens from ProxyAccessToken: {user.access_token}')
-                        assert isinstance(user.access_token, ProxyAccessToken)
-                        config = dataclasses.replace(
-                            config,
-                            storage_token=user.access_token.sapi_token,
-                            bearer_token=user.access_token.delegate.token
-                        )
-
+                server_state = ServerState.from_context(ctx)
+                config, token_expires_at = _get_session_config(server_state)
                 # TODO: We could probably get rid of the 'state' attribute set on ctx.session and just
                 #  pass KeboolaClient and WorkspaceManager instances to a tool as extra parameters.
-                state = _create_session_state(config)
-                ctx.session.state = state
+                ctx.session.state = server_state.get_session_state(config, token_expires_at=token_expires_at)
 
+        @wraps(fn)
+        async def _inject_session_state(*args, **kwargs) -> Any:
+            """
+            Injects the session state into the Context parameter of the tool function. The injection is executed
+            by the MCP server when the annotated tool function is called.
+            :param args: Positional arguments of the tool function
+            :param kwargs: Keyword arguments of the tool function
+            :raises TypeError: If no Context argument is found in the function parameters
+            :returns: Result of the tool function
+            """
+            _prepare_call(args, kwargs)
             return await fn(*args, **kwargs)
 
+        # lets the outer decorators call the tool function directly, see `tool_errors`
+        setattr(_inject_session_state, PREPARE_CALL_ATTR, (_prepare_call, fn))
         return _inject_session_state
 
     return _wrapper
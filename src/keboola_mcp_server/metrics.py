@@ -0,0 +1,53 @@
+"""Process-wide metrics of the Keboola MCP server."""
+
+import threading
+from collections import defaultdict
+from typing import Any
+
+
+class Metrics:
+    """
+    A simple in-memory registry of counters and gauges.
+
+    The values are identified by a name and optional labels and are exposed by the server's `/metrics` endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, float]] = defaultdict(dict)
+        self._gauges: dict[str, dict[str, float]] = defaultdict(dict)
+
+    @staticmethod
+    def _labels_key(labels: dict[str, Any]) -> str:
+        return ','.join(f'{k}={v}' for k, v in sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Increments the counter by the given value."""
+        key = self._labels_key(labels)
+        with self._lock:
+            self._counters[name][key] = self._counters[name].get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Sets the gauge to the given value."""
+        key = self._labels_key(labels)
+        with self._lock:
+            self._gauges[name][key] = value
+
+    def get(self, name: str, **labels: Any) -> float:
+        """Gets the current value of the counter or the gauge, zero if the value has not been recorded yet."""
+        key = self._labels_key(labels)
+        with self._lock:
+            if key in self._gauges.get(name, {}):
+                return self._gauges[name][key]
+            return self._counters.get(name, {}).get(key, 0.0)
+
+    def snapshot(self) -> dict[str, dict[str, dict[str, float]]]:
+        """Returns a copy of all recorded values."""
+        with self._lock:
+            return {
+                'counters': {name: dict(values) for name, values in self._counters.items()},
+                'gauges': {name: dict(values) for name, values in self._gauges.items()},
+            }
+
+
+METRICS = Metrics()
@@ -7,6 +7,7 @@ from contextlib import AbstractAsyncContextManager, asynccontextmanager
 from importlib.metadata import distribution
 from typing import Callable
 
+import httpx
 from fastmcp import FastMCP
 from mcp.server.auth.settings import AuthSettings, ClientRegistrationOptions
 from pydantic import AliasChoices, AnyHttpUrl, BaseModel, Field
@@ -14,8 +15,10 @@ from starlette.exceptions import HTTPException
 from starlette.requests import Request
 from starlette.responses import JSONResponse, RedirectResponse, Response
 
+from keboola_mcp_server.client import DEFAULT_LIMITS, HttpClientPool
 from keboola_mcp_server.config import Config
 from keboola_mcp_server.mcp import KeboolaMcpServer, ServerState
+from keboola_mcp_server.metrics import METRICS
 from keboola_mcp_server.oauth import SimpleOAuthProvider
 from keboola_mcp_server.prompts.add_prompts import add_keboola_prompts
 from keboola_mcp_server.tools.components import add_component_tools
@@ -60,6 +63,19 @@ class ServiceInfoApiResp(BaseModel):
         serialization_alias='fastmcpLibraryVersion')
 
 
+def _create_http_pool(config: Config) -> HttpClientPool:
+    """Creates the pool of long-lived HTTP clients shared by all sessions."""
+    limits = httpx.Limits(
+        max_connections=config.http_max_connections or DEFAULT_LIMITS.max_connections,
+        max_keepalive_connections=config.http_max_keepalive_connections or DEFAULT_LIMITS.max_keepalive_connections,
+        keepalive_expiry=(
+            config.http_keepalive_expiry if config.http_keepalive_expiry is not None
+            else DEFAULT_LIMITS.keepalive_expiry
+        ),
+    )
+    return HttpClientPool(limits=limits, http2=bool(config.http2))
+
+
 def create_keboola_lifespan(
     config: Config | None = None,
 ) -> Callable[[FastMCP[ServerState]], AbstractAsyncContextManager[ServerState]]:
@@ -84,12 +100,19 @@ def create_keboola_lifespan(
         """
         # init server state
         init_config = config or Config()
-        server_state = ServerState(config=init_config)
+        http_pool = _create_http_pool(init_config)
+        server_state = ServerState(config=init_config, http_pool=http_pool)
+        if init_config.workspace_prewarm and init_config.storage_token:
+            # the sessions using the token from the server configuration (e.g. stdio) find the workspace ready
+            try:
+                server_state.get_session_state(init_config)
+            except Exception as e:
+                LOG.warning(f'Failed to prewarm the session state: {e}')
         try:
 
             yield server_state
         finally:
-            pass
+            await http_pool.aclose()
 
     return keboola_lifespan
 
@@ -163,6 +186,13 @@ def create_server(config: Config) -> FastMCP:
         resp = ServiceInfoApiResp(app_version=os.getenv('APP_VERSION') or _DEFAULT_APP_VERSION)
         return JSONResponse(resp.model_dump(by_alias=True))
 
+    if config.metrics_endpoint:
+        # the route is not authenticated, it is only served if the server is configured so
+        @mcp.custom_route('/metrics', methods=['GET'])
+        async def get_metrics(_rq: Request) -> Response:
+            """Returns the metrics of the client layer, e.g. the number of retried requests."""
+            return JSONResponse(METRICS.snapshot())
+
     @mcp.custom_route('/oauth/callback', methods=['GET'])
     async def oauth_callback_handler(request: Request) -> Response:
         """Handle GitHub OAuth callback."""
@@ -1,12 +1,13 @@
+import asyncio
 import logging
 import re
 import unicodedata
 from typing import Optional, Sequence, Union, cast, get_args
 
-from httpx import HTTPStatusError
+from httpx import HTTPStatusError, TransportError
 from pydantic import AliasChoices, BaseModel, Field
 
-from keboola_mcp_server.client import JsonDict, KeboolaClient
+from keboola_mcp_server.client import CircuitOpenError, JsonDict, KeboolaClient
 from keboola_mcp_server.tools.components.model import (
     AllComponentTypes,
     Component,
@@ -55,14 +56,17 @@ async def _retrieve_components_configurations_by_types(
     :param component_types: The component types/type to retrieve
     :return: A list of items, each containing a component and its associated configurations
     """
-    # retrieve components by types - unable to use list of types as parameter, we need to iterate over types
+    # retrieve components by types - unable to use list of types as parameter, we need to iterate over types;
+    # the requests are sent concurrently
+    raw_components_by_types = await asyncio.gather(
+        *(
+            client.storage_client.component_list(component_type=comp_type, include=['configuration'])
+            for comp_type in component_types
+        )
+    )
     components_with_configurations = []
 
-    for comp_type in component_types:
-
-        raw_components_with_configurations_by_type = await client.storage_client.component_list(
-            component_type=comp_type, include=['configuration']
-        )
+    for raw_components_with_configurations_by_type in raw_components_by_types:
         # extend the list with the raw components with configurations
         # TODO: ugly, refactor
         for raw_component in raw_components_with_configurations_by_type:
@@ -108,12 +112,13 @@ async def _retrieve_components_configurations_by_ids(
     :param component_ids: The component IDs to retrieve
     :return: A list of items, each containing a component and its associated configurations
     """
-    components_with_configurations = []
-    for component_id in component_ids:
-        # retrieve configurations for component ids
-        raw_configurations = await client.storage_client.configuration_list(component_id=component_id)
-        # retrieve components
-        raw_component = await client.storage_client.component_detail(component_id=component_id)
+
+    async def _retrieve_component_with_configurations(component_id: str) -> ComponentWithConfigurations:
+        # retrieve configurations and the component itself
+        raw_configurations, raw_component = await asyncio.gather(
+            client.storage_client.configuration_list(component_id=component_id),
+            client.storage_client.component_detail(component_id=component_id),
+        )
         # build component configurations list grouped by components
         raw_configuration_responses = [
             ComponentConfigurationResponse.model_validate({**raw_configuration, 'component_id': raw_component['id']})
@@ -123,13 +128,17 @@ async def _retrieve_components_configurations_by_ids(
             ComponentConfigurationMetadata.from_component_configuration_response(raw_response)
             for raw_response in raw_configuration_responses
         ]
+        return ComponentWithConfigurations(
+            component=ReducedComponent.model_validate(raw_component),
+            configurations=configurations_metadata,
+        )
 
-        components_with_configurations.append(
-            ComponentWithConfigurations(
-                component=ReducedComponent.model_validate(raw_component),
-                configurations=configurations_metadata,
-            )
+    # the components are retrieved concurrently
+    components_with_configurations = list(
+        await asyncio.gather(
+            *(_retrieve_component_with_configurations(component_id) for component_id in component_ids)
         )
+    )
 
     total_configurations = sum(len(component.configurations) for component in components_with_configurations)
     LOG.info(
@@ -148,7 +157,8 @@ async def _get_component(
 
     First tries to get component from the AI service catalog. If the component
     is not found (404) or returns empty data (private components), falls back to using the
-    Storage API endpoint.
+    Storage API endpoint. The Storage API is also used while the AI service is failing and its
+    circuit breaker rejects the requests, or when the AI service does not respond in time.
 
     Used in tools:
     - get_component_configuration_details
@@ -161,20 +171,24 @@ async def _get_component(
         raw_component = await client.ai_service_client.get_component_detail(component_id=component_id)
         LOG.info(f'Retrieved component {component_id} from AI service catalog.')
         return Component.model_validate(raw_component)
+    except CircuitOpenError:
+        LOG.info(f'AI service is unavailable, retrieving component {component_id} from Storage API.')
+    except TransportError as e:
+        LOG.warning(f'AI service failed: {e!r}, retrieving component {component_id} from Storage API.')
     except HTTPStatusError as e:
         if e.response.status_code == 404:
             LOG.info(
                 f'Component {component_id} not found in AI service catalog (possibly private). '
                 f'Falling back to Storage API.'
             )
-
-            raw_component = await client.storage_client.component_detail(component_id=component_id)
-            LOG.info(f'Retrieved component {component_id} from Storage API.')
-            return Component.model_validate(raw_component)
         else:
             # If it's not a 404, re-raise the error
             raise
 
+    raw_component = await client.storage_client.component_detail(component_id=component_id)
+    LOG.info(f'Retrieved component {component_id} from Storage API.')
+    return Component.model_validate(raw_component)
+
 
 def _get_sql_transformation_id_from_sql_dialect(
     sql_dialect: str,
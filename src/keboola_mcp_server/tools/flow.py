@@ -1,5 +1,6 @@
 """Flow management tools for the MCP server (orchestrations/flows)."""
 
+import asyncio
 import json
 import logging
 from datetime import datetime
@@ -227,10 +228,16 @@ async def retrieve_flows(
     client = KeboolaClient.from_state(ctx.session.state)
 
     if flow_ids:
+        # the flows are retrieved concurrently
+        raw_configs = await asyncio.gather(
+            *(client.storage_client.flow_detail(flow_id) for flow_id in flow_ids), return_exceptions=True
+        )
         flows = []
-        for flow_id in flow_ids:
+        for flow_id, raw_config in zip(flow_ids, raw_configs):
+            if isinstance(raw_config, BaseException):
+                LOG.warning(f'Could not retrieve flow {flow_id}: {raw_config}')
+                continue
             try:
-                raw_config = await client.storage_client.flow_detail(flow_id)
                 flow = ReducedFlow.from_raw_config(raw_config)
                 flows.append(flow)
             except Exception as e:
@@ -4,7 +4,7 @@ from typing import Annotated, cast
 from fastmcp import Context, FastMCP
 from pydantic import BaseModel, Field
 
-from keboola_mcp_server.client import JsonDict, KeboolaClient
+from keboola_mcp_server.client import KeboolaClient
 from keboola_mcp_server.config import MetadataField
 from keboola_mcp_server.errors import tool_errors
 from keboola_mcp_server.links import Link, ProjectLinksManager
@@ -59,13 +59,7 @@ async def get_project_info(
     links_manager = await ProjectLinksManager.from_client(client)
     storage = client.storage_client
 
-    token_data = await storage.verify_token()
-    project_data = cast(JsonDict, token_data.get('owner', {}))
-    project_id = cast(str, project_data.get('id', ''))
-    project_name = cast(str, project_data.get('name', ''))
-
-    organization_data = cast(JsonDict, token_data.get('organization', {}))
-    organization_id = cast(str, organization_data.get('id', ''))
+    token_identity = await storage.token_identity()
 
     metadata = await storage.branch_metadata_get()
     description = cast(
@@ -77,10 +71,10 @@ async def get_project_info(
     links = links_manager.get_project_links()
 
     project_info = ProjectInfo(
-        project_id=project_id,
-        project_name=project_name,
+        project_id=token_identity.project_id,
+        project_name=token_identity.project_name,
         project_description=description,
-        organization_id=organization_id,
+        organization_id=token_identity.organization_id,
         sql_dialect=sql_dialect,
         links=links,
     )
@@ -1,25 +1,162 @@
-import csv
+import asyncio
 import logging
-from io import StringIO
-from typing import Annotated
+import time
+from typing import Annotated, Optional
 
 from fastmcp import Context, FastMCP
-from pydantic import Field
+from pydantic import AliasChoices, BaseModel, Field
 
 from keboola_mcp_server.errors import tool_errors
+from keboola_mcp_server.formats import (
+    ResultFileFormatter,
+    ResultFileWriter,
+    ResultFormatter,
+    get_formats,
+    get_formatter,
+)
 from keboola_mcp_server.mcp import with_session_state
-from keboola_mcp_server.workspace import SqlSelectData, WorkspaceManager
+from keboola_mcp_server.workspace import QueryPage, SqlSelectData, WorkspaceManager
 
 LOG = logging.getLogger(__name__)
 
+# the maximum number of queries of a batch running in the workspace at the same time
+MAX_BATCH_CONCURRENCY = 5
+
+_OUTPUT_FORMAT_DESCRIPTION = (
+    'The format of the retrieved data, one of: '
+    + '; '.join(f"'{name}' - {description}" for name, description in get_formats().items())
+    + '. The binary formats are written to files in the local output directory of the server, all the retrieved rows'
+    ' to a single file.'
+)
+
 
 def add_sql_tools(mcp: FastMCP) -> None:
     """Add tools to the MCP server."""
     mcp.add_tool(query_table)
+    mcp.add_tool(query_tables_batch)
     mcp.add_tool(get_sql_dialect)
     LOG.info('SQL tools added to the MCP server.')
 
 
+class QueryTableResult(BaseModel):
+    data: Optional[str] = Field(
+        None, description='The retrieved data in the requested text format, none if the data was written to a file.'
+    )
+    file_path: Optional[str] = Field(
+        None,
+        description='The local path to the file with the retrieved data, if the data was written to a file.',
+        validation_alias=AliasChoices('filePath', 'file_path', 'file-path'),
+        serialization_alias='filePath',
+    )
+    file_uri: Optional[str] = Field(
+        None,
+        description='The URI of the file with the retrieved data, if the data was written to a file.',
+        validation_alias=AliasChoices('fileUri', 'file_uri', 'file-uri'),
+        serialization_alias='fileUri',
+    )
+    rows_count: int = Field(
+        description='Number of the retrieved rows.',
+        validation_alias=AliasChoices('rowsCount', 'rows_count', 'rows-count'),
+        serialization_alias='rowsCount',
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        description='The cursor to retrieve the next page of rows, none if all the rows have been retrieved.',
+        validation_alias=AliasChoices('nextCursor', 'next_cursor', 'next-cursor'),
+        serialization_alias='nextCursor',
+    )
+    truncated: bool = Field(
+        False,
+        description='Whether the query selected more rows than allowed and the rows beyond the limit were dropped.',
+    )
+
+
+class NamedQuery(BaseModel):
+    name: str = Field(description='The name identifying the query in the batch results.')
+    sql_query: str = Field(
+        description='SQL SELECT query to run.',
+        validation_alias=AliasChoices('sqlQuery', 'sql_query', 'sql-query'),
+        serialization_alias='sqlQuery',
+    )
+
+
+class NamedQueryResult(BaseModel):
+    name: str = Field(description='The name of the query.')
+    result: Optional[QueryTableResult] = Field(None, description='The page of the retrieved data, none on error.')
+    error: Optional[str] = Field(None, description='The error message if the query failed.')
+    duration_sec: float = Field(
+        description='The number of seconds the query ran for.',
+        validation_alias=AliasChoices('durationSec', 'duration_sec', 'duration-sec'),
+        serialization_alias='durationSec',
+    )
+
+
+class QueryTablesBatchResult(BaseModel):
+    results: list[NamedQueryResult] = Field(description='The results of the queries in the order of the queries.')
+    elapsed_sec: float = Field(
+        description='The number of seconds the whole batch ran for.',
+        validation_alias=AliasChoices('elapsedSec', 'elapsed_sec', 'elapsed-sec'),
+        serialization_alias='elapsedSec',
+    )
+    saved_sec: float = Field(
+        description='The number of seconds saved compared with running the queries one after another.',
+        validation_alias=AliasChoices('savedSec', 'saved_sec', 'saved-sec'),
+        serialization_alias='savedSec',
+    )
+
+
+def _get_page_size(formatter: ResultFormatter | ResultFileFormatter, page_size: int | None) -> int:
+    """
+    Gets the number of rows to retrieve. All the rows selected by the query are retrieved if no page size is set,
+    the file formats get them in one file.
+    """
+    if page_size is None or isinstance(formatter, ResultFileFormatter):
+        return WorkspaceManager.MAX_RESULT_ROWS
+    return page_size
+
+
+def _get_file_writer(ctx: Context, formatter: ResultFormatter | ResultFileFormatter) -> ResultFileWriter | None:
+    """Gets the writer of the files for the binary formats, fails before any query is run if it is not available."""
+    if isinstance(formatter, ResultFileFormatter):
+        file_writer = ResultFileWriter.from_state(ctx.session.state)
+        formatter.check_available()
+        return file_writer
+    return None
+
+
+async def _to_query_table_result(
+    page: QueryPage, formatter: ResultFormatter | ResultFileFormatter, file_writer: ResultFileWriter | None
+) -> QueryTableResult:
+    """Formats the page of the query result, raises ValueError if the query failed."""
+    result = page.result
+    if result.is_error:
+        raise ValueError(f'Failed to run SQL query, error: {result.message}')
+
+    if result.data:
+        data = result.data
+    else:
+        # non-SELECT query, this should not really happen, because this tool is for running SELECT queries
+        data = SqlSelectData(columns=['message'], rows=[(result.message,)])
+
+    if isinstance(formatter, ResultFileFormatter):
+        assert file_writer is not None
+        path = await asyncio.to_thread(file_writer.write, data, formatter)
+        return QueryTableResult(
+            file_path=str(path),
+            file_uri=path.as_uri(),
+            rows_count=len(data.rows),
+            next_cursor=page.next_cursor,
+            truncated=page.truncated,
+        )
+
+    return QueryTableResult(
+        data=formatter.format(data),
+        rows_count=len(data.rows),
+        next_cursor=page.next_cursor,
+        truncated=page.truncated,
+    )
+
+
 @tool_errors()
 @with_session_state()
 async def get_sql_dialect(
@@ -34,7 +171,22 @@ async def get_sql_dialect(
 async def query_table(
     sql_query: Annotated[str, Field(description='SQL SELECT query to run.')],
     ctx: Context,
-) -> Annotated[str, Field(description='The retrieved data in a CSV format.')]:
+    page_size: Annotated[
+        Optional[int],
+        Field(
+            description=(
+                'The maximum number of rows to retrieve at once, all rows are retrieved if not set. '
+                'The binary output formats always retrieve all rows.'
+            ),
+            ge=1,
+        ),
+    ] = None,
+    cursor: Annotated[
+        Optional[str],
+        Field(description='The cursor returned with the previous page of rows of the same SQL query.'),
+    ] = None,
+    output_format: Annotated[str, Field(description=_OUTPUT_FORMAT_DESCRIPTION)] = 'csv',
+) -> Annotated[QueryTableResult, Field(description='The page of the retrieved data.')]:
     """
     Executes an SQL SELECT query to get the data from the underlying database.
     * When constructing the SQL SELECT query make sure to check the SQL dialect
@@ -45,23 +197,75 @@ async def query_table(
       about tables. The fully qualified table name can be found in the response from that tool.
     * Always use quoted column names when referring to table columns. The quoted column names can also be found
       in the response from the table information tool.
+    * All the selected rows are retrieved by default, up to the limit of the server. Set the page size to retrieve
+      the rows in pages, then call this tool again with the same SQL query and the returned cursor to get
+      the next page of rows. Order the rows by ORDER BY to page through them reliably.
+    * Use the binary output formats (Arrow, Parquet) for large extracts when you can read the local files,
+      all the selected rows are written to a single file and only its path is returned.
     """
+    formatter = get_formatter(output_format)
+    file_writer = _get_file_writer(ctx, formatter)
     workspace_manager = WorkspaceManager.from_state(ctx.session.state)
-    result = await workspace_manager.execute_query(sql_query)
-    if result.is_ok:
-        if result.data:
-            data = result.data
-        else:
-            # non-SELECT query, this should not really happen, because this tool is for running SELECT queries
-            data = SqlSelectData(columns=['message'], rows=[{'message': result.message}])
-
-        # Convert to CSV
-        output = StringIO()
-        writer = csv.DictWriter(output, fieldnames=data.columns)
-        writer.writeheader()
-        writer.writerows(data.rows)
-
-        return output.getvalue()
+    page = await workspace_manager.execute_query_page(
+        sql_query, page_size=_get_page_size(formatter, page_size), cursor=cursor
+    )
+    return await _to_query_table_result(page, formatter, file_writer)
 
-    else:
-        raise ValueError(f'Failed to run SQL query, error: {result.message}')
+
+@tool_errors()
+@with_session_state()
+async def query_tables_batch(
+    queries: Annotated[
+        list[NamedQuery],
+        Field(description='The named SQL SELECT queries to run, the names must be unique.', min_length=1),
+    ],
+    ctx: Context,
+    page_size: Annotated[
+        Optional[int],
+        Field(
+            description=(
+                'The maximum number of rows to retrieve by each query at once, all rows are retrieved if not set. '
+                'The binary output formats always retrieve all rows.'
+            ),
+            ge=1,
+        ),
+    ] = None,
+    output_format: Annotated[str, Field(description=_OUTPUT_FORMAT_DESCRIPTION)] = 'csv',
+) -> Annotated[QueryTablesBatchResult, Field(description='The results of the queries.')]:
+    """
+    Executes multiple independent SQL SELECT queries concurrently and returns the results of all of them.
+    * Use it to run the queries profiling the tables or the other queries that are known upfront.
+    * Prefer this tool to calling the query_table tool repeatedly when the queries do not depend on each other.
+    * The same rules as for the query_table tool apply to constructing the SQL SELECT queries.
+    * A failed query does not fail the others, its error message is returned in its result.
+    * If the page size is set and a query selects more rows than the page size, call the query_table tool with
+      the same SQL query and the returned cursor to get the next page of rows.
+    """
+    names = [query.name for query in queries]
+    if duplicates := sorted({name for name in names if names.count(name) > 1}):
+        raise ValueError(f'The names of the queries must be unique, duplicate names: {", ".join(duplicates)}.')
+
+    formatter = get_formatter(output_format)
+    file_writer = _get_file_writer(ctx, formatter)
+    workspace_manager = WorkspaceManager.from_state(ctx.session.state)
+    semaphore = asyncio.Semaphore(MAX_BATCH_CONCURRENCY)
+
+    async def _run(query: NamedQuery) -> NamedQueryResult:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                page = await workspace_manager.execute_query_page(
+                    query.sql_query, page_size=_get_page_size(formatter, page_size)
+                )
+                result = await _to_query_table_result(page, formatter, file_writer)
+                return NamedQueryResult(name=query.name, result=result, duration_sec=time.perf_counter() - start)
+            except Exception as e:
+                LOG.warning(f'Failed to run SQL query {query.name}: {e}')
+                return NamedQueryResult(name=query.name, error=str(e), duration_sec=time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_run(query) for query in queries))
+    elapsed = time.perf_counter() - start
+    sequential = sum(result.duration_sec for result in results)
+    LOG.info(f'Run {len(queries)} SQL queries in {elapsed:.2f} seconds, sequentially in {sequential:.2f} seconds.')
+    return QueryTablesBatchResult(results=results, elapsed_sec=elapsed, saved_sec=max(0.0, sequential - elapsed))
@@ -11,7 +11,7 @@ from keboola_mcp_server.client import JsonDict, KeboolaClient
 from keboola_mcp_server.config import MetadataField
 from keboola_mcp_server.errors import tool_errors
 from keboola_mcp_server.mcp import KeboolaMcpServer, with_session_state
-from keboola_mcp_server.workspace import WorkspaceManager
+from keboola_mcp_server.workspace import TableFqn, WorkspaceManager
 
 LOG = logging.getLogger(__name__)
 
@@ -95,6 +95,7 @@ class TableColumnInfo(BaseModel):
         validation_alias=AliasChoices('quotedName', 'quoted_name', 'quoted-name'),
         serialization_alias='quotedName',
     )
+    description: Optional[str] = Field(None, description='Description of the column.')
 
 
 class TableDetail(BaseModel):
@@ -143,6 +144,31 @@ class TableDetail(BaseModel):
         return values
 
 
+async def _to_table_detail(
+    raw_table: JsonDict, table_fqn: Optional[TableFqn], workspace_manager: WorkspaceManager
+) -> TableDetail:
+    """Creates the table detail with the DB identifier, the quoted column names and the column descriptions."""
+    raw_columns = cast(list[str], raw_table.get('columns', []))
+    # the Storage API returns an empty list instead of an empty object if no column has metadata
+    raw_column_metadata = raw_table.get('columnMetadata') or {}
+    column_info = [
+        TableColumnInfo(
+            name=col,
+            quoted_name=await workspace_manager.get_quoted_name(col),
+            description=extract_description({'metadata': raw_column_metadata.get(col, [])}),
+        )
+        for col in raw_columns
+    ]
+
+    return TableDetail.model_validate(
+        raw_table
+        | {
+            'columns': column_info,
+            'fully_qualified_name': table_fqn.identifier if table_fqn else None,
+        }
+    )
+
+
 class UpdateDescriptionResponse(BaseModel):
     description: str = Field(..., description='The updated description value.', alias='value')
     timestamp: datetime = Field(..., description='The timestamp of the description update.')
@@ -183,34 +209,46 @@ async def get_table_detail(
     workspace_manager = WorkspaceManager.from_state(ctx.session.state)
 
     raw_table = await client.storage_client.table_detail(table_id)
-    raw_columns = cast(list[str], raw_table.get('columns', []))
-    column_info = [
-        TableColumnInfo(name=col, quoted_name=await workspace_manager.get_quoted_name(col)) for col in raw_columns
-    ]
-
     table_fqn = await workspace_manager.get_table_fqn(raw_table)
 
-    return TableDetail.model_validate(
-        raw_table
-        | {
-            'columns': column_info,
-            'fully_qualified_name': table_fqn.identifier if table_fqn else None,
-        }
-    )
+    return await _to_table_detail(raw_table, table_fqn, workspace_manager)
 
 
 @tool_errors()
 @with_session_state()
 async def retrieve_bucket_tables(
-    bucket_id: Annotated[str, Field(description='Unique ID of the bucket.')], ctx: Context
+    bucket_id: Annotated[str, Field(description='Unique ID of the bucket.')],
+    ctx: Context,
+    include_details: Annotated[
+        bool,
+        Field(
+            description=(
+                'Whether to include the DB identifiers and the column information of all the tables, '
+                'the same as returned by get_table_detail.'
+            )
+        ),
+    ] = False,
 ) -> list[TableDetail]:
-    """Retrieves all tables in a specific bucket with their basic information."""
+    """
+    Retrieves all tables in a specific bucket with their basic information.
+    Use include_details instead of calling get_table_detail for many tables of the bucket.
+    """
     client = KeboolaClient.from_state(ctx.session.state)
-    # TODO: requesting "metadata" to get the table description;
-    #  We could also request "columns" and use WorkspaceManager to prepare the table's FQN and columns' quoted names.
-    #  This could take time for larger buckets, but could save calls to get_table_metadata() later.
-    raw_tables = await client.storage_client.bucket_table_list(bucket_id, include=['metadata'])
-    return [TableDetail.model_validate(raw_table) for raw_table in raw_tables]
+    if not include_details:
+        # requesting "metadata" to get the table description
+        raw_tables = await client.storage_client.bucket_table_list(bucket_id, include=['metadata'])
+        return [TableDetail.model_validate(raw_table) for raw_table in raw_tables]
+
+    # all the tables with their columns are listed at once and their FQNs are resolved in bulk
+    workspace_manager = WorkspaceManager.from_state(ctx.session.state)
+    raw_tables = await client.storage_client.bucket_table_list(
+        bucket_id, include=['columns', 'metadata', 'columnMetadata']
+    )
+    table_fqns = await workspace_manager.get_table_fqns(raw_tables)
+    return [
+        await _to_table_detail(raw_table, table_fqn, workspace_manager)
+        for raw_table, table_fqn in zip(raw_tables, table_fqns)
+    ]
 
 
 @tool_errors()
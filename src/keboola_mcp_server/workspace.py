@@ -1,15 +1,23 @@
 import abc
 import asyncio
+import base64
+import binascii
+import hashlib
 import json
 import logging
+import re
+import secrets
 import time
+import weakref
+from collections import OrderedDict
 from typing import Any, Literal, Mapping, Optional, Sequence
 
 from httpx import HTTPStatusError
-from pydantic import Field, TypeAdapter
+from pydantic import Field, SkipValidation, TypeAdapter, ValidationInfo, field_validator
 from pydantic.dataclasses import dataclass
 
-from keboola_mcp_server.client import KeboolaClient
+from keboola_mcp_server.client import KeboolaClient, encode_json, row_to_tuple
+from keboola_mcp_server.metrics import METRICS
 
 LOG = logging.getLogger(__name__)
 
@@ -39,15 +47,36 @@ class TableFqn:
 
 
 QueryStatus = Literal['ok', 'error']
-SqlSelectDataRow = Mapping[str, Any]
+SqlSelectDataRow = tuple[Any, ...]
 
 
 @dataclass(frozen=True)
 class SqlSelectData:
+    """
+    The data selected by a SQL query.
+
+    The column names are kept once and the rows are tuples of values in the order of the columns. The rows
+    given as dictionaries of column: value pairs, e.g. by the Storage API, are converted to tuples.
+    """
+
     columns: Sequence[str] = Field(description='Names of the columns returned from SQL select.')
-    rows: Sequence[SqlSelectDataRow] = Field(
-        description='Selected rows, each row is a dictionary of column: value pairs.'
+    # the values come from the JSON responses, so only the shape of the rows is checked
+    rows: SkipValidation[Sequence[SqlSelectDataRow]] = Field(
+        description='Selected rows, each row is a tuple of values in the order of the columns.'
     )
+    truncated: bool = Field(False, description='True if the rows beyond the limits of the query were dropped.')
+    rows_size: int | None = Field(None, description='Size of the JSON of the rows as received, None if not known.')
+
+    @field_validator('rows', mode='before')
+    @classmethod
+    def _to_row_tuples(cls, rows: Any, info: ValidationInfo) -> list[SqlSelectDataRow]:
+        convert = row_to_tuple(info.data.get('columns') or [])
+        return [convert(row) for row in rows]
+
+    def get_column(self, name: str) -> list[Any]:
+        """Gets the values of the column."""
+        idx = list(self.columns).index(name)
+        return [row[idx] for row in self.rows]
 
 
 @dataclass(frozen=True)
@@ -65,6 +94,234 @@ class QueryResult:
         return not self.is_ok
 
 
+_QUERY_RESULT_ADAPTER = TypeAdapter(QueryResult)
+
+
+@dataclass(frozen=True)
+class QueryPage:
+    """A page of the rows selected by a SQL query."""
+
+    result: QueryResult = Field(description='The result of the query with the rows of the page.')
+    next_cursor: str | None = Field(None, description='The cursor of the next page, None if this is the last page.')
+    truncated: bool = Field(
+        False, description='True if the query selected more rows than allowed, the rows beyond the limit are dropped.'
+    )
+
+
+def _data_size(data: SqlSelectData | None) -> int:
+    """Estimates the size of the selected data in bytes by the size of its JSON."""
+    if data is None:
+        return 0
+    if data.rows_size is not None:
+        return data.rows_size
+    return len(encode_json(data.rows))
+
+
+# string literals and quoted identifiers (group 1) or runs of whitespace and comments
+_SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"[^"]*"|`[^`]*`)|((?:\s|--[^\n]*|/\*.*?\*/)+)""", re.DOTALL)
+_QUOTED_NAME = r'"[^"]+"|`[^`]+`'
+_QUOTED_NAME_CHAIN = re.compile(rf'(?:{_QUOTED_NAME})(?:\s*\.\s*(?:{_QUOTED_NAME}))+')
+_STORAGE_BUCKET_ID = re.compile(r'^(in|out)\.c-')
+_NONDETERMINISTIC_SQL = re.compile(
+    r'\b(current_\w+|localtime|localtimestamp|sysdate|getdate|now|random|rand|randstr|uniform|normal|uuid_string|'
+    r'generate_uuid|seq[1248]|sample|tablesample)\b',
+    re.IGNORECASE,
+)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_QUOTED_LITERAL = re.compile(r"""'(?:[^']|'')*'|"[^"]*"|`[^`]*`""")
+_ORDER_BY = re.compile(r'\border\s+by\b', re.IGNORECASE)
+_UNQUOTED_NAME = r'[A-Za-z_][\w$]*'
+# the table, the subquery or the table function following FROM or JOIN, or following a comma in the FROM clause
+_FROM_TARGET = re.compile(
+    rf'\b(?:from|join)\s*(\(|(?:{_QUOTED_NAME}|{_UNQUOTED_NAME})(?:\s*\.\s*(?:{_QUOTED_NAME}|{_UNQUOTED_NAME}))*)',
+    re.IGNORECASE,
+)
+_NEXT_FROM_TARGET = re.compile(
+    rf'\s*(?:(?:as\s+)?(?:{_QUOTED_NAME}|{_UNQUOTED_NAME})\s*)?,\s*'
+    rf'(\(|(?:{_QUOTED_NAME}|{_UNQUOTED_NAME})(?:\s*\.\s*(?:{_QUOTED_NAME}|{_UNQUOTED_NAME}))*)',
+    re.IGNORECASE,
+)
+_CTE_NAME = re.compile(
+    rf'(?:\bwith\s+(?:recursive\s+)?|,\s*)({_QUOTED_NAME}|{_UNQUOTED_NAME})\s+as\s*\(', re.IGNORECASE
+)
+
+
+def normalize_sql(sql_query: str) -> str:
+    """Removes the comments and collapses the whitespace outside the string literals and the quoted identifiers."""
+    normalized = _SQL_TOKENS.sub(lambda m: m.group(1) or ' ', sql_query).strip()
+    return normalized.rstrip(';').rstrip()
+
+
+class _CachedQueryResult:
+    def __init__(self, result: 'QueryResult', size: int, table_versions: Mapping[str, Any]) -> None:
+        self.result = result
+        self.size = size
+        self.table_versions = table_versions  # the import and change dates of the tables read by the query
+        self.checked_at = time.monotonic()
+
+
+class QueryResultCache:
+    """
+    The cache of SQL SELECT results bounded by the total size of the results.
+
+    A result is valid as long as the Storage tables read by the query have not been imported to or changed,
+    which is checked at most once per `check_interval` seconds.
+    """
+
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, check_interval: float = 5.0) -> None:
+        """
+        :param max_bytes: The maximum total size of the cached results in bytes, the least recently used results
+            are evicted first
+        :param check_interval: The number of seconds a result is used without checking the tables it was read from
+        """
+        self._max_bytes = max_bytes
+        self._check_interval = check_interval
+        self._entries: OrderedDict[Any, _CachedQueryResult] = OrderedDict()
+        self._total_bytes = 0
+
+    @property
+    def check_interval(self) -> float:
+        return self._check_interval
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, key: Any) -> _CachedQueryResult | None:
+        if entry := self._entries.get(key):
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Any, result: 'QueryResult', table_versions: Mapping[str, Any]) -> None:
+        """
+        Stores the query result.
+
+        :param key: The cache key
+        :param result: The result of the query
+        :param table_versions: The import and change dates of the tables read by the query observed before the query
+            ran
+        """
+        size = _data_size(result.data)
+        if size > self._max_bytes // 4:
+            # a single large result would evict many small ones
+            return
+        self.pop(key)
+        self._entries[key] = _CachedQueryResult(result, size, table_versions)
+        self._total_bytes += size
+        while self._total_bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= evicted.size
+
+    def pop(self, key: Any) -> None:
+        if entry := self._entries.pop(key, None):
+            self._total_bytes -= entry.size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._total_bytes = 0
+
+
+class QueryResultBuffer:
+    """
+    The buffer of the SQL SELECT results paged through by cursors, bounded by the time-to-live of the results
+    and by their total size.
+
+    The buffer can be shared by the sessions, the results are only read by the owner that stored them.
+    """
+
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = 600.0) -> None:
+        """
+        :param max_bytes: The maximum total size of the buffered results in bytes, the oldest results are evicted first
+        :param ttl: The number of seconds the results are kept for since they were last read
+        """
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[SqlSelectData, int, float, str | None]] = OrderedDict()
+        self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def put(self, data: SqlSelectData, size: int, owner: str | None = None) -> str | None:
+        """
+        Stores the selected data.
+
+        :param data: The selected data
+        :param size: The size of the data in bytes
+        :param owner: The owner of the data, e.g. the hash of the token that selected them
+        :return: The ID of the buffered data or None if the data are larger than the whole buffer
+        """
+        if size > self._max_bytes:
+            return None
+        self._evict(time.monotonic())
+        buffer_id = secrets.token_urlsafe(12)
+        self._entries[buffer_id] = (data, size, time.monotonic() + self._ttl, owner)
+        self._total_bytes += size
+        while self._total_bytes > self._max_bytes:
+            _, (_, evicted_size, _, _) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_size
+        return buffer_id
+
+    def get(self, buffer_id: str, owner: str | None = None) -> SqlSelectData | None:
+        """
+        Gets the buffered data.
+
+        :param buffer_id: The ID of the buffered data
+        :param owner: The owner the data were stored by
+        :return: The data or None if they are not buffered or they belong to another owner
+        """
+        now = time.monotonic()
+        self._evict(now)
+        if (entry := self._entries.get(buffer_id)) is None or entry[3] != owner:
+            return None
+        data, size, _, _ = entry
+        self._entries[buffer_id] = (data, size, now + self._ttl, owner)
+        self._entries.move_to_end(buffer_id)
+        return data
+
+    def _evict(self, now: float) -> None:
+        # the entries are ordered by their expiration
+        while self._entries and next(iter(self._entries.values()))[2] < now:
+            _, (_, size, _, _) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+
+
+def _has_order_by(normalized_query: str) -> bool:
+    """Checks that the query orders the selected rows, i.e. it has ORDER BY outside of any parentheses."""
+    query = _QUOTED_LITERAL.sub("''", normalized_query)
+    depth = 0
+    top_level: list[str] = []
+    for c in query:
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            top_level.append(c)
+    return bool(_ORDER_BY.search(''.join(top_level)))
+
+
+def _encode_cursor(buffer_id: str | None, offset: int, truncated: bool, query_hash: str) -> str:
+    cursor = {'b': buffer_id, 'o': offset, 't': truncated, 'h': query_hash}
+    return base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str, query_hash: str) -> tuple[str | None, int, bool]:
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        buffer_id, offset, truncated, cursor_hash = decoded['b'], int(decoded['o']), bool(decoded['t']), decoded['h']
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise ValueError(f'Invalid cursor: {cursor}')
+    if cursor_hash != query_hash:
+        raise ValueError('The cursor was returned for a different SQL query.')
+    return buffer_id, offset, truncated
+
+
 class _Workspace(abc.ABC):
     def __init__(self, workspace_id: int) -> None:
         self._workspace_id = workspace_id
@@ -87,9 +344,22 @@ class _Workspace(abc.ABC):
         # TODO: use a pydantic class for the 'table' param
         pass
 
+    async def get_table_fqns(self, tables: Sequence[Mapping[str, Any]]) -> list[TableFqn | None]:
+        """Gets the fully qualified names of Keboola tables in the order of the tables."""
+        return [await self.get_table_fqn(table) for table in tables]
+
     @abc.abstractmethod
-    async def execute_query(self, sql_query: str) -> QueryResult:
-        """Runs a SQL SELECT query."""
+    async def execute_query(
+        self, sql_query: str, max_rows: int | None = None, max_bytes: int | None = None
+    ) -> QueryResult:
+        """
+        Runs a SQL SELECT query.
+
+        :param sql_query: The SQL query
+        :param max_rows: The maximum number of the returned rows, the rows beyond it are dropped
+        :param max_bytes: The maximum size of the JSON of the returned rows, the rows beyond it are dropped
+        :return: The query result
+        """
         pass
 
 
@@ -98,6 +368,8 @@ class _SnowflakeWorkspace(_Workspace):
         super().__init__(workspace_id)
         self._schema = schema  # default schema created for the workspace
         self._client = client
+        self._current_database: str | None = None
+        self._project_databases: dict[str, str] = {}
 
     def get_sql_dialect(self) -> str:
         return 'Snowflake'
@@ -106,33 +378,33 @@ class _SnowflakeWorkspace(_Workspace):
         return f'"{name}"'  # wrap name in double quotes
 
     async def get_table_fqn(self, table: Mapping[str, Any]) -> TableFqn | None:
-        table_id = table['id']
+        fqns = await self.get_table_fqns([table])
+        return fqns[0]
+
+    async def get_table_fqns(self, tables: Sequence[Mapping[str, Any]]) -> list[TableFqn | None]:
+        # the databases are resolved by at most two SQL queries no matter how many tables are requested
+        source_project_ids = {
+            str(source_table['project']['id']) for table in tables if (source_table := table.get('sourceTable'))
+        }
+        has_local_tables = any(not table.get('sourceTable') for table in tables)
+        current_db = await self._get_current_database() if has_local_tables else None
+        project_dbs = await self._get_project_databases(source_project_ids)
+
+        fqns: list[TableFqn | None] = []
+        for table in tables:
+            table_id = table['id']
+
+            db_name: str | None = None
+            schema_name: str | None = None
+            table_name: str | None = None
+
+            if source_table := table.get('sourceTable'):
+                # a table linked from some other project
+                schema_name, table_name = source_table['id'].rsplit(sep='.', maxsplit=1)
+                db_name = project_dbs.get(str(source_table['project']['id']))
 
-        db_name: str | None = None
-        schema_name: str | None = None
-        table_name: str | None = None
-
-        if source_table := table.get('sourceTable'):
-            # a table linked from some other project
-            schema_name, table_name = source_table['id'].rsplit(sep='.', maxsplit=1)
-            source_project_id = source_table['project']['id']
-            # sql = f"show databases like '%_{source_project_id}';"
-            sql = (
-                f'select "DATABASE_NAME" from "INFORMATION_SCHEMA"."DATABASES" '
-                f'where "DATABASE_NAME" like \'%_{source_project_id}\';'
-            )
-            result = await self.execute_query(sql)
-            if result.is_ok and result.data and result.data.rows:
-                db_name = result.data.rows[0]['DATABASE_NAME']
             else:
-                LOG.error(f'Failed to run SQL: {sql}, SAPI response: {result}')
-
-        else:
-            sql = 'select CURRENT_DATABASE() as "current_database";'
-            result = await self.execute_query(sql)
-            if result.is_ok and result.data and result.data.rows:
-                row = result.data.rows[0]
-                db_name = row['current_database']
+                db_name = current_db
                 if '.' in table_id:
                     # a table local in a project for which the snowflake connection/workspace is open
                     schema_name, table_name = table_id.rsplit(sep='.', maxsplit=1)
@@ -142,18 +414,59 @@ class _SnowflakeWorkspace(_Workspace):
                     #  tables that are in the project
                     schema_name = self._schema
                     table_name = table['name']
+
+            if db_name and schema_name and table_name:
+                fqns.append(TableFqn(db_name, schema_name, table_name, quote_char='"'))
             else:
-                LOG.error(f'Failed to run SQL: {sql}, SAPI response: {result}')
+                fqns.append(None)
 
-        if db_name and schema_name and table_name:
-            fqn = TableFqn(db_name, schema_name, table_name, quote_char='"')
-            return fqn
+        return fqns
+
+    async def _get_current_database(self) -> str | None:
+        """Gets the database of the project for which the workspace is open."""
+        if self._current_database:
+            return self._current_database
+
+        sql = 'select CURRENT_DATABASE() as "current_database";'
+        result = await self.execute_query(sql)
+        if result.is_ok and result.data and result.data.rows:
+            self._current_database = result.data.get_column('current_database')[0]
         else:
-            return None
+            LOG.error(f'Failed to run SQL: {sql}, SAPI response: {result}')
+
+        return self._current_database
+
+    async def _get_project_databases(self, project_ids: set[str]) -> dict[str, str]:
+        """Gets the databases of the projects the linked tables come from, keyed by the project ID."""
+        if missing_ids := sorted(project_ids - self._project_databases.keys()):
+            # sql = f"show databases like '%_{source_project_id}';"
+            sql = (
+                'select "DATABASE_NAME" from "INFORMATION_SCHEMA"."DATABASES" where '
+                + ' or '.join(f'"DATABASE_NAME" like \'%_{project_id}\'' for project_id in missing_ids)
+                + ';'
+            )
+            result = await self.execute_query(sql)
+            if result.is_ok and result.data:
+                for db_name in result.data.get_column('DATABASE_NAME'):
+                    for project_id in missing_ids:
+                        if db_name.endswith(f'_{project_id}'):
+                            self._project_databases.setdefault(project_id, db_name)
+            else:
+                LOG.error(f'Failed to run SQL: {sql}, SAPI response: {result}')
 
-    async def execute_query(self, sql_query: str) -> QueryResult:
-        resp = await self._client.storage_client.workspace_query(workspace_id=self.id, query=sql_query)
-        return TypeAdapter(QueryResult).validate_python(resp)
+        return {
+            project_id: self._project_databases[project_id]
+            for project_id in project_ids
+            if project_id in self._project_databases
+        }
+
+    async def execute_query(
+        self, sql_query: str, max_rows: int | None = None, max_bytes: int | None = None
+    ) -> QueryResult:
+        resp = await self._client.storage_client.workspace_query(
+            workspace_id=self.id, query=sql_query, max_rows=max_rows, max_bytes=max_bytes
+        )
+        return _QUERY_RESULT_ADAPTER.validate_python(resp)
 
 
 class _BigQueryWorkspace(_Workspace):
@@ -194,9 +507,18 @@ class _BigQueryWorkspace(_Workspace):
         else:
             return None
 
-    async def execute_query(self, sql_query: str) -> QueryResult:
-        resp = await self._client.storage_client.workspace_query(workspace_id=self.id, query=sql_query)
-        return TypeAdapter(QueryResult).validate_python(resp)
+    async def execute_query(
+        self, sql_query: str, max_rows: int | None = None, max_bytes: int | None = None
+    ) -> QueryResult:
+        resp = await self._client.storage_client.workspace_query(
+            workspace_id=self.id, query=sql_query, max_rows=max_rows, max_bytes=max_bytes
+        )
+        return _QUERY_RESULT_ADAPTER.validate_python(resp)
+
+
+# the SQL dialects and the identifier quotes of the project backends
+_BACKEND_SQL_DIALECTS = {'snowflake': 'Snowflake', 'bigquery': 'BigQuery'}
+_BACKEND_QUOTE_CHARS = {'snowflake': '"', 'bigquery': '`'}
 
 
 @dataclass(frozen=True)
@@ -221,28 +543,93 @@ class WorkspaceManager:
     STATE_KEY = 'workspace_manager'
     MCP_META_KEY = 'KBC.MCP.workspaceId'
 
+    # process-wide locks serializing the workspace creation, keyed by the Storage API URL, the project ID
+    # and the branch ID, per event loop; the locks of a closed event loop are dropped along with the loop
+    _CREATE_LOCKS: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple[str, str, str], asyncio.Lock]] = (
+        weakref.WeakKeyDictionary()
+    )
+
+    # process-wide index of the workspace IDs and the times they were indexed,
+    # keyed by the Storage API URL, the project ID and the workspace schema
+    _SCHEMA_INDEX: OrderedDict[tuple[str, str, str], tuple[int, float]] = OrderedDict()
+    _SCHEMA_INDEX_TTL = 600.0
+    _MAX_SCHEMA_INDEX_ENTRIES = 4096
+
+    # the limits of the rows selected by a single query, the rows beyond them are dropped
+    MAX_RESULT_ROWS = 100_000
+    MAX_RESULT_BYTES = 64 * 1024 * 1024
+
     @classmethod
     def from_state(cls, state: Mapping[str, Any]) -> 'WorkspaceManager':
         instance = state[cls.STATE_KEY]
         assert isinstance(instance, WorkspaceManager), f'Expected WorkspaceManager, got: {instance}'
         return instance
 
-    def __init__(self, client: KeboolaClient, workspace_schema: str | None = None):
+    def __init__(
+        self,
+        client: KeboolaClient,
+        workspace_schema: str | None = None,
+        query_cache: QueryResultCache | None = None,
+        result_buffer: QueryResultBuffer | None = None,
+    ):
+        """
+        :param client: The Keboola client
+        :param workspace_schema: The schema of the workspace to use instead of the workspace created by the server
+        :param query_cache: The cache of the SQL SELECT results, no results are cached if not specified
+        :param result_buffer: The buffer of the SQL SELECT results paged through by cursors, the pages are selected
+            by re-running the queries if not specified
+        """
         self._client = client
         self._workspace_schema = workspace_schema
         self._workspace: _Workspace | None = None
+        # the workspace lookup or creation in progress, shared by all concurrent callers
+        self._workspace_task: asyncio.Task[_Workspace] | None = None
         self._table_fqn_cache: dict[str, TableFqn] = {}
+        # the IDs of the tables with known FQNs, keyed by their schema and table names
+        self._table_ids_by_name: dict[tuple[str, str], str] = {}
+        self._query_cache = query_cache
+        self._result_buffer = result_buffer
 
     async def _find_ws_by_schema(self, schema: str) -> _WspInfo | None:
-        """Finds the workspace info by its schema."""
+        """
+        Finds the workspace info by its schema.
+
+        The workspace IDs are looked up in the process-wide index first and only verified by a single workspace
+        detail request. All the workspaces are listed only if the schema is not indexed or the indexed workspace
+        no longer exists.
+        """
+
+        storage_client = self._client.storage_client
+        index_prefix = (storage_client.base_api_url, await storage_client.project_id())
+        key = (*index_prefix, schema)
+
+        if (indexed := self._SCHEMA_INDEX.get(key)) and time.monotonic() - indexed[1] < self._SCHEMA_INDEX_TTL:
+            workspace_id, _ = indexed
+            try:
+                wi = await self._find_ws_by_id(workspace_id)
+            except ValueError:
+                wi = None
+            if wi and wi.schema == schema:
+                self._SCHEMA_INDEX.move_to_end(key)
+                return wi
+            LOG.info(f'Indexed workspace {workspace_id} not valid for schema: {schema}')
+            self._SCHEMA_INDEX.pop(key, None)
 
-        for sapi_wsp_info in await self._client.storage_client.workspace_list():
+        found: _WspInfo | None = None
+        now = time.monotonic()
+        for sapi_wsp_info in await storage_client.workspace_list():
             assert isinstance(sapi_wsp_info, dict)
             wi = _WspInfo.from_sapi_info(sapi_wsp_info)
-            if wi.id and wi.backend and wi.schema and wi.schema == schema:
-                return wi
+            if wi.id and wi.backend and wi.schema:
+                # index all the listed workspaces, other sessions are likely to use them too
+                self._SCHEMA_INDEX[(*index_prefix, wi.schema)] = (wi.id, now)
+                self._SCHEMA_INDEX.move_to_end((*index_prefix, wi.schema))
+                if wi.schema == schema:
+                    found = wi
 
-        return None
+        while len(self._SCHEMA_INDEX) > self._MAX_SCHEMA_INDEX_ENTRIES:
+            self._SCHEMA_INDEX.popitem(last=False)
+        return found
 
     async def _find_ws_by_id(self, workspace_id: int) -> _WspInfo | None:
         """Finds the workspace info by its ID."""
@@ -263,10 +650,14 @@ class WorkspaceManager:
             else:
                 raise e
 
-    async def _find_ws_in_branch(self) -> _WspInfo | None:
-        """Finds the workspace info in the current branch."""
+    async def _find_ws_in_branch(self, use_cache: bool = True) -> _WspInfo | None:
+        """
+        Finds the workspace info in the current branch.
+
+        :param use_cache: If False, the branch metadata are read from the Storage API even if they are cached
+        """
 
-        metadata = await self._client.storage_client.branch_metadata_get()
+        metadata = await self._client.storage_client.branch_metadata_get(use_cache=use_cache)
         for m in metadata:
             if m.get('key') == self.MCP_META_KEY:
                 workspace_id = m.get('value')
@@ -275,11 +666,22 @@ class WorkspaceManager:
 
         return None
 
-    async def _create_ws(self, *, timeout_sec: float = 300.0) -> _WspInfo | None:
+    async def _create_ws(
+        self,
+        *,
+        timeout_sec: float = 300.0,
+        poll_interval_sec: float = 0.25,
+        max_poll_interval_sec: float = 5.0,
+    ) -> _WspInfo | None:
         """
         Creates a new workspace in the current branch and returns its info.
 
+        The creation job is polled at first after `poll_interval_sec` seconds, the interval then grows by half
+        with each poll up to `max_poll_interval_sec` seconds.
+
         :param timeout_sec: The number of seconds to wait for the workspace creation job to finish.
+        :param poll_interval_sec: The initial number of seconds between the job status checks.
+        :param max_poll_interval_sec: The maximum number of seconds between the job status checks.
         :return: The workspace info if the workspace was created successfully, None otherwise.
         """
 
@@ -315,7 +717,16 @@ class WorkspaceManager:
 
             else:
                 remaining_time = max(0.0, timeout_sec - duration)
-                await asyncio.sleep(min(5.0, remaining_time))
+                await asyncio.sleep(min(poll_interval_sec, remaining_time))
+                poll_interval_sec = min(max_poll_interval_sec, poll_interval_sec * 1.5)
+
+    async def _delete_ws(self, workspace_id: int) -> None:
+        """Deletes the unused workspace, the failure is only logged."""
+        try:
+            await self._client.storage_client.workspace_delete(workspace_id)
+            LOG.info(f'Deleted workspace: {workspace_id}')
+        except Exception as e:
+            LOG.warning(f'Failed to delete the unused workspace {workspace_id}: {e}')
 
     def _init_workspace(self, info: _WspInfo) -> _Workspace:
         """Creates a new `Workspace` instance based on the workspace info."""
@@ -339,10 +750,39 @@ class WorkspaceManager:
         else:
             raise ValueError(f'Unexpected backend type "{info.backend}" in workspace: {info.schema}')
 
+    def prewarm(self) -> None:
+        """
+        Starts looking up or creating the workspace in the background, so that the first SQL query does not
+        have to wait for it. Any failure is logged and the workspace is looked up again by the next call.
+        """
+        if self._workspace or self._workspace_task:
+            return
+
+        def _log_failure(task: asyncio.Task[_Workspace]) -> None:
+            if not task.cancelled() and (e := task.exception()):
+                LOG.warning(f'Failed to prewarm the workspace: {e}')
+
+        LOG.info('Prewarming the workspace.')
+        self._start_workspace_task().add_done_callback(_log_failure)
+
+    def _start_workspace_task(self) -> asyncio.Task[_Workspace]:
+        task = self._workspace_task
+        if (
+            task is None
+            or (task.done() and (task.cancelled() or task.exception()))
+            or task.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._workspace_task = task = asyncio.create_task(self._resolve_workspace())
+        return task
+
     async def _get_workspace(self) -> _Workspace:
         if self._workspace:
             return self._workspace
+        # the callers arriving during the lookup or creation wait for the same task,
+        # the task is not cancelled when one of them is cancelled
+        return await asyncio.shield(self._start_workspace_task())
 
+    async def _resolve_workspace(self) -> _Workspace:
         if self._workspace_schema:
             # use the workspace that was explicitly requested
             # this workspace must never be written to the default branch metadata
@@ -364,21 +804,249 @@ class WorkspaceManager:
             self._workspace = self._init_workspace(info)
             return self._workspace
 
-        # create a new workspace and note its ID to the branch
-        LOG.info('Creating workspace in the default branch.')
-        if info := await self._create_ws():
-            # update the branch metadata with the workspace ID
-            meta = await self._client.storage_client.branch_metadata_update({self.MCP_META_KEY: info.id})
-            LOG.info(f'Set metadata in the default branch: {meta}')
-            # use the newly created workspace
-            self._workspace = self._init_workspace(info)
-            return self._workspace
-        else:
-            raise ValueError('Failed to initialize Keboola Workspace.')
+        async with await self._get_create_lock():
+            # the workspace may have been created by another session or another server replica meanwhile
+            if info := await self._find_ws_in_branch(use_cache=False):
+                LOG.info(f'Found workspace: {info}')
+                self._workspace = self._init_workspace(info)
+                return self._workspace
+
+            # create a new workspace and note its ID to the branch
+            LOG.info('Creating workspace in the default branch.')
+            if info := await self._create_ws():
+                if concurrent_info := await self._find_ws_in_branch(use_cache=False):
+                    # another replica was faster, all replicas should use the same workspace
+                    LOG.warning(
+                        f'Using workspace {concurrent_info.id} created concurrently by another server, '
+                        f'deleting the workspace {info.id}.'
+                    )
+                    await self._delete_ws(info.id)
+                    info = concurrent_info
+                else:
+                    # update the branch metadata with the workspace ID
+                    meta = await self._client.storage_client.branch_metadata_update({self.MCP_META_KEY: info.id})
+                    LOG.info(f'Set metadata in the default branch: {meta}')
+                # use the newly created workspace
+                self._workspace = self._init_workspace(info)
+                return self._workspace
+            else:
+                raise ValueError('Failed to initialize Keboola Workspace.')
+
+    async def _get_create_lock(self) -> asyncio.Lock:
+        storage_client = self._client.storage_client
+        key = (storage_client.base_api_url, await storage_client.project_id(), storage_client.branch_id)
+        locks = self._CREATE_LOCKS.setdefault(asyncio.get_running_loop(), {})
+        if (lock := locks.get(key)) is None:
+            lock = locks[key] = asyncio.Lock()
+        return lock
+
+    async def execute_query(self, sql_query: str, use_cache: bool = True) -> QueryResult:
+        """
+        Runs the SQL query in the workspace.
+
+        The rows beyond `MAX_RESULT_ROWS` and `MAX_RESULT_BYTES` are dropped as they are received, the result data
+        is marked as truncated then.
+
+        The results of the SELECT queries reading Storage tables are cached if the manager has the query cache.
+        The tables are recognized by their quoted names, e.g. "in.c-bucket"."table", or by the fully qualified names
+        resolved by this manager.
 
-    async def execute_query(self, sql_query: str) -> QueryResult:
+        :param sql_query: The SQL query
+        :param use_cache: If False, the query is always run in the workspace, but its result is cached
+        :return: The query result
+        """
         workspace = await self._get_workspace()
-        return await workspace.execute_query(sql_query)
+        limits = {'max_rows': self.MAX_RESULT_ROWS, 'max_bytes': self.MAX_RESULT_BYTES}
+        if not self._query_cache:
+            return await workspace.execute_query(sql_query, **limits)
+
+        normalized_query = normalize_sql(sql_query)
+        if not (table_ids := self._get_read_tables(normalized_query)):
+            return await workspace.execute_query(sql_query, **limits)
+
+        # the cache is shared by the sessions, the results are only read with the token that selected them
+        storage_client = self._client.storage_client
+        key = (storage_client.base_api_url, workspace.id, storage_client.token_hash, normalized_query)
+        if use_cache and (cached := self._query_cache.get(key)):
+            if time.monotonic() - cached.checked_at < self._query_cache.check_interval:
+                METRICS.inc('query_cache_hits')
+                return cached.result
+            if await self._get_table_versions(table_ids) == cached.table_versions:
+                cached.checked_at = time.monotonic()
+                METRICS.inc('query_cache_hits')
+                return cached.result
+            self._query_cache.pop(key)
+
+        METRICS.inc('query_cache_misses')
+        # the tables are checked before the query runs, so that the changes made meanwhile are not missed
+        table_versions = await self._get_table_versions(table_ids)
+        result = await workspace.execute_query(sql_query, **limits)
+        if result.is_ok and result.data is not None and table_versions is not None:
+            self._query_cache.put(key, result, table_versions)
+        return result
+
+    async def execute_query_page(self, sql_query: str, page_size: int, cursor: str | None = None) -> QueryPage:
+        """
+        Runs the SQL SELECT query and returns a page of the selected rows.
+
+        The whole result is kept in the result buffer and the next pages are read from it. If there is no buffer,
+        the result does not fit into it or it has expired, the next pages are selected by re-running the query
+        with LIMIT and OFFSET. That is only done for the queries ordering their rows by ORDER BY, the databases
+        do not guarantee the order of the rows otherwise and the pages could overlap or miss rows.
+
+        :param sql_query: The SQL query, the same query must be passed with the cursor
+        :param page_size: The maximum number of rows in the page
+        :param cursor: The cursor returned with the previous page, None for the first page
+        :return: The page of the rows and the cursor of the next page
+        """
+        normalized_query = normalize_sql(sql_query)
+        query_hash = hashlib.sha256(normalized_query.encode('utf-8')).hexdigest()[:16]
+
+        if cursor:
+            buffer_id, offset, truncated = _decode_cursor(cursor, query_hash)
+            if (
+                buffer_id
+                and self._result_buffer
+                and (data := self._result_buffer.get(buffer_id, owner=self._buffer_owner))
+            ):
+                return self._get_page(data, offset, page_size, buffer_id, truncated, query_hash)
+            return await self._select_page(normalized_query, offset, page_size, truncated, query_hash)
+
+        result = await self.execute_query(sql_query)
+        if result.is_error or result.data is None:
+            return QueryPage(result=result)
+
+        data = result.data
+        if data.truncated:
+            LOG.warning(f'Dropped the selected rows beyond the first {len(data.rows)} rows, size={data.rows_size}.')
+        buffer_id: str | None = None
+        if len(data.rows) > page_size and self._result_buffer:
+            buffer_id = self._result_buffer.put(data, _data_size(data), owner=self._buffer_owner)
+        return self._get_page(data, 0, page_size, buffer_id, data.truncated, query_hash)
+
+    @property
+    def _buffer_owner(self) -> str:
+        return self._client.storage_client.token_hash
+
+    @staticmethod
+    def _get_page(
+        data: SqlSelectData, offset: int, page_size: int, buffer_id: str | None, truncated: bool, query_hash: str
+    ) -> QueryPage:
+        end = offset + page_size
+        page = SqlSelectData(columns=data.columns, rows=data.rows[offset:end])
+        next_cursor = _encode_cursor(buffer_id, end, truncated, query_hash) if end < len(data.rows) else None
+        return QueryPage(result=QueryResult(status='ok', data=page), next_cursor=next_cursor, truncated=truncated)
+
+    async def _select_page(
+        self, normalized_query: str, offset: int, page_size: int, truncated: bool, query_hash: str
+    ) -> QueryPage:
+        """Selects the page by re-running the query with LIMIT and OFFSET."""
+        if not _has_order_by(normalized_query):
+            raise ValueError(
+                'The next page cannot be selected reliably: the result of the SQL query is no longer kept by '
+                'the server and the query does not order its rows. Add ORDER BY to the query to page through it, '
+                'or retrieve all the rows at once.'
+            )
+        limit = max(0, min(page_size, self.MAX_RESULT_ROWS - offset))
+        # one more row is selected to find out if there is a next page
+        result = await self.execute_query(f'select * from ({normalized_query}) limit {limit + 1} offset {offset}')
+        if result.is_error or result.data is None:
+            return QueryPage(result=result)
+
+        rows = result.data.rows
+        end = offset + limit
+        next_cursor: str | None = None
+        if len(rows) > limit:
+            if end < self.MAX_RESULT_ROWS:
+                next_cursor = _encode_cursor(None, end, truncated, query_hash)
+            else:
+                truncated = True
+        page = SqlSelectData(columns=result.data.columns, rows=rows[:limit])
+        return QueryPage(result=QueryResult(status='ok', data=page), next_cursor=next_cursor, truncated=truncated)
+
+    def _get_read_tables(self, normalized_query: str) -> set[str] | None:
+        """
+        Gets the IDs of the Storage tables read by the query.
+
+        :return: The table IDs or None if the query result must not be cached
+        """
+        if not normalized_query.lower().startswith(('select ', 'with ')):
+            return None
+        if _NONDETERMINISTIC_SQL.search(normalized_query):
+            return None
+
+        table_ids: set[str] = set()
+        for match in _QUOTED_NAME_CHAIN.finditer(normalized_query):
+            names = [name[1:-1] for name in re.findall(_QUOTED_NAME, match.group(0))]
+            schema_name, table_name = names[-2], names[-1]
+            if table_id := self._table_ids_by_name.get((schema_name, table_name)):
+                table_ids.add(table_id)
+            elif _STORAGE_BUCKET_ID.match(schema_name):
+                table_ids.add(f'{schema_name}.{table_name}')
+            elif len(names) > 2:
+                # a table that is not in the Storage, e.g. in the workspace schema
+                return None
+            # two names that are not a Storage table are most likely a table alias and a column
+
+        if not table_ids or not self._reads_only_tables(normalized_query, table_ids):
+            return None
+        return table_ids
+
+    def _reads_only_tables(self, normalized_query: str, table_ids: set[str]) -> bool:
+        """
+        Checks that the query reads nothing but the Storage tables, the subqueries and the common table expressions.
+
+        The changes of the other tables, e.g. a table in the workspace referred to by an unquoted name, or the results
+        of table functions would not invalidate the cached result.
+        """
+        query = _STRING_LITERAL.sub("''", normalized_query)
+        cte_names = {self._name_key(name) for name in _CTE_NAME.findall(query)}
+        targets: list[str] = []
+        for match in _FROM_TARGET.finditer(query):
+            targets.append(match.group(1))
+            pos = match.end()
+            while next_match := _NEXT_FROM_TARGET.match(query, pos):
+                targets.append(next_match.group(1))
+                pos = next_match.end()
+            if query[pos:].lstrip().startswith('(') and targets[-1] != '(':
+                # a table function, e.g. TABLE(...) or FLATTEN(...)
+                return False
+
+        for target in targets:
+            if target == '(':
+                continue  # a subquery, its tables are checked by its own FROM clause
+            names = re.findall(rf'{_QUOTED_NAME}|{_UNQUOTED_NAME}', target)
+            if len(names) == 1:
+                if self._name_key(names[0]) not in cte_names:
+                    return False
+            elif any(name[0] not in '"`' for name in names):
+                return False
+            else:
+                schema_name, table_name = names[-2][1:-1], names[-1][1:-1]
+                table_id = self._table_ids_by_name.get((schema_name, table_name)) or f'{schema_name}.{table_name}'
+                if table_id not in table_ids:
+                    return False
+        return True
+
+    @staticmethod
+    def _name_key(name: str) -> str:
+        """Gets the name of a common table expression as it is matched, the unquoted names are case-insensitive."""
+        return name[1:-1] if name[0] in '"`' else name.lower()
+
+    async def _get_table_versions(self, table_ids: set[str]) -> dict[str, tuple[Any, Any]] | None:
+        """Gets the last import and change dates of the tables, None if any of the tables cannot be retrieved."""
+        sorted_ids = sorted(table_ids)
+        tables = await asyncio.gather(
+            *(self._client.storage_client.table_detail(table_id, use_cache=False) for table_id in sorted_ids),
+            return_exceptions=True,
+        )
+        versions: dict[str, tuple[Any, Any]] = {}
+        for table_id, table in zip(sorted_ids, tables):
+            if isinstance(table, BaseException):
+                LOG.info(f'Failed to retrieve table {table_id}, the query result is not cached: {table}')
+                return None
+            versions[table_id] = (table.get('lastImportDate'), table.get('lastChangeDate'))
+        return versions
 
     async def get_table_fqn(self, table: Mapping[str, Any]) -> Optional[TableFqn]:
         table_id = table['id']
@@ -388,14 +1056,51 @@ class WorkspaceManager:
         workspace = await self._get_workspace()
         fqn = await workspace.get_table_fqn(table)
         if fqn:
-            self._table_fqn_cache[table_id] = fqn
+            self._cache_table_fqn(table_id, fqn)
 
         return fqn
 
+    async def get_table_fqns(self, tables: Sequence[Mapping[str, Any]]) -> list[TableFqn | None]:
+        """
+        Gets the fully qualified names of multiple Keboola tables at once.
+
+        :param tables: The tables as returned from the Storage API
+        :return: The fully qualified names in the order of the tables, None for the tables that cannot be resolved
+        """
+        missing = [table for table in tables if table['id'] not in self._table_fqn_cache]
+        if missing:
+            workspace = await self._get_workspace()
+            for table, fqn in zip(missing, await workspace.get_table_fqns(missing)):
+                if fqn:
+                    self._cache_table_fqn(table['id'], fqn)
+
+        return [self._table_fqn_cache.get(table['id']) for table in tables]
+
+    def _cache_table_fqn(self, table_id: str, fqn: TableFqn) -> None:
+        self._table_fqn_cache[table_id] = fqn
+        self._table_ids_by_name[(fqn.schema_name, fqn.table_name)] = table_id
+
+    async def _get_project_backend(self) -> str | None:
+        """
+        Gets the backend of the project the workspaces are created in.
+
+        The backend is known from the token verification, so unlike `_get_workspace()` it never creates
+        a workspace.
+        """
+        if self._workspace:
+            return None
+        token_identity = await self._client.storage_client.token_identity()
+        backend = (token_identity.default_backend or '').lower()
+        return backend if backend in _BACKEND_SQL_DIALECTS else None
+
     async def get_quoted_name(self, name: str) -> str:
+        if backend := await self._get_project_backend():
+            return f'{_BACKEND_QUOTE_CHARS[backend]}{name}{_BACKEND_QUOTE_CHARS[backend]}'
         workspace = await self._get_workspace()
         return workspace.get_quoted_name(name)
 
     async def get_sql_dialect(self) -> str:
+        if backend := await self._get_project_backend():
+            return _BACKEND_SQL_DIALECTS[backend]
         workspace = await self._get_workspace()
         return workspace.get_sql_dialect()
@@ -0,0 +1,903 @@
+import asyncio
+import json
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any
+
+import httpx
+import pytest
+
+from keboola_mcp_server import client as client_module
+from keboola_mcp_server.client import (
+    AdaptiveConcurrencyLimiter,
+    AIServiceClient,
+    AsyncStorageClient,
+    CircuitBreaker,
+    CircuitOpenError,
+    HedgingPolicy,
+    HttpClientPool,
+    KeboolaClient,
+    RawKeboolaClient,
+    RequestHedger,
+    ResponseCache,
+    RetryPolicy,
+    TokenIdentity,
+    _QueryResponseParser,
+    decode_json,
+    encode_json,
+)
+from keboola_mcp_server.metrics import METRICS
+
+
+class TestHttpClientPool:
+
+    def test_get_same_origin(self):
+        pool = HttpClientPool()
+        storage = pool.get('https://connection.keboola.com/v2/storage')
+        assert pool.get('https://connection.keboola.com/v2/storage/buckets') is storage
+        assert pool.get('https://queue.keboola.com') is not storage
+
+    @pytest.mark.asyncio
+    async def test_aclose(self):
+        pool = HttpClientPool()
+        client = pool.get('https://connection.keboola.com/v2/storage')
+        await pool.aclose()
+        assert client.is_closed
+        # a new client is created after the pool is closed
+        assert pool.get('https://connection.keboola.com/v2/storage') is not client
+
+    @pytest.mark.asyncio
+    async def test_raw_client_uses_pool(self):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={'id': 'in.c-foo'})
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        raw_client = RawKeboolaClient('https://connection.keboola.com/v2/storage', 'token-1234', http_pool=pool)
+
+        assert await raw_client.get('buckets/in.c-foo') == {'id': 'in.c-foo'}
+        assert await raw_client.post('buckets/in.c-foo/metadata', data={'foo': 'bar'}) == {'id': 'in.c-foo'}
+        assert [str(rq.url) for rq in requests] == [
+            'https://connection.keboola.com/v2/storage/buckets/in.c-foo',
+            'https://connection.keboola.com/v2/storage/buckets/in.c-foo/metadata',
+        ]
+        assert all(rq.headers['X-StorageAPI-Token'] == 'token-1234' for rq in requests)
+        assert not pool.get(raw_client.base_api_url).is_closed
+        await pool.aclose()
+
+    def test_keboola_client_shares_pool(self):
+        pool = HttpClientPool()
+        client = KeboolaClient('token-1234', 'https://connection.keboola.com', http_pool=pool)
+        assert client.storage_client.raw_client._http_pool is pool
+        assert client.jobs_queue_client.raw_client._http_pool is pool
+        assert client.ai_service_client.raw_client._http_pool is pool
+
+    def test_http2_requires_h2(self, mocker):
+        mocker.patch('keboola_mcp_server.client.importlib.util.find_spec', return_value=None)
+        with pytest.raises(RuntimeError, match='h2'):
+            HttpClientPool(http2=True)
+        assert HttpClientPool().http2 is False
+
+
+class TestRetryPolicy:
+
+    @pytest.fixture
+    def policy(self) -> RetryPolicy:
+        return RetryPolicy(max_attempts=3, backoff_base=0.0)
+
+    @staticmethod
+    def _raw_client(policy: RetryPolicy, responses: list[httpx.Response | Exception]) -> RawKeboolaClient:
+        def handler(request: httpx.Request) -> httpx.Response:
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        return RawKeboolaClient(
+            'https://connection.keboola.com/v2/storage', 'token', http_pool=pool, retry_policy=policy
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_retried(self, policy: RetryPolicy):
+        service = 'connection.keboola.com'
+        retries = METRICS.get('http_retries', service=service, method='GET')
+        raw_client = self._raw_client(
+            policy, [httpx.Response(503), httpx.ReadTimeout('timeout'), httpx.Response(200, json={'id': 'foo'})]
+        )
+        assert await raw_client.get('buckets/foo') == {'id': 'foo'}
+        assert METRICS.get('http_retries', service=service, method='GET') == retries + 2
+
+    @pytest.mark.asyncio
+    async def test_attempts_exhausted(self, policy: RetryPolicy):
+        raw_client = self._raw_client(policy, [httpx.Response(502), httpx.Response(502), httpx.Response(502)])
+        with pytest.raises(httpx.HTTPStatusError):
+            await raw_client.get('buckets/foo')
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ('idempotent', 'responses', 'expected'),
+        [
+            (False, [httpx.Response(502), httpx.Response(200, json={})], httpx.HTTPStatusError),
+            (False, [httpx.ReadTimeout('timeout'), httpx.Response(200, json={})], httpx.ReadTimeout),
+            (False, [httpx.ConnectError('refused'), httpx.Response(200, json={'ok': 1})], {'ok': 1}),
+            (False, [httpx.Response(429), httpx.Response(200, json={'ok': 1})], {'ok': 1}),
+            (True, [httpx.Response(502), httpx.Response(200, json={'ok': 1})], {'ok': 1}),
+            (True, [httpx.ConnectTimeout('timeout'), httpx.Response(200, json={'ok': 1})], {'ok': 1}),
+            # the request may have been processed for the whole timeout, it is not sent again
+            (True, [httpx.ReadTimeout('timeout'), httpx.Response(200, json={})], httpx.ReadTimeout),
+            (True, [httpx.RemoteProtocolError('closed'), httpx.Response(200, json={})], httpx.RemoteProtocolError),
+        ],
+    )
+    async def test_post(self, idempotent: bool, responses: list, expected: Any, policy: RetryPolicy):
+        raw_client = self._raw_client(policy, responses)
+        if isinstance(expected, type):
+            with pytest.raises(expected):
+                await raw_client.post('jobs', data={}, idempotent=idempotent)
+        else:
+            assert await raw_client.post('jobs', data={}, idempotent=idempotent) == expected
+
+    @pytest.mark.parametrize(
+        ('attempt', 'headers', 'expected'),
+        [
+            (1, {'Retry-After': '2'}, 2.0),
+            (1, {'Retry-After': '120'}, None),
+            (3, {'Retry-After': '2'}, None),
+        ],
+    )
+    def test_retry_after(self, attempt: int, headers: dict[str, str], expected: float | None):
+        policy = RetryPolicy(max_attempts=3)
+        assert policy.get_delay(attempt, httpx.Response(429, headers=headers)) == expected
+
+    def test_backoff_with_jitter(self):
+        policy = RetryPolicy(max_attempts=10, backoff_base=1.0, backoff_max=4.0)
+        for attempt in range(1, 10):
+            delay = policy.get_delay(attempt)
+            assert 0.0 <= delay <= min(4.0, 2 ** (attempt - 1))
+
+
+class TestJsonCodec:
+
+    @pytest.mark.parametrize('orjson', [True, False])
+    def test_round_trip(self, orjson: bool, mocker):
+        if not orjson:
+            mocker.patch('keboola_mcp_server.client.orjson', None)
+        value = {'name': 'Příliš žluťoučký kůň', 'rows': [{'id': 1, 'value': 1.5, 'enabled': True, 'parent': None}]}
+        encoded = encode_json(value)
+        assert isinstance(encoded, bytes)
+        assert encoded.decode('utf-8') == (
+            '{"name":"Příliš žluťoučký kůň","rows":[{"id":1,"value":1.5,"enabled":true,"parent":null}]}'
+        )
+        assert decode_json(encoded) == value
+
+    @pytest.mark.asyncio
+    async def test_request_body(self):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, content=request.content)
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        raw_client = RawKeboolaClient('https://connection.keboola.com/v2/storage', 'token', http_pool=pool)
+        assert await raw_client.post('buckets', data={'name': 'foo'}) == {'name': 'foo'}
+        assert requests[0].headers['Content-Type'] == 'application/json'
+
+
+class TestAdaptiveConcurrencyLimiter:
+
+    @pytest.mark.asyncio
+    async def test_aimd(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4.0, max_limit=5.0)
+        for _ in range(4):
+            assert await limiter.acquire() is False
+        limiter.release(200)
+        assert limiter.limit == pytest.approx(4.25)
+
+        limiter.release(429)
+        assert limiter.limit == pytest.approx(2.125)
+        # the limit is decreased at most once per the decrease interval
+        limiter.release(503)
+        assert limiter.limit == pytest.approx(2.125)
+        # no response does not change the limit
+        limiter.release(None)
+        assert limiter.limit == pytest.approx(2.125)
+        assert limiter.in_flight == 0
+
+        for _ in range(100):
+            await limiter.acquire()
+            limiter.release(200)
+        assert limiter.limit == 5.0
+
+    @pytest.mark.asyncio
+    async def test_waiting(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1.0)
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        cancelled = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        limiter.release(200)
+        assert await waiting is True
+        assert limiter.in_flight == 1
+        limiter.release(200)
+        assert limiter.in_flight == 0
+
+    def test_shared_per_token_and_service(self):
+        limiter = AdaptiveConcurrencyLimiter.for_token('token-hash', 'connection.keboola.com')
+        assert AdaptiveConcurrencyLimiter.for_token('token-hash', 'connection.keboola.com') is limiter
+        assert AdaptiveConcurrencyLimiter.for_token('token-hash', 'queue.keboola.com') is not limiter
+        assert AdaptiveConcurrencyLimiter.for_token('other-hash', 'connection.keboola.com') is not limiter
+
+        raw_client = RawKeboolaClient('https://connection.keboola.com/v2/storage', 'token')
+        other_raw_client = RawKeboolaClient('https://connection.keboola.com/v2/storage/branch/123', 'token')
+        assert raw_client._limiter is other_raw_client._limiter
+
+
+class TestCircuitBreaker:
+
+    def test_open_and_close(self, mocker):
+        time_mock = mocker.patch('keboola_mcp_server.client.time.monotonic', return_value=100.0)
+        breaker = CircuitBreaker('ai.keboola.com', failure_threshold=2, reset_timeout=10.0)
+        for healthy in (False, True, False):
+            assert breaker.allow_request()
+            breaker.record(healthy)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+        assert breaker.allow_request()
+        breaker.record(False)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+        assert METRICS.get('circuit_breaker_state', service='ai.keboola.com') == 2
+
+        # a single probe is let through after the reset timeout
+        time_mock.return_value = 110.0
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+        breaker.record(False)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        time_mock.return_value = 120.0
+        assert breaker.allow_request()
+        breaker.record(True)
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert METRICS.get('circuit_breaker_state', service='ai.keboola.com') == 0
+
+    def test_cancelled_probe(self, mocker):
+        time_mock = mocker.patch('keboola_mcp_server.client.time.monotonic', return_value=100.0)
+        breaker = CircuitBreaker('ai.keboola.com', failure_threshold=1, reset_timeout=10.0)
+        breaker.record(False)
+        time_mock.return_value = 110.0
+        assert breaker.allow_request()
+        breaker.record(None)
+        # the probe did not complete, another one is allowed
+        assert breaker.allow_request()
+
+    @pytest.mark.asyncio
+    async def test_raw_client_fails_fast(self):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            raise httpx.ConnectError('refused')
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        raw_client = RawKeboolaClient(
+            'https://ai.keboola.com',
+            'token',
+            http_pool=pool,
+            retry_policy=RetryPolicy(max_attempts=5, backoff_base=0.0),
+            circuit_breaker=CircuitBreaker('ai.keboola.com', failure_threshold=3),
+        )
+        # the retries stop as soon as the breaker opens
+        with pytest.raises(CircuitOpenError):
+            await raw_client.get('docs/components/foo')
+        assert len(requests) == 3
+
+        with pytest.raises(CircuitOpenError):
+            await raw_client.post('docs/question', data={'query': 'foo'}, idempotent=True)
+        assert len(requests) == 3
+
+    @pytest.mark.asyncio
+    async def test_ai_service_component_timeout(self):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            raise httpx.ReadTimeout('timeout', request=request)
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        client = AIServiceClient.create('https://ai-timeout.keboola.test', 'token', http_pool=pool)
+        # the first call does not wait out the retries of the long read timeouts, the tools use the Storage API
+        with pytest.raises(httpx.ReadTimeout):
+            await client.get_component_detail('keboola.ex-aws-s3')
+        assert len(requests) == 1
+        assert requests[0].extensions['timeout']['read'] == AIServiceClient.CATALOG_TIMEOUT.read
+
+
+class TestRequestHedger:
+
+    @staticmethod
+    def _hedger(budget: float = 1.0) -> RequestHedger:
+        hedger = RequestHedger(
+            'connection.keboola.com', 'table_detail', HedgingPolicy(min_delay=0.01, budget=budget, min_samples=5)
+        )
+        for _ in range(100):
+            hedger._durations.append(0.01)
+        return hedger
+
+    @pytest.mark.asyncio
+    async def test_no_hedging_without_samples(self):
+        hedger = RequestHedger('connection.keboola.com', 'table_detail')
+        calls = []
+
+        async def send() -> str:
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        assert hedger.get_delay() is None
+        assert await hedger.run(send) == 'done'
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_wins(self):
+        hedger = self._hedger()
+        wins = METRICS.get('http_hedged_wins', service='connection.keboola.com', request='table_detail')
+        cancelled = []
+
+        async def send() -> str:
+            if not cancelled:
+                cancelled.append(False)
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled[0] = True
+                    raise
+                return 'slow'
+            return 'fast'
+
+        assert await hedger.run(send) == 'fast'
+        await asyncio.sleep(0)
+        assert cancelled == [True]
+        assert METRICS.get('http_hedged_wins', service='connection.keboola.com', request='table_detail') == wins + 1
+
+    @pytest.mark.asyncio
+    async def test_failed_request(self):
+        hedger = self._hedger()
+        attempts = []
+
+        async def send() -> str:
+            attempts.append(1)
+            if len(attempts) == 1:
+                await asyncio.sleep(0.05)
+                return 'slow'
+            raise httpx.ReadError('reset')
+
+        # the failure of the hedging request does not fail the original request
+        assert await hedger.run(send) == 'slow'
+        assert len(attempts) == 2
+
+    @pytest.mark.asyncio
+    async def test_budget(self):
+        hedger = self._hedger(budget=0.5)
+        calls = []
+
+        async def send() -> None:
+            calls.append(1)
+            await asyncio.sleep(0.03)
+
+        for _ in range(4):
+            await hedger.run(send)
+        # each request adds a half of the hedging request to the budget
+        assert len(calls) == 4 + 2
+
+    @pytest.mark.asyncio
+    async def test_storage_client(self, mocker):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={'id': 'in.c-foo.bar'})
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        run = mocker.spy(RequestHedger, 'run')
+        storage_client = AsyncStorageClient.create(
+            'https://connection.keboola.com', 'token', http_pool=pool, hedged_requests=['table_detail']
+        )
+        await storage_client.table_detail('in.c-foo.bar')
+        await storage_client.configuration_detail('keboola.ex-db-snowflake', '123')
+        assert run.call_count == 1
+
+
+class TestSingleFlight:
+
+    @pytest.mark.asyncio
+    async def test_identical_gets_coalesced(self):
+        requests: list[httpx.Request] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={'owner': {'id': 1234}})
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        raw_client = RawKeboolaClient('https://connection.keboola.com/v2/storage', 'token-1234', http_pool=pool)
+        other_token_client = RawKeboolaClient('https://connection.keboola.com/v2/storage', 'token-5678', http_pool=pool)
+        coalesced = METRICS.get('http_coalesced_requests', service='connection.keboola.com')
+
+        results = await asyncio.gather(
+            raw_client.get('tokens/verify'),
+            raw_client.get('tokens/verify'),
+            raw_client.get('tokens/verify'),
+            raw_client.get('tokens/verify', params={'foo': 'bar'}),
+            other_token_client.get('tokens/verify'),
+        )
+
+        assert all(result == {'owner': {'id': 1234}} for result in results)
+        # the callers do not share the same object
+        assert results[0] is not results[1] and results[1] is not results[2]
+        assert len(requests) == 3
+        assert METRICS.get('http_coalesced_requests', service='connection.keboola.com') == coalesced + 2
+        assert not RawKeboolaClient._IN_FLIGHT_GETS
+
+        # sequential requests are not coalesced
+        await raw_client.get('tokens/verify')
+        assert len(requests) == 4
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_error_shared(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.01)
+            return httpx.Response(404)
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        raw_client = RawKeboolaClient('https://connection.keboola.com/v2/storage', 'token-1234', http_pool=pool)
+        results = await asyncio.gather(
+            raw_client.get('buckets/foo'), raw_client.get('buckets/foo'), return_exceptions=True
+        )
+        assert all(isinstance(result, httpx.HTTPStatusError) for result in results)
+        await pool.aclose()
+
+
+class TestRevalidation:
+
+    @pytest.fixture(autouse=True)
+    def validated_responses(self, mocker):
+        mocker.patch.object(RawKeboolaClient, '_VALIDATED_RESPONSES', OrderedDict())
+
+    @staticmethod
+    def _raw_client(handler) -> RawKeboolaClient:
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        return RawKeboolaClient('https://connection.keboola.com/v2/storage', 'token', http_pool=pool)
+
+    @pytest.mark.asyncio
+    async def test_not_modified(self):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.headers.get('If-None-Match') == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json=[{'id': 'foo'}], headers={'ETag': '"v1"'})
+
+        raw_client = self._raw_client(handler)
+        service = 'connection.keboola.com'
+        not_modified = METRICS.get('http_revalidated_responses', service=service, result='not_modified')
+        first = await raw_client.get('buckets/in.c-foo/tables', params={'include': 'metadata'}, revalidate=True)
+        first.append({'id': 'bar'})
+        second = await raw_client.get('buckets/in.c-foo/tables', params={'include': 'metadata'}, revalidate=True)
+
+        assert second == [{'id': 'foo'}]
+        assert 'If-None-Match' not in requests[0].headers
+        assert requests[1].headers['If-None-Match'] == '"v1"'
+        assert METRICS.get('http_revalidated_responses', service=service, result='not_modified') == not_modified + 1
+
+    @pytest.mark.asyncio
+    async def test_no_validators(self):
+        bodies = [b'[{"id": "foo"}]', b'[{"id": "bar"}]']
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert 'If-None-Match' not in request.headers
+            return httpx.Response(200, content=bodies.pop(0))
+
+        raw_client = self._raw_client(handler)
+        assert await raw_client.get('branch/default/components', revalidate=True) == [{'id': 'foo'}]
+        assert await raw_client.get('branch/default/components', revalidate=True) == [{'id': 'bar'}]
+        # the responses without the validators are kept to be compared with the next response body
+        validated = list(RawKeboolaClient._VALIDATED_RESPONSES.values())
+        assert len(validated) == 1
+        assert validated[0].content == b'[{"id": "bar"}]'
+
+    @pytest.mark.asyncio
+    async def test_unchanged(self, mocker):
+        mocker.patch('keboola_mcp_server.client._THREAD_DECODE_MIN_SIZE', 0)
+        decode_json = mocker.spy(client_module, 'decode_json')
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json=[{'id': 'foo'}])
+
+        raw_client = self._raw_client(handler)
+        service = 'connection.keboola.com'
+        unchanged = METRICS.get('http_revalidated_responses', service=service, result='unchanged')
+        first = await raw_client.get('branch/default/components', revalidate=True)
+        kept = next(iter(RawKeboolaClient._VALIDATED_RESPONSES.values()))
+        kept.spare_value.result()
+        first.append({'id': 'bar'})
+        second = await raw_client.get('branch/default/components', revalidate=True)
+        second.append({'id': 'baz'})
+        third = await raw_client.get('branch/default/components', revalidate=True)
+        kept.spare_value.result()
+
+        assert third == [{'id': 'foo'}]
+        assert first is not second and second is not third
+        assert next(iter(RawKeboolaClient._VALIDATED_RESPONSES.values())) is kept
+        assert METRICS.get('http_revalidated_responses', service=service, result='unchanged') == unchanged + 2
+        # the value for each caller is decoded once, the values of the unchanged bodies are decoded ahead
+        assert decode_json.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_not_revalidated_by_default(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={'id': 'foo'}, headers={'ETag': '"v1"'})
+
+        await self._raw_client(handler).get('buckets/in.c-foo')
+        assert not RawKeboolaClient._VALIDATED_RESPONSES
+
+
+class TestResponseCache:
+
+    def test_ttl_and_lru(self, mocker):
+        time_mock = mocker.patch('keboola_mcp_server.client.time.monotonic', return_value=100.0)
+        cache = ResponseCache(ttl=10.0, max_entries=2)
+        cache.put('a', {'id': 'a'}, tags=['x'])
+        cache.put('b', {'id': 'b'}, tags=['y'])
+        assert cache.get('a') == {'id': 'a'}
+        cache.put('c', {'id': 'c'}, tags=['y'])
+        # 'b' is the least recently used entry
+        assert cache.get('b') is None
+        assert cache.get('a') == {'id': 'a'}
+
+        time_mock.return_value = 111.0
+        assert cache.get('a') is None
+        assert cache.get('c') is None
+
+    def test_invalidate(self):
+        cache = ResponseCache()
+        cache.put('a', {'id': 'a'}, tags=['x', 'y'])
+        cache.put('b', {'id': 'b'}, tags=['y'])
+        cache.put('c', {'id': 'c'}, tags=['z'])
+        version = cache.version
+        cache.invalidate('y')
+        assert cache.get('a') is None
+        assert cache.get('b') is None
+        assert cache.get('c') == {'id': 'c'}
+
+        # the value retrieved before the invalidation is not stored
+        cache.put('a', {'id': 'a'}, tags=['x'], version=version)
+        assert cache.get('a') is None
+
+    def test_values_copied(self):
+        cache = ResponseCache()
+        value = {'metadata': [{'key': 'foo'}]}
+        cache.put('a', value, tags=[])
+        value['metadata'].append({'key': 'bar'})
+        cache.get('a')['metadata'].append({'key': 'baz'})
+        assert cache.get('a') == {'metadata': [{'key': 'foo'}]}
+
+
+class TestAsyncStorageClientCache:
+
+    @pytest.fixture
+    def requests(self) -> list[httpx.Request]:
+        return []
+
+    @pytest.fixture
+    def storage_client(self, requests: list[httpx.Request]) -> AsyncStorageClient:
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.method == 'GET':
+                return httpx.Response(200, json={'path': request.url.path})
+            return httpx.Response(200, json={'metadata': [], 'columnsMetadata': {}})
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        return AsyncStorageClient.create(
+            'https://connection.keboola.com', 'token', http_pool=pool, cache=ResponseCache()
+        )
+
+    @pytest.mark.asyncio
+    async def test_reads_cached(self, storage_client: AsyncStorageClient, requests: list[httpx.Request]):
+        for _ in range(2):
+            await storage_client.bucket_detail('in.c-foo')
+            await storage_client.table_detail('in.c-foo.bar')
+            await storage_client.bucket_table_list('in.c-foo', include=['metadata'])
+            await storage_client.component_detail('keboola.ex-db-snowflake')
+        assert len(requests) == 4
+
+        # different parameters are cached separately
+        await storage_client.bucket_table_list('in.c-foo', include=['columns'])
+        assert len(requests) == 5
+
+    @pytest.mark.asyncio
+    async def test_cache_bypassed(self, storage_client: AsyncStorageClient, requests: list[httpx.Request]):
+        await storage_client.branch_metadata_get()
+        await storage_client.branch_metadata_get(use_cache=False)
+        assert len(requests) == 2
+
+        # the fresh response is cached
+        await storage_client.branch_metadata_get()
+        assert len(requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate(self, storage_client: AsyncStorageClient, requests: list[httpx.Request]):
+        await storage_client.bucket_detail('in.c-foo')
+        await storage_client.bucket_table_list('in.c-foo')
+        await storage_client.table_detail('in.c-foo.bar')
+        await storage_client.table_detail('in.c-foo.baz')
+        await storage_client.configuration_list('keboola.ex-db-snowflake')
+        assert len(requests) == 5
+
+        # the table metadata are also listed by the bucket, so all the bucket reads are invalidated
+        await storage_client.table_metadata_update('in.c-foo.bar', metadata={'KBC.description': 'foo'})
+        await storage_client.configuration_list('keboola.ex-db-snowflake')  # cached
+        await storage_client.bucket_table_list('in.c-foo')
+        await storage_client.table_detail('in.c-foo.bar')
+        assert len(requests) == 8
+
+        await storage_client.configuration_update('keboola.ex-db-snowflake', '123', {}, 'change')
+        await storage_client.configuration_list('keboola.ex-db-snowflake')
+        assert len(requests) == 10
+
+
+class TestTokenIdentity:
+
+    @pytest.fixture(autouse=True)
+    def verified_tokens(self, mocker):
+        mocker.patch.object(AsyncStorageClient, '_VERIFIED_TOKENS', OrderedDict())
+
+    @staticmethod
+    def _storage_client(token_data: dict[str, Any], requests: list[httpx.Request]) -> AsyncStorageClient:
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json=token_data)
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        return AsyncStorageClient.create('https://connection.keboola.com', 'token', http_pool=pool)
+
+    def test_from_token_data(self):
+        identity = TokenIdentity.from_token_data({
+            'expires': '2025-07-01T12:00:00+0200',
+            'owner': {'id': 123, 'name': 'Project', 'defaultBackend': 'snowflake'},
+            'organization': {'id': 456},
+        })
+        assert identity == TokenIdentity(
+            project_id='123',
+            project_name='Project',
+            organization_id='456',
+            default_backend='snowflake',
+            expires_at=datetime(2025, 7, 1, 10, 0, tzinfo=timezone.utc),
+        )
+
+    @pytest.mark.parametrize(
+        ('expires', 'expected'),
+        [
+            ('2025-07-01T12:00:00+0200', datetime(2025, 7, 1, 10, 0, tzinfo=timezone.utc)),
+            ('2025-07-01T12:00:00+02:00', datetime(2025, 7, 1, 10, 0, tzinfo=timezone.utc)),
+            ('2025-07-01T12:00:00', datetime(2025, 7, 1, 12, 0, tzinfo=timezone.utc)),
+            ('2025-07-01T12:00:00.5+00:00', datetime(2025, 7, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)),
+            ('tomorrow', None),
+        ],
+    )
+    def test_expires_at(self, expires: str, expected: datetime | None):
+        assert TokenIdentity.from_token_data({'expires': expires}).expires_at == expected
+
+    @pytest.mark.asyncio
+    async def test_cached(self):
+        requests: list[httpx.Request] = []
+        token_data = {'owner': {'id': 123, 'name': 'Project'}, 'organization': {'id': 456}}
+        storage_client = self._storage_client(token_data, requests)
+
+        assert await storage_client.project_id() == '123'
+        assert (await storage_client.token_identity()).organization_id == '456'
+        (await storage_client.verify_token())['owner']['id'] = 789
+        assert await storage_client.verify_token() == token_data
+        # the verified token is shared by all clients using the same token
+        assert await self._storage_client(token_data, requests).project_id() == '123'
+        assert len(requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_token_expiration(self, mocker):
+        time_mock = mocker.patch('keboola_mcp_server.client.time.time', return_value=1_750_000_000.0)
+        requests: list[httpx.Request] = []
+        expires = datetime.fromtimestamp(1_750_000_060.0, tz=timezone.utc).isoformat()
+        storage_client = self._storage_client({'expires': expires, 'owner': {'id': 123}}, requests)
+        assert storage_client.verified_token_identity() is None
+
+        await storage_client.project_id()
+        time_mock.return_value = 1_750_000_059.0
+        await storage_client.project_id()
+        assert storage_client.verified_token_identity().expires_at.timestamp() == 1_750_000_060.0
+        assert len(requests) == 1
+        time_mock.return_value = 1_750_000_061.0
+        assert storage_client.verified_token_identity() is None
+        await storage_client.project_id()
+        assert len(requests) == 2
+
+
+class TestWorkspaceQueryStreaming:
+
+    @staticmethod
+    def _parse(content: bytes, chunk_size: int, **limits: int) -> dict[str, Any]:
+        parser = _QueryResponseParser(**limits)
+        for i in range(0, len(content), chunk_size):
+            parser.feed(content[i:i + chunk_size])
+            if parser.done:
+                break
+        return parser.close()
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 7, 64, 1024 * 1024])
+    @pytest.mark.parametrize(
+        ('response', 'expected_rows'),
+        [
+            (
+                {
+                    'status': 'ok',
+                    'data': {
+                        'columns': ['id', 'name'],
+                        'rows': [
+                            {'id': 1, 'name': 'Příliš žluťoučký kůň'},
+                            {'name': 'a "quoted", [bracketed] {braced} \\ name', 'id': 2},
+                            {'id': 3, 'name': None},
+                        ],
+                    },
+                    'message': 'The "rows": [] are selected.',
+                },
+                [(1, 'Příliš žluťoučký kůň'), (2, 'a "quoted", [bracketed] {braced} \\ name'), (3, None)],
+            ),
+            (
+                # the columns after the rows and the rows with missing values
+                {'status': 'ok', 'data': {'rows': [{'id': 1}, {'id': 2, 'name': 'foo'}], 'columns': ['id', 'name']}},
+                [(1, None), (2, 'foo')],
+            ),
+            (
+                {'message': 'rows', 'status': 'ok', 'data': {'columns': [], 'rows': []}},
+                [],
+            ),
+        ],
+    )
+    def test_parse(self, response: dict[str, Any], expected_rows: list[tuple], chunk_size: int):
+        content = json.dumps(response, indent=1, ensure_ascii=False).encode('utf-8')
+        parsed = self._parse(content, chunk_size)
+        assert parsed['data']['rows'] == expected_rows
+        assert parsed | {'data': None} == response | {'data': None}
+        assert parsed['data']['columns'] == response['data']['columns']
+
+    @pytest.mark.parametrize(
+        'response',
+        [
+            {'status': 'error', 'message': 'Invalid SQL'},
+            {'status': 'ok', 'data': None, 'message': '1 table created'},
+        ],
+    )
+    def test_parse_without_rows(self, response: dict[str, Any]):
+        assert self._parse(json.dumps(response).encode('utf-8'), 5) == response
+
+    @pytest.mark.parametrize('chunk_size', [1, 7, 1024 * 1024])
+    @pytest.mark.parametrize(
+        ('limits', 'expected_count', 'expected_truncated'),
+        [
+            ({}, 10, False),
+            ({'max_rows': 10}, 10, False),
+            ({'max_rows': 4}, 4, True),
+            ({'max_rows': 0}, 0, True),
+            ({'max_bytes': 3 * 26}, 3, True),
+            ({'max_rows': 5, 'max_bytes': 3 * 26 - 1}, 2, True),
+        ],
+    )
+    @pytest.mark.parametrize('columns_first', [True, False])
+    def test_parse_limits(
+        self,
+        limits: dict[str, int],
+        expected_count: int,
+        expected_truncated: bool,
+        columns_first: bool,
+        chunk_size: int,
+    ):
+        # each row is 26 characters of JSON
+        rows = [{'id': i, 'name': f'name{i}'} for i in range(10)]
+        data = {'columns': ['id', 'name'], 'rows': rows} if columns_first else {'rows': rows, 'columns': ['id', 'name']}
+        content = json.dumps({'status': 'ok', 'data': data, 'message': None}).encode('utf-8')
+        parsed = self._parse(content, chunk_size, **limits)
+        assert parsed['status'] == 'ok'
+        assert parsed['data']['columns'] == ['id', 'name']
+        assert parsed['data']['rows'] == [(i, f'name{i}') for i in range(expected_count)]
+        assert parsed['data']['truncated'] is expected_truncated
+        assert parsed['data']['rows_size'] == 26 * expected_count
+
+    def test_parse_incomplete(self):
+        with pytest.raises(ValueError):
+            self._parse(b'{"status": "ok", "data": {"columns": ["id"], "rows": [{"id": 1}, {"id"', 5)
+
+    @pytest.fixture
+    def responses(self) -> list[httpx.Response]:
+        return []
+
+    @pytest.fixture
+    def storage_client(self, responses: list[httpx.Response]) -> AsyncStorageClient:
+        def handler(request: httpx.Request) -> httpx.Response:
+            return responses.pop(0)
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        client = AsyncStorageClient.create('https://connection.keboola.com', 'token', http_pool=pool)
+        client.raw_client.retry_policy = RetryPolicy(max_attempts=3, backoff_base=0.0)
+        return client
+
+    @pytest.mark.asyncio
+    async def test_workspace_query(self, storage_client: AsyncStorageClient, responses: list[httpx.Response]):
+        body = {'status': 'ok', 'data': {'columns': ['a', 'b'], 'rows': [{'a': i, 'b': str(i)} for i in range(1000)]}}
+        responses.extend([httpx.Response(503), httpx.Response(200, json=body)])
+        result = await storage_client.workspace_query(1234, 'select "a", "b" from "foo"')
+        assert result['data']['rows'] == [(i, str(i)) for i in range(1000)]
+
+    @pytest.mark.asyncio
+    async def test_workspace_query_in_thread(
+        self, storage_client: AsyncStorageClient, responses: list[httpx.Response], mocker
+    ):
+        mocker.patch('keboola_mcp_server.client._THREAD_DECODE_MIN_SIZE', 1024)
+        to_thread = mocker.spy(asyncio, 'to_thread')
+        body = {'status': 'ok', 'data': {'columns': ['a', 'b'], 'rows': [{'a': i, 'b': str(i)} for i in range(1000)]}}
+        responses.append(httpx.Response(200, json=body))
+        result = await storage_client.workspace_query(1234, 'select "a", "b" from "foo"')
+        assert result['data']['rows'] == [(i, str(i)) for i in range(1000)]
+        assert to_thread.call_count > 1
+
+    @pytest.mark.asyncio
+    async def test_workspace_query_limits(
+        self, storage_client: AsyncStorageClient, responses: list[httpx.Response], mocker
+    ):
+        mocker.patch('keboola_mcp_server.client._THREAD_DECODE_MIN_SIZE', 64)
+        sent_rows = 0
+
+        async def content():
+            nonlocal sent_rows
+            yield b'{"status": "ok", "data": {"columns": ["a"], "rows": ['
+            for i in range(1000):
+                sent_rows += 1
+                yield f'{{"a": {i}}}, '.encode('utf-8')
+            yield b'{"a": 1000}]}}'
+
+        responses.append(httpx.Response(200, content=content()))
+        result = await storage_client.workspace_query(1234, 'select "a" from "foo"', max_rows=10)
+        assert result == {
+            'status': 'ok',
+            'data': {'columns': ['a'], 'rows': [(i,) for i in range(10)], 'truncated': True, 'rows_size': 80},
+        }
+        # the rest of the response is not read
+        assert sent_rows < 1000
+
+    @pytest.mark.asyncio
+    async def test_workspace_query_timeout(self, responses: list[httpx.Response]):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            raise httpx.ReadTimeout('timeout', request=request)
+
+        pool = HttpClientPool(transport=httpx.MockTransport(handler))
+        storage_client = AsyncStorageClient.create('https://connection.keboola.com', 'token', http_pool=pool)
+        with pytest.raises(httpx.ReadTimeout):
+            await storage_client.workspace_query(1234, 'select * from "foo"')
+        # the long-running query is not run again in the warehouse
+        assert len(requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_workspace_query_error(self, storage_client: AsyncStorageClient, responses: list[httpx.Response]):
+        responses.append(httpx.Response(400, json={'error': 'Invalid query'}))
+        with pytest.raises(httpx.HTTPStatusError) as e:
+            await storage_client.workspace_query(1234, 'select foo')
+        assert e.value.response.json() == {'error': 'Invalid query'}
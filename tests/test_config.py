@@ -33,6 +33,10 @@ class TestConfig:
                 {'accept_secrets_in_url': 'true'},
                 Config(accept_secrets_in_url=True),
             ),
+            (
+                {'KBC_HTTP_MAX_CONNECTIONS': '10', 'KBC_HTTP_KEEPALIVE_EXPIRY': '2.5'},
+                Config(http_max_connections=10, http_keepalive_expiry=2.5),
+            ),
         ],
     )
     def test_from_dict(self, d: Mapping[str, str], expected: Config) -> None:
@@ -66,6 +70,26 @@ class TestConfig:
     def test_replace_by(self, orig: Config, d: Mapping[str, str], expected: Config) -> None:
         assert orig.replace_by(d) == expected
 
+    def test_replace_by_untrusted(self) -> None:
+        config = Config(query_output_dir='/tmp/out', query_buffer_size=1024)
+        d = {
+            'X-Workspace-Schema': 'foo',
+            'X-Query-Output-Dir': '/etc',
+            'X-Query-Buffer-Size': '99999999999999',
+            'X-Query-Cache-Size': 'foo',
+            'X-Storage-Cache-Ttl': '3600',
+            'X-Http-Max-Connections': '10000',
+            'X-Http2': 'true',
+            'X-Workspace-Prewarm': 'true',
+            'X-Hedged-Requests': 'table_detail,job_detail',
+        }
+        assert config.replace_by(d, trusted=False) == Config(
+            workspace_schema='foo', query_output_dir='/tmp/out', query_buffer_size=1024
+        )
+        assert config.replace_by({'KBC_QUERY_BUFFER_SIZE': '0', 'KBC_STORAGE_CACHE_TTL': '10'}) == Config(
+            query_output_dir='/tmp/out', query_buffer_size=0, storage_cache_ttl=10.0
+        )
+
     def test_defaults(self) -> None:
         config = Config()
         assert config.storage_token is None
@@ -78,7 +102,11 @@ class TestConfig:
         assert str(config) == ("Config(storage_api_url=None, storage_token='****', workspace_schema=None, "
                                'accept_secrets_in_url=None, oauth_client_id=None, oauth_client_secret=None, '
                                'oauth_server_url=None, oauth_scope=None, mcp_server_url=None, '
-                               'jwt_secret=None, bearer_token=None)')
+                               'jwt_secret=None, bearer_token=None, http_max_connections=None, '
+                               'http_max_keepalive_connections=None, http_keepalive_expiry=None, http2=None, '
+                               'storage_cache_ttl=None, workspace_prewarm=None, hedged_requests=None, '
+                               'query_cache_size=None, query_buffer_size=None, query_output_dir=None, '
+                               'metrics_endpoint=None)')
 
     def test_url_field(self):
         config = Config(
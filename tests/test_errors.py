@@ -2,7 +2,7 @@ import logging
 
 import pytest
 
-from keboola_mcp_server.errors import ToolException, tool_errors
+from keboola_mcp_server.errors import PREPARE_CALL_ATTR, ToolException, tool_errors
 
 
 # --- Fixtures ---
@@ -101,3 +101,32 @@ async def test_logging_on_tool_exception(caplog, function_with_value_error):
     assert 'failed to run tool' in caplog.text.lower()
     assert 'simulated valueerror' in caplog.text.lower()
     assert 'raise valueerror' in caplog.text.lower()
+
+
+# --- Test the prepared calls ---
+@pytest.mark.asyncio
+async def test_prepare_call():
+    """Test that the tool function exposing the call preparation is called directly by the tool_errors wrapper."""
+    calls = []
+
+    async def tool(param: str) -> str:
+        calls.append(('tool', param))
+        return param
+
+    async def inner_wrapper(*args, **kwargs):
+        raise AssertionError('The inner wrapper must not be called.')
+
+    def prepare_call(args, kwargs):
+        calls.append(('prepare', kwargs['param']))
+        if kwargs['param'] == 'invalid':
+            raise ValueError('Invalid param')
+
+    setattr(inner_wrapper, PREPARE_CALL_ATTR, (prepare_call, tool))
+    decorated_func = tool_errors(default_recovery='General recovery message.')(inner_wrapper)
+
+    assert not hasattr(decorated_func, PREPARE_CALL_ATTR)
+    assert await decorated_func(param='foo') == 'foo'
+    assert calls == [('prepare', 'foo'), ('tool', 'foo')]
+
+    with pytest.raises(ToolException, match='Invalid param'):
+        await decorated_func(param='invalid')
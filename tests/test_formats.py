@@ -0,0 +1,69 @@
+import os
+import time
+
+import pytest
+
+from keboola_mcp_server.formats import ArrowFormatter, ParquetFormatter, ResultFileWriter, get_formats, get_formatter
+from keboola_mcp_server.workspace import SqlSelectData
+
+_DATA = SqlSelectData(columns=['id', 'name'], rows=[(1, 'John'), (2, 'Jo|e\nDoe'), (3, None)])
+
+
+@pytest.mark.parametrize(
+    ('name', 'expected'),
+    [
+        ('csv', 'id,name\r\n1,John\r\n2,"Jo|e\nDoe"\r\n3,\r\n'),
+        ('json', '{"columns":["id","name"],"rows":[[1,"John"],[2,"Jo|e\\nDoe"],[3,null]]}'),
+        ('jsonl', '{"id":1,"name":"John"}\n{"id":2,"name":"Jo|e\\nDoe"}\n{"id":3,"name":null}\n'),
+        ('markdown', '| id | name |\n|---|---|\n| 1 | John |\n| 2 | Jo\\|e<br>Doe |\n| 3 |  |\n'),
+    ],
+)
+def test_text_formats(name: str, expected: str):
+    assert get_formatter(name).format(_DATA) == expected
+
+
+def test_get_formats():
+    assert list(get_formats()) == ['csv', 'json', 'jsonl', 'markdown', 'arrow', 'parquet']
+    with pytest.raises(ValueError, match='Unsupported output format: xml, the supported formats are: csv, json'):
+        get_formatter('xml')
+
+
+@pytest.mark.parametrize('formatter', [ArrowFormatter(), ParquetFormatter()])
+def test_file_formats(formatter, tmp_path):
+    pa = pytest.importorskip('pyarrow')
+
+    data = SqlSelectData(columns=['id', 'name', 'mixed'], rows=[(1, 'John', 1), (2, None, 'x')])
+    path = ResultFileWriter(tmp_path / 'out').write(data, formatter)
+    assert path.parent == tmp_path / 'out'
+    assert path.suffix == f'.{formatter.extension}'
+
+    if isinstance(formatter, ArrowFormatter):
+        with pa.OSFile(str(path), 'rb') as source:
+            table = pa.ipc.open_file(source).read_all()
+    else:
+        table = pytest.importorskip('pyarrow.parquet').read_table(str(path))
+    assert table.to_pydict() == {'id': [1, 2], 'name': ['John', None], 'mixed': ['1', 'x']}
+
+
+def test_file_formats_no_pyarrow(tmp_path, mocker):
+    mocker.patch('importlib.util.find_spec', return_value=None)
+    with pytest.raises(ValueError, match="requires the 'pyarrow' package"):
+        ResultFileWriter(tmp_path).write(_DATA, ParquetFormatter())
+
+
+def test_file_retention(tmp_path, mocker):
+    mocker.patch.object(ParquetFormatter, 'check_available')
+    mocker.patch.object(ParquetFormatter, 'write', side_effect=lambda data, path: path.write_bytes(b'PAR1'))
+    now = time.time()
+    old_files = []
+    for idx, age in enumerate([7200, 30, 20, 10]):
+        path = tmp_path / f'query-{idx:032x}.arrow'
+        path.write_bytes(b'ARROW1')
+        os.utime(path, (now - age, now - age))
+        old_files.append(path)
+    other_file = tmp_path / 'notes.txt'
+    other_file.write_text('foo')
+
+    path = ResultFileWriter(tmp_path, max_age=3600, max_files=3).write(_DATA, ParquetFormatter())
+    # the expired file and the oldest file beyond the limit are removed
+    assert sorted(tmp_path.iterdir()) == sorted([old_files[2], old_files[3], path, other_file])
@@ -0,0 +1,196 @@
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+from fastmcp import Context
+from mcp.shared.session import BaseSession
+
+from keboola_mcp_server.client import KeboolaClient, TokenIdentity
+from keboola_mcp_server.config import Config
+from keboola_mcp_server.mcp import (
+    ServerState,
+    SessionStateRegistry,
+    _create_session_state,
+    _parse_hedged_requests,
+    _replace_config,
+    with_session_state,
+)
+from keboola_mcp_server.workspace import WorkspaceManager
+
+
+@pytest.fixture
+def config() -> Config:
+    return Config(
+        storage_api_url='https://connection.keboola.com', storage_token='token-1234', workspace_schema='WORKSPACE_1'
+    )
+
+
+class TestSessionStateRegistry:
+
+    def test_get_put(self, config: Config):
+        registry = SessionStateRegistry()
+        assert registry.get(config) is None
+
+        state = _create_session_state(config)
+        registry.put(config, state)
+        shared_state = registry.get(config)
+        assert shared_state is not state
+        assert shared_state[KeboolaClient.STATE_KEY] is state[KeboolaClient.STATE_KEY]
+        assert shared_state[WorkspaceManager.STATE_KEY] is state[WorkspaceManager.STATE_KEY]
+
+        assert registry.get(Config(**(config.__dict__ | {'storage_token': 'token-5678'}))) is None
+        assert registry.get(Config(**(config.__dict__ | {'workspace_schema': 'WORKSPACE_2'}))) is None
+
+    def test_expiration(self, config: Config, mocker):
+        time_mock = mocker.patch('keboola_mcp_server.mcp.time.time', return_value=1000.0)
+        registry = SessionStateRegistry(ttl=60.0)
+        registry.put(config, {'foo': 'bar'})
+
+        # the use of the state extends its life
+        time_mock.return_value = 1050.0
+        assert registry.get(config) == {'foo': 'bar'}
+        time_mock.return_value = 1100.0
+        assert registry.get(config) == {'foo': 'bar'}
+        time_mock.return_value = 1161.0
+        assert registry.get(config) is None
+
+        registry.put(config, {'foo': 'bar'}, token_expires_at=1170.0)
+        time_mock.return_value = 1171.0
+        assert registry.get(config) is None
+        assert len(registry) == 0
+
+    def test_storage_token_expiration(self, keboola_client: KeboolaClient, config: Config, mocker):
+        time_mock = mocker.patch('keboola_mcp_server.mcp.time.time', return_value=1000.0)
+        client = keboola_client
+        client.storage_client.verified_token_identity.return_value = None
+        registry = SessionStateRegistry(ttl=600.0)
+        registry.put(config, {KeboolaClient.STATE_KEY: client})
+        assert registry.get(config) is not None
+
+        # the expiration of the token is known once the token is verified
+        client.storage_client.verified_token_identity.return_value = TokenIdentity(
+            project_id='1',
+            project_name='project',
+            organization_id='2',
+            default_backend='snowflake',
+            expires_at=datetime.fromtimestamp(1100.0, tz=timezone.utc),
+        )
+        time_mock.return_value = 1050.0
+        assert registry.get(config) is not None
+        time_mock.return_value = 1101.0
+        assert registry.get(config) is None
+
+        # the expired states are dropped when a new state is stored
+        registry.put(config, {KeboolaClient.STATE_KEY: client}, token_expires_at=1200.0)
+        time_mock.return_value = 1201.0
+        registry.put(Config(**(config.__dict__ | {'storage_token': 'token-5678'})), {})
+        assert len(registry) == 1
+
+    def test_eviction(self, config: Config):
+        registry = SessionStateRegistry(max_entries=2)
+        configs = [Config(**(config.__dict__ | {'storage_token': f'token-{i}'})) for i in range(3)]
+        registry.put(configs[0], {'id': 0})
+        registry.put(configs[1], {'id': 1})
+        registry.get(configs[0])
+        registry.put(configs[2], {'id': 2})
+
+        assert len(registry) == 2
+        assert registry.get(configs[1]) is None
+        assert registry.get(configs[0]) == {'id': 0}
+
+
+@pytest.mark.parametrize(
+    ('value', 'expected'),
+    [
+        (None, []),
+        ('', []),
+        ('table_detail', ['table_detail']),
+        (' table_detail, job_detail ,foo', ['table_detail', 'job_detail']),
+    ],
+)
+def test_parse_hedged_requests(value: str | None, expected: list[str]):
+    assert _parse_hedged_requests(value) == expected
+
+
+class TestWithSessionState:
+
+    @staticmethod
+    @with_session_state()
+    async def _tool(table_id: str, ctx: Context) -> dict[str, Any]:
+        return ctx.session.state
+
+    @pytest.mark.asyncio
+    async def test_context_argument(self, mcp_context_client: Context):
+        state = mcp_context_client.session.state
+        assert await self._tool(table_id='in.c-foo.bar', ctx=mcp_context_client) is state
+        assert await self._tool('in.c-foo.bar', mcp_context_client) is state
+
+        with pytest.raises(TypeError, match='must be of type Context'):
+            await self._tool('in.c-foo.bar', 'not a context')
+
+    @pytest.mark.asyncio
+    async def test_no_context_argument(self):
+        @with_session_state()
+        async def tool(table_id: str) -> str:
+            return table_id
+
+        with pytest.raises(TypeError, match='Context argument is required'):
+            await tool('in.c-foo.bar')
+
+    @pytest.mark.asyncio
+    async def test_session_state_shared(self, mocker, config: Config):
+        server_state = ServerState(config=config)
+        contexts = []
+        for _ in range(2):
+            ctx = mocker.MagicMock(Context)
+            ctx.session = mocker.MagicMock(BaseSession)
+            ctx.session.state = None
+            ctx.request_context.lifespan_context = server_state
+            contexts.append(ctx)
+        mocker.patch('keboola_mcp_server.mcp._get_http_request', return_value=None)
+
+        first = await self._tool('in.c-foo.bar', contexts[0])
+        second = await self._tool('in.c-foo.bar', contexts[1])
+        assert first is not second
+        assert first[KeboolaClient.STATE_KEY] is second[KeboolaClient.STATE_KEY]
+
+
+def test_replace_config(config: Config):
+    headers = (('x-workspace-schema', 'WORKSPACE_2'), ('content-type', 'application/json'))
+    assert _replace_config(config, headers).workspace_schema == 'WORKSPACE_2'
+    # the output directory is only set by the server
+    assert _replace_config(config, (('x-query-output-dir', '/etc'),)).query_output_dir is None
+
+
+def test_get_session_state_prewarm(config: Config, mocker):
+    prewarm = mocker.patch.object(WorkspaceManager, 'prewarm')
+    server_state = ServerState(config=config)
+    state = server_state.get_session_state(config)
+    assert server_state.get_session_state(config)[KeboolaClient.STATE_KEY] is state[KeboolaClient.STATE_KEY]
+    prewarm.assert_not_called()
+
+    prewarm_config = Config(**(config.__dict__ | {'workspace_prewarm': True}))
+    server_state.get_session_state(prewarm_config)
+    server_state.get_session_state(prewarm_config)
+    prewarm.assert_called_once()
+
+
+def test_get_session_state_shared_query_cache(config: Config):
+    server_state = ServerState(config=config)
+    assert server_state.query_cache is not None
+    assert server_state.result_buffer is not None
+
+    # the sessions with different tokens share one memory budget of the query results
+    states = [
+        server_state.get_session_state(Config(**(config.__dict__ | {'storage_token': f'token-{i}'})))
+        for i in range(2)
+    ]
+    managers = [WorkspaceManager.from_state(state) for state in states]
+    assert managers[0] is not managers[1]
+    assert all(m._query_cache is server_state.query_cache for m in managers)
+    assert all(m._result_buffer is server_state.result_buffer for m in managers)
+
+    no_cache_config = Config(**(config.__dict__ | {'query_cache_size': 0, 'query_buffer_size': 0}))
+    no_cache_state = ServerState(config=no_cache_config)
+    assert no_cache_state.query_cache is None
+    assert no_cache_state.result_buffer is None
@@ -1,3 +1,4 @@
+import dataclasses
 from dataclasses import asdict
 from typing import Annotated, Any
 
@@ -5,6 +6,7 @@ import pytest
 from fastmcp import Client, Context
 from mcp.types import TextContent
 from pydantic import Field
+from starlette.testclient import TestClient
 
 from keboola_mcp_server.client import KeboolaClient
 from keboola_mcp_server.config import Config
@@ -44,6 +46,7 @@ class TestServer:
             'get_sql_dialect',
             'get_table_detail',
             'query_table',
+            'query_tables_batch',
             'retrieve_bucket_tables',
             'retrieve_buckets',
             'retrieve_components_configurations',
@@ -201,3 +204,29 @@ async def test_keboola_injection_and_lifespan(
         result = await client.call_tool('assessed_function', {'param': 'value'})
         assert isinstance(result[0], TextContent)
         assert result[0].text == 'value'
+
+
+@pytest.mark.asyncio
+async def test_prewarm_on_list_tools(mocker):
+    config = Config(storage_api_url='https://connection.keboola.com', workspace_prewarm=True)
+    # e.g. the token sent in the HTTP headers of the session
+    session_config = dataclasses.replace(config, storage_token='session-token')
+    mocker.patch('keboola_mcp_server.mcp._get_session_config', return_value=(session_config, None))
+    mocker.patch('keboola_mcp_server.server.os.environ', {})
+    prewarm = mocker.patch.object(WorkspaceManager, 'prewarm')
+
+    async with Client(create_server(config)) as client:
+        prewarm.assert_not_called()
+        await client.list_tools()
+        prewarm.assert_called_once()
+        # the session state is created once per session
+        await client.list_tools()
+        prewarm.assert_called_once()
+
+
+@pytest.mark.parametrize(('metrics_endpoint', 'expected_status'), [(None, 404), (True, 200)])
+def test_metrics_endpoint(metrics_endpoint: bool | None, expected_status: int):
+    server = create_server(Config(metrics_endpoint=metrics_endpoint))
+    # the route is not authenticated, it is only served if enabled by the server configuration
+    response = TestClient(server.http_app()).get('/metrics')
+    assert response.status_code == expected_status
@@ -1,11 +1,15 @@
-from typing import Sequence, Union
+from typing import Any, Sequence, Union
 
+import httpx
 import pytest
+from pytest_mock import MockerFixture
 
+from keboola_mcp_server.client import CircuitOpenError, KeboolaClient
 from keboola_mcp_server.tools.components.model import ComponentType
 from keboola_mcp_server.tools.components.utils import (
     TransformationConfiguration,
     _clean_bucket_name,
+    _get_component,
     _get_transformation_configuration,
     _handle_component_types,
 )
@@ -136,3 +140,35 @@ def test_transformation_configuration_serialization(input_sql_statements_name: s
     # for both sql_statements and script, we expect the same result script for api request
 
     assert returned_params_cfg['parameters']['blocks'][0]['codes'][0]['script'] == ['SELECT * FROM test']
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'ai_service_error',
+    [
+        httpx.HTTPStatusError('Not found', request=httpx.Request('GET', 'https://ai'), response=httpx.Response(404)),
+        CircuitOpenError('The service is failing.'),
+        httpx.ReadTimeout('timeout'),
+    ],
+)
+async def test_get_component_storage_fallback(
+    mocker: MockerFixture, keboola_client: KeboolaClient, mock_component: dict[str, Any], ai_service_error: Exception
+):
+    keboola_client.ai_service_client.get_component_detail = mocker.AsyncMock(side_effect=ai_service_error)
+    keboola_client.storage_client.component_detail = mocker.AsyncMock(return_value=mock_component)
+
+    component = await _get_component(client=keboola_client, component_id='keboola.ex-aws-s3')
+
+    assert component.component_id == 'keboola.ex-aws-s3'
+    keboola_client.storage_client.component_detail.assert_called_once_with(component_id='keboola.ex-aws-s3')
+
+
+@pytest.mark.asyncio
+async def test_get_component_ai_service_error(mocker: MockerFixture, keboola_client: KeboolaClient):
+    error = httpx.HTTPStatusError('Error', request=httpx.Request('GET', 'https://ai'), response=httpx.Response(500))
+    keboola_client.ai_service_client.get_component_detail = mocker.AsyncMock(side_effect=error)
+    keboola_client.storage_client.component_detail = mocker.AsyncMock()
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await _get_component(client=keboola_client, component_id='keboola.ex-aws-s3')
+    keboola_client.storage_client.component_detail.assert_not_called()
@@ -2,7 +2,7 @@ import pytest
 from mcp.server.fastmcp import Context
 from pytest_mock import MockerFixture
 
-from keboola_mcp_server.client import KeboolaClient
+from keboola_mcp_server.client import KeboolaClient, TokenIdentity
 from keboola_mcp_server.config import MetadataField
 from keboola_mcp_server.links import Link
 from keboola_mcp_server.tools.project import ProjectInfo, get_project_info
@@ -24,7 +24,9 @@ async def test_get_project_info(mocker: MockerFixture, mcp_context_client: Conte
         {'key': 'other', 'value': 'ignore'},
     ]
     keboola_client = KeboolaClient.from_state(mcp_context_client.session.state)
-    keboola_client.storage_client.verify_token = mocker.AsyncMock(return_value=token_data)
+    keboola_client.storage_client.token_identity = mocker.AsyncMock(
+        return_value=TokenIdentity.from_token_data(token_data)
+    )
     keboola_client.storage_client.branch_metadata_get = mocker.AsyncMock(return_value=metadata)
     keboola_client.storage_client.base_api_url = 'https://connection.test.keboola.com'
     workspace_manager = WorkspaceManager.from_state(mcp_context_client.session.state)
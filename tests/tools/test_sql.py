@@ -1,18 +1,53 @@
+import asyncio
 import json
+import re
+import weakref
+from collections import OrderedDict
 from typing import Any
 
+import httpx
 import pytest
 from mcp.server.fastmcp import Context
 from pydantic import TypeAdapter
 
-from keboola_mcp_server.client import KeboolaClient
-from keboola_mcp_server.tools.sql import get_sql_dialect, query_table
+from keboola_mcp_server.client import KeboolaClient, TokenIdentity
+from keboola_mcp_server.formats import ParquetFormatter, ResultFileWriter
+from keboola_mcp_server.tools.sql import (
+    MAX_BATCH_CONCURRENCY,
+    NamedQuery,
+    QueryTableResult,
+    get_sql_dialect,
+    query_table,
+    query_tables_batch,
+)
 from keboola_mcp_server.workspace import (
+    QueryPage,
     QueryResult,
+    QueryResultBuffer,
+    QueryResultCache,
     SqlSelectData,
     TableFqn,
     WorkspaceManager,
+    normalize_sql,
+)
+
+
+@pytest.mark.parametrize(
+    ('columns', 'rows', 'expected'),
+    [
+        (['a', 'b'], [{'a': 1, 'b': 'x'}, {'b': 'y', 'a': 2}], [(1, 'x'), (2, 'y')]),
+        (['a'], [{'a': 1}, {'a': None}], [(1,), (None,)]),
+        (['a', 'b'], [{'a': 1}], [(1, None)]),
+        (['a', 'b'], [[1, 'x'], (2, 'y')], [(1, 'x'), (2, 'y')]),
+        ([], [], []),
+    ],
 )
+def test_sql_select_data_rows(columns: list[str], rows: list[Any], expected: list[tuple[Any, ...]]):
+    data = SqlSelectData(columns=columns, rows=rows)
+    assert data.rows == expected
+    assert TypeAdapter(SqlSelectData).validate_python({'columns': columns, 'rows': rows}) == data
+    if columns:
+        assert data.get_column(columns[0]) == [row[0] for row in expected]
 
 
 @pytest.mark.asyncio
@@ -47,11 +82,101 @@ from keboola_mcp_server.workspace import (
 )
 async def test_query_table(query: str, result: QueryResult, expected: str, empty_context: Context, mocker):
     workspace_manager = mocker.AsyncMock(WorkspaceManager)
-    workspace_manager.execute_query.return_value = result
+    workspace_manager.execute_query_page.return_value = QueryPage(result=result)
     empty_context.session.state[WorkspaceManager.STATE_KEY] = workspace_manager
 
     result = await query_table(query, empty_context)
-    assert result == expected
+    assert result == QueryTableResult(data=expected, rows_count=expected.count('\r\n') - 1)
+    # all the rows are retrieved unless the page size is set
+    workspace_manager.execute_query_page.assert_called_once_with(
+        query, page_size=WorkspaceManager.MAX_RESULT_ROWS, cursor=None
+    )
+
+
+@pytest.mark.asyncio
+async def test_query_table_json(empty_context: Context, mocker):
+    workspace_manager = mocker.AsyncMock(WorkspaceManager)
+    workspace_manager.execute_query_page.return_value = QueryPage(
+        result=QueryResult(status='ok', data=SqlSelectData(columns=['a', 'b'], rows=[(1, 'x'), (2, None)]))
+    )
+    empty_context.session.state[WorkspaceManager.STATE_KEY] = workspace_manager
+
+    result = await query_table('select a, b from foo', empty_context, page_size=10, output_format='json')
+    assert result == QueryTableResult(data='{"columns":["a","b"],"rows":[[1,"x"],[2,null]]}', rows_count=2)
+    workspace_manager.execute_query_page.assert_called_once_with('select a, b from foo', page_size=10, cursor=None)
+
+    with pytest.raises(ValueError, match='Unsupported output format: xml'):
+        await query_table('select a, b from foo', empty_context, output_format='xml')
+
+
+@pytest.mark.asyncio
+async def test_query_table_file(tmp_path, empty_context: Context, mocker):
+    workspace_manager = mocker.AsyncMock(WorkspaceManager)
+    workspace_manager.execute_query_page.return_value = QueryPage(
+        result=QueryResult(status='ok', data=SqlSelectData(columns=['a'], rows=[(1,), (2,)])), next_cursor='next'
+    )
+    empty_context.session.state[WorkspaceManager.STATE_KEY] = workspace_manager
+    mocker.patch.object(ParquetFormatter, 'check_available')
+    write = mocker.patch.object(ParquetFormatter, 'write', side_effect=lambda data, path: path.write_bytes(b'PAR1'))
+
+    with pytest.raises(ValueError, match='The output directory for the query results is not configured'):
+        await query_table('select a from foo', empty_context, output_format='parquet')
+    workspace_manager.execute_query_page.assert_not_called()
+
+    empty_context.session.state[ResultFileWriter.STATE_KEY] = ResultFileWriter(tmp_path / 'out')
+    result = await query_table('select a from foo', empty_context, output_format='parquet')
+    assert result.data is None
+    assert result.rows_count == 2
+    assert result.next_cursor == 'next'
+    path = tmp_path / 'out' / result.file_path.rsplit('/', 1)[-1]
+    assert result.file_path == str(path)
+    assert result.file_uri == path.as_uri()
+    assert path.read_bytes() == b'PAR1'
+    write.assert_called_once()
+    # all the selected rows are written to the file
+    workspace_manager.execute_query_page.assert_called_once_with(
+        'select a from foo', page_size=WorkspaceManager.MAX_RESULT_ROWS, cursor=None
+    )
+
+
+@pytest.mark.asyncio
+async def test_query_tables_batch(empty_context: Context, mocker):
+    running = max_running = 0
+
+    async def _execute_query_page(sql_query: str, page_size: int) -> QueryPage:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if sql_query == 'select fail':
+            return QueryPage(result=QueryResult(status='error', message='syntax error'))
+        if sql_query == 'select raise':
+            raise httpx.HTTPError('connection failed')
+        return QueryPage(result=QueryResult(status='ok', data=SqlSelectData(columns=['q'], rows=[(sql_query,)])))
+
+    workspace_manager = mocker.AsyncMock(WorkspaceManager)
+    workspace_manager.execute_query_page.side_effect = _execute_query_page
+    empty_context.session.state[WorkspaceManager.STATE_KEY] = workspace_manager
+
+    queries = [NamedQuery(name=f'q{i}', sql_query=f'select {i}') for i in range(2 * MAX_BATCH_CONCURRENCY)]
+    queries[1] = NamedQuery(name='failed', sql_query='select fail')
+    queries[2] = NamedQuery(name='raised', sql_query='select raise')
+    result = await query_tables_batch(queries, empty_context)
+
+    assert [r.name for r in result.results] == [q.name for q in queries]
+    assert result.results[0].result == QueryTableResult(data='q\r\nselect 0\r\n', rows_count=1)
+    assert result.results[0].error is None
+    assert result.results[1].result is None
+    assert result.results[1].error == 'Failed to run SQL query, error: syntax error'
+    assert result.results[2].error == 'connection failed'
+    assert max_running == MAX_BATCH_CONCURRENCY
+    sequential = sum(r.duration_sec for r in result.results)
+    assert result.elapsed_sec < sequential
+    assert result.saved_sec == pytest.approx(sequential - result.elapsed_sec)
+
+    with pytest.raises(ValueError, match='duplicate names: q0'):
+        await query_tables_batch([queries[0], queries[0]], empty_context)
 
 
 @pytest.mark.asyncio
@@ -81,6 +206,10 @@ class TestWorkspaceManagerSnowflake:
             }
         ]
 
+        keboola_client.storage_client.token_identity.return_value = TokenIdentity(
+            project_id='1234', project_name='Project', organization_id='1', default_backend='snowflake', expires_at=None
+        )
+
         empty_context.session.state[KeboolaClient.STATE_KEY] = keboola_client
         empty_context.session.state[WorkspaceManager.STATE_KEY] = WorkspaceManager(
             client=keboola_client, workspace_schema='workspace_1234'
@@ -89,14 +218,17 @@ class TestWorkspaceManagerSnowflake:
         return empty_context
 
     @pytest.mark.asyncio
-    async def test_get_sql_dialect(self, context: Context):
+    @pytest.mark.parametrize('default_backend', ['snowflake', None])
+    async def test_get_sql_dialect(self, default_backend: str | None, keboola_client: KeboolaClient, context: Context):
+        keboola_client.storage_client.token_identity.return_value = TokenIdentity(
+            project_id='1234', project_name='Project', organization_id='1', default_backend=default_backend,
+            expires_at=None
+        )
         m = WorkspaceManager.from_state(context.session.state)
         assert await m.get_sql_dialect() == 'Snowflake'
-
-    @pytest.mark.asyncio
-    async def test_get_quoted_name(self, context: Context):
-        m = WorkspaceManager.from_state(context.session.state)
         assert await m.get_quoted_name('foo') == '"foo"'
+        # the workspace is only looked up if the project backend is not known
+        assert keboola_client.storage_client.workspace_list.called == (default_backend is None)
 
     @pytest.mark.asyncio
     @pytest.mark.parametrize(
@@ -143,6 +275,45 @@ class TestWorkspaceManagerSnowflake:
         fqn = await m.get_table_fqn(table)
         assert fqn == expected
 
+    @pytest.mark.asyncio
+    async def test_get_table_fqns(self, keboola_client: KeboolaClient, context: Context):
+        async def workspace_query(workspace_id: int, query: str, **kwargs):
+            if 'CURRENT_DATABASE' in query:
+                return {'status': 'ok', 'data': {'columns': ['current_database'], 'rows': [{'current_database': 'db'}]}}
+            return {
+                'status': 'ok',
+                'data': {
+                    'columns': ['DATABASE_NAME'],
+                    'rows': [{'DATABASE_NAME': 'sapi_11'}, {'DATABASE_NAME': 'sapi_111'}],
+                },
+            }
+
+        keboola_client.storage_client.workspace_query.side_effect = workspace_query
+        tables = [{'id': f'in.c-foo.local_{i}', 'name': f'local_{i}'} for i in range(100)] + [
+            {
+                'id': f'in.c-foo.linked_{i}',
+                'name': f'linked_{i}',
+                'sourceTable': {'project': {'id': '11' if i % 2 else '111'}, 'id': f'out.c-bar.table_{i}'},
+            }
+            for i in range(100)
+        ] + [{'id': 'in.c-foo.unknown', 'name': 'unknown', 'sourceTable': {'project': {'id': '5'}, 'id': 'out.c-x.y'}}]
+
+        m = WorkspaceManager.from_state(context.session.state)
+        fqns = await m.get_table_fqns(tables)
+        assert keboola_client.storage_client.workspace_query.call_count == 2
+        assert fqns[0] == TableFqn('db', 'in.c-foo', 'local_0', quote_char='"')
+        assert fqns[100] == TableFqn('sapi_111', 'out.c-bar', 'table_0', quote_char='"')
+        assert fqns[101] == TableFqn('sapi_11', 'out.c-bar', 'table_1', quote_char='"')
+        assert fqns[200] is None
+        assert sum(fqn is not None for fqn in fqns) == 200
+
+        # the resolved names and the databases are cached
+        assert await m.get_table_fqn({'id': 'in.c-foo.local_0', 'name': 'local_0'}) == fqns[0]
+        assert await m.get_table_fqn({'id': 'in.c-foo.other', 'name': 'other'}) == TableFqn(
+            'db', 'in.c-foo', 'other', quote_char='"'
+        )
+        assert keboola_client.storage_client.workspace_query.call_count == 2
+
     @pytest.mark.asyncio
     @pytest.mark.parametrize(
         ('query', 'expected'),
@@ -194,6 +365,10 @@ class TestWorkspaceManagerBigQuery:
             }
         ]
 
+        keboola_client.storage_client.token_identity.return_value = TokenIdentity(
+            project_id='1234', project_name='Project', organization_id='1', default_backend='bigquery', expires_at=None
+        )
+
         empty_context.session.state[KeboolaClient.STATE_KEY] = keboola_client
         empty_context.session.state[WorkspaceManager.STATE_KEY] = WorkspaceManager(
             client=keboola_client, workspace_schema='workspace_1234'
@@ -202,14 +377,17 @@ class TestWorkspaceManagerBigQuery:
         return empty_context
 
     @pytest.mark.asyncio
-    async def test_get_sql_dialect(self, context: Context):
+    @pytest.mark.parametrize('default_backend', ['bigquery', None])
+    async def test_get_sql_dialect(self, default_backend: str | None, keboola_client: KeboolaClient, context: Context):
+        keboola_client.storage_client.token_identity.return_value = TokenIdentity(
+            project_id='1234', project_name='Project', organization_id='1', default_backend=default_backend,
+            expires_at=None
+        )
         m = WorkspaceManager.from_state(context.session.state)
         assert await m.get_sql_dialect() == 'BigQuery'
-
-    @pytest.mark.asyncio
-    async def test_get_quoted_name(self, context: Context):
-        m = WorkspaceManager.from_state(context.session.state)
         assert await m.get_quoted_name('foo') == '`foo`'
+        # the workspace is only looked up if the project backend is not known
+        assert keboola_client.storage_client.workspace_list.called == (default_backend is None)
 
     @pytest.mark.asyncio
     @pytest.mark.parametrize(
@@ -271,3 +449,503 @@ class TestWorkspaceManagerBigQuery:
         m = WorkspaceManager.from_state(context.session.state)
         result = await m.execute_query(query)
         assert result == expected
+
+
+class TestWorkspaceManagerPrewarm:
+
+    @pytest.fixture
+    def keboola_client(self, keboola_client: KeboolaClient) -> KeboolaClient:
+        async def workspace_list():
+            await asyncio.sleep(0.01)
+            return [
+                {
+                    'id': 1234,
+                    'connection': {'schema': 'workspace_1234', 'backend': 'snowflake', 'user': 'user_1234'},
+                    'readOnlyStorageAccess': True,
+                }
+            ]
+
+        keboola_client.storage_client.workspace_list.side_effect = workspace_list
+        keboola_client.storage_client.workspace_query.return_value = {
+            'status': 'ok',
+            'data': {'columns': ['a'], 'rows': [{'a': 1}]},
+        }
+        return keboola_client
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookup(self, keboola_client: KeboolaClient):
+        m = WorkspaceManager(client=keboola_client, workspace_schema='workspace_1234')
+        results = await asyncio.gather(*(m.execute_query('select 1') for _ in range(5)))
+        assert all(result.is_ok for result in results)
+        keboola_client.storage_client.workspace_list.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_prewarm(self, keboola_client: KeboolaClient):
+        m = WorkspaceManager(client=keboola_client, workspace_schema='workspace_1234')
+        m.prewarm()
+        m.prewarm()
+        await asyncio.sleep(0.02)
+        keboola_client.storage_client.workspace_list.assert_called_once()
+
+        assert (await m.execute_query('select 1')).is_ok
+        keboola_client.storage_client.workspace_list.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_prewarm_failed(self, keboola_client: KeboolaClient, caplog):
+        m = WorkspaceManager(client=keboola_client, workspace_schema='workspace_5678')
+        m.prewarm()
+        await asyncio.sleep(0.02)
+        assert 'Failed to prewarm the workspace' in caplog.text
+
+        # the workspace is looked up again
+        with pytest.raises(ValueError, match='No Keboola workspace found'):
+            await m.execute_query('select 1')
+        assert keboola_client.storage_client.workspace_list.call_count == 2
+
+
+class TestWorkspaceManagerCreate:
+
+    @pytest.fixture
+    def keboola_client(self, keboola_client: KeboolaClient, mocker) -> KeboolaClient:
+        mocker.patch.object(WorkspaceManager, '_CREATE_LOCKS', weakref.WeakKeyDictionary())
+        branch_metadata: list[dict[str, Any]] = []
+
+        async def branch_metadata_get(use_cache: bool = True):
+            return list(branch_metadata)
+
+        async def branch_metadata_update(metadata: dict[str, Any]):
+            branch_metadata.extend({'key': k, 'value': v} for k, v in metadata.items())
+            return branch_metadata
+
+        async def workspace_create(**kwargs):
+            await asyncio.sleep(0.01)
+            return {'id': 1}
+
+        keboola_client.storage_client.base_api_url = 'https://connection.keboola.com/v2/storage'
+        keboola_client.storage_client.project_id.return_value = '1'
+        keboola_client.storage_client.branch_metadata_get.side_effect = branch_metadata_get
+        keboola_client.storage_client.branch_metadata_update.side_effect = branch_metadata_update
+        keboola_client.storage_client.workspace_create.side_effect = workspace_create
+        keboola_client.storage_client.job_detail.return_value = {'status': 'success', 'results': {'id': 1234}}
+        keboola_client.storage_client.workspace_detail.side_effect = lambda workspace_id: {
+            'id': workspace_id,
+            'connection': {'schema': f'workspace_{workspace_id}', 'backend': 'snowflake', 'user': 'user'},
+            'readOnlyStorageAccess': True,
+        }
+        keboola_client.storage_client.workspace_query.return_value = {
+            'status': 'ok',
+            'data': {'columns': ['a'], 'rows': [{'a': 1}]},
+        }
+        return keboola_client
+
+    @pytest.mark.asyncio
+    async def test_concurrent_create(self, keboola_client: KeboolaClient):
+        managers = [WorkspaceManager(client=keboola_client) for _ in range(3)]
+        results = await asyncio.gather(*(m.execute_query('select 1') for m in managers for _ in range(3)))
+        assert all(result.is_ok for result in results)
+
+        keboola_client.storage_client.workspace_create.assert_called_once()
+        keboola_client.storage_client.branch_metadata_update.assert_called_once_with(
+            {WorkspaceManager.MCP_META_KEY: 1234}
+        )
+
+    @pytest.mark.asyncio
+    async def test_create_by_other_replica(self, keboola_client: KeboolaClient):
+        async def branch_metadata_get(use_cache: bool = True):
+            if keboola_client.storage_client.workspace_create.called:
+                # another server replica has noted its workspace while this one was creating its own
+                return [{'key': WorkspaceManager.MCP_META_KEY, 'value': 5678}]
+            return []
+
+        keboola_client.storage_client.branch_metadata_get.side_effect = branch_metadata_get
+
+        m = WorkspaceManager(client=keboola_client)
+        assert (await m.execute_query('select 1')).is_ok
+        keboola_client.storage_client.workspace_create.assert_called_once()
+        keboola_client.storage_client.branch_metadata_update.assert_not_called()
+        keboola_client.storage_client.workspace_query.assert_called_once_with(
+            workspace_id=5678,
+            query='select 1',
+            max_rows=WorkspaceManager.MAX_RESULT_ROWS,
+            max_bytes=WorkspaceManager.MAX_RESULT_BYTES,
+        )
+        # the workspace that lost the race is not left in the project
+        keboola_client.storage_client.workspace_delete.assert_called_once_with(1234)
+
+    @pytest.mark.asyncio
+    async def test_create_locks_per_loop(self, keboola_client: KeboolaClient):
+        m = WorkspaceManager(client=keboola_client)
+        lock = await m._get_create_lock()
+        assert await m._get_create_lock() is lock
+        assert WorkspaceManager._CREATE_LOCKS[asyncio.get_running_loop()] == {
+            ('https://connection.keboola.com/v2/storage', '1', 'default'): lock
+        }
+
+    @pytest.mark.asyncio
+    async def test_create_polling(self, keboola_client: KeboolaClient, mocker):
+        keboola_client.storage_client.job_detail.side_effect = [
+            {'status': 'waiting'},
+            {'status': 'processing'},
+            {'status': 'processing'},
+            {'status': 'processing'},
+            {'status': 'success', 'results': {'id': 1234}},
+        ]
+        keboola_client.storage_client.workspace_create.side_effect = None
+        keboola_client.storage_client.workspace_create.return_value = {'id': 1}
+        sleep = mocker.patch('keboola_mcp_server.workspace.asyncio.sleep')
+
+        m = WorkspaceManager(client=keboola_client)
+        info = await m._create_ws(max_poll_interval_sec=0.6)
+        assert info is not None
+        assert info.id == 1234
+        assert [c.args[0] for c in sleep.call_args_list] == pytest.approx([0.25, 0.375, 0.5625, 0.6])
+
+
+class TestWorkspaceManagerSchemaIndex:
+
+    @pytest.fixture
+    def keboola_client(self, keboola_client: KeboolaClient, mocker) -> KeboolaClient:
+        mocker.patch.object(WorkspaceManager, '_SCHEMA_INDEX', OrderedDict())
+        workspaces = {
+            workspace_id: {
+                'id': workspace_id,
+                'connection': {'schema': f'workspace_{workspace_id}', 'backend': 'snowflake', 'user': 'user'},
+                'readOnlyStorageAccess': True,
+            }
+            for workspace_id in range(1, 101)
+        }
+
+        async def workspace_detail(workspace_id: int):
+            if workspace_id not in workspaces:
+                raise httpx.HTTPStatusError(
+                    'Not found', request=httpx.Request('GET', 'foo'), response=httpx.Response(404)
+                )
+            return workspaces[workspace_id]
+
+        keboola_client.storage_client.base_api_url = 'https://connection.keboola.com/v2/storage'
+        keboola_client.storage_client.project_id.return_value = '1'
+        keboola_client.storage_client.workspace_list.side_effect = lambda: list(workspaces.values())
+        keboola_client.storage_client.workspace_detail.side_effect = workspace_detail
+        keboola_client.storage_client.workspaces = workspaces
+        return keboola_client
+
+    @pytest.mark.asyncio
+    async def test_indexed_lookup(self, keboola_client: KeboolaClient):
+        info = await WorkspaceManager(client=keboola_client)._find_ws_by_schema('workspace_12')
+        assert info.id == 12
+        keboola_client.storage_client.workspace_list.assert_called_once()
+        keboola_client.storage_client.workspace_detail.assert_not_called()
+
+        # the other sessions verify the indexed workspaces without listing all the workspaces
+        for workspace_id in (12, 34):
+            info = await WorkspaceManager(client=keboola_client)._find_ws_by_schema(f'workspace_{workspace_id}')
+            assert info.id == workspace_id
+            keboola_client.storage_client.workspace_detail.assert_called_with(workspace_id)
+        keboola_client.storage_client.workspace_list.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_indexed_workspace_deleted(self, keboola_client: KeboolaClient):
+        assert await WorkspaceManager(client=keboola_client)._find_ws_by_schema('workspace_12')
+
+        del keboola_client.storage_client.workspaces[12]
+        assert await WorkspaceManager(client=keboola_client)._find_ws_by_schema('workspace_12') is None
+        assert keboola_client.storage_client.workspace_list.call_count == 2
+        assert ('https://connection.keboola.com/v2/storage', '1', 'workspace_12') not in WorkspaceManager._SCHEMA_INDEX
+
+    @pytest.mark.asyncio
+    async def test_index_expired(self, keboola_client: KeboolaClient, mocker):
+        assert await WorkspaceManager(client=keboola_client)._find_ws_by_schema('workspace_12')
+
+        mocker.patch.object(WorkspaceManager, '_SCHEMA_INDEX_TTL', 0.0)
+        assert await WorkspaceManager(client=keboola_client)._find_ws_by_schema('workspace_12')
+        assert keboola_client.storage_client.workspace_list.call_count == 2
+        keboola_client.storage_client.workspace_detail.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ('sql_query', 'expected'),
+    [
+        ('select 1;', 'select 1'),
+        ('  select *\n  from "in.c-foo"."bar"  -- all rows\n  limit 10 ; ', 'select * from "in.c-foo"."bar" limit 10'),
+        ('select /* the count */ count(*)\tfrom "a  b"', 'select count(*) from "a  b"'),
+        ("select 'a  -- b', `x  y` from t", "select 'a  -- b', `x  y` from t"),
+        ("select 'it''s  /* here */'", "select 'it''s  /* here */'"),
+    ],
+)
+def test_normalize_sql(sql_query: str, expected: str):
+    assert normalize_sql(sql_query) == expected
+
+
+class TestQueryResultCache:
+
+    @pytest.fixture
+    def keboola_client(self, keboola_client: KeboolaClient) -> KeboolaClient:
+        keboola_client.storage_client.base_api_url = 'https://connection.keboola.com/v2/storage'
+        keboola_client.storage_client.workspace_list.return_value = [
+            {
+                'id': 1234,
+                'connection': {'schema': 'workspace_1234', 'backend': 'snowflake', 'user': 'user_1234'},
+                'readOnlyStorageAccess': True,
+            }
+        ]
+        keboola_client.storage_client.workspace_query.return_value = {
+            'status': 'ok',
+            'data': {'columns': ['cnt'], 'rows': [{'cnt': 10}]},
+        }
+        keboola_client.storage_client.table_detail.return_value = {
+            'id': 'in.c-foo.bar',
+            'lastImportDate': '2025-01-01T00:00:00+0100',
+            'lastChangeDate': '2025-01-01T00:00:00+0100',
+        }
+        return keboola_client
+
+    @pytest.fixture
+    def query_cache(self) -> QueryResultCache:
+        return QueryResultCache(check_interval=60)
+
+    @pytest.fixture
+    def manager(self, keboola_client: KeboolaClient, query_cache: QueryResultCache) -> WorkspaceManager:
+        return WorkspaceManager(client=keboola_client, workspace_schema='workspace_1234', query_cache=query_cache)
+
+    @pytest.mark.asyncio
+    async def test_cached(self, keboola_client: KeboolaClient, manager: WorkspaceManager):
+        result = await manager.execute_query('select count(*) from "SAPI_1"."in.c-foo"."bar";')
+        assert result.is_ok
+        cached = await manager.execute_query('select count(*) -- count\n  from "SAPI_1"."in.c-foo"."bar"')
+        assert cached == result
+        keboola_client.storage_client.workspace_query.assert_called_once()
+        keboola_client.storage_client.table_detail.assert_called_once_with('in.c-foo.bar', use_cache=False)
+
+        await manager.execute_query('select count(*) from "SAPI_1"."in.c-foo"."bar"', use_cache=False)
+        assert keboola_client.storage_client.workspace_query.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_other_token(self, keboola_client: KeboolaClient, manager: WorkspaceManager):
+        sql = 'select count(*) from "SAPI_1"."in.c-foo"."bar"'
+        keboola_client.storage_client.token_hash = 'token-1'
+        await manager.execute_query(sql)
+        # the cache is shared by the sessions, the results selected with another token are not used
+        keboola_client.storage_client.token_hash = 'token-2'
+        await manager.execute_query(sql)
+        assert keboola_client.storage_client.workspace_query.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_table_changed(
+        self, keboola_client: KeboolaClient, manager: WorkspaceManager, query_cache: QueryResultCache, mocker
+    ):
+        mocker.patch.object(query_cache, '_check_interval', 0.0)
+        sql = 'select * from "SAPI_1"."in.c-foo"."bar" "b" where "b"."id" > 10'
+        await manager.execute_query(sql)
+        await manager.execute_query(sql)
+        keboola_client.storage_client.workspace_query.assert_called_once()
+        assert keboola_client.storage_client.table_detail.call_count == 2
+
+        keboola_client.storage_client.table_detail.return_value = {
+            'id': 'in.c-foo.bar',
+            'lastImportDate': '2025-02-01T00:00:00+0100',
+            'lastChangeDate': '2025-02-01T00:00:00+0100',
+        }
+        await manager.execute_query(sql)
+        assert keboola_client.storage_client.workspace_query.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_table_by_resolved_fqn(self, keboola_client: KeboolaClient, manager: WorkspaceManager, mocker):
+        mocker.patch.object(manager, '_table_fqn_cache', {})
+        manager._cache_table_fqn('in.c-foo.bar', TableFqn('proj', 'in_c_foo', 'bar', quote_char='`'))
+        for _ in range(2):
+            await manager.execute_query('select * from `proj`.`in_c_foo`.`bar` limit 10')
+        keboola_client.storage_client.workspace_query.assert_called_once()
+        keboola_client.storage_client.table_detail.assert_called_once_with('in.c-foo.bar', use_cache=False)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        'sql',
+        [
+            'select count(*) from foo',
+            'select count(*) from "SAPI_1"."workspace_1234"."foo"',
+            'select current_timestamp(), count(*) from "SAPI_1"."in.c-foo"."bar"',
+            'create table "foo" as select * from "SAPI_1"."in.c-foo"."bar"',
+            'select * from "SAPI_1"."in.c-foo"."bar" sample (10 rows)',
+            'select * from "SAPI_1"."in.c-foo"."bar" join tmp_table using (id)',
+        ],
+    )
+    async def test_not_cached(self, sql: str, keboola_client: KeboolaClient, manager: WorkspaceManager):
+        await manager.execute_query(sql)
+        await manager.execute_query(sql)
+        assert keboola_client.storage_client.workspace_query.call_count == 2
+        keboola_client.storage_client.table_detail.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ('sql', 'expected'),
+        [
+            ('select * from "in.c-foo"."bar"', {'in.c-foo.bar'}),
+            ('select * from "KBC"."in.c-foo"."bar" b where b."id" = \'from x\'', {'in.c-foo.bar'}),
+            ('select * from "in.c-foo"."bar" a, "in.c-foo"."baz" as b', {'in.c-foo.bar', 'in.c-foo.baz'}),
+            ('select * from (select "id" from "in.c-foo"."bar") t', {'in.c-foo.bar'}),
+            ('with t as (select * from "in.c-foo"."bar") select * from t join "T" using ("id")', None),
+            ('with t as (select * from "in.c-foo"."bar") select * from T', {'in.c-foo.bar'}),
+            ('select * from "in.c-foo"."bar" join "in.c-foo"."baz" using ("id")', {'in.c-foo.bar', 'in.c-foo.baz'}),
+            ('select * from "in.c-foo"."bar" SAMPLE (10 ROWS)', None),
+            ('select * from "in.c-foo"."bar" TABLESAMPLE BERNOULLI (10)', None),
+            ('select uniform(1, 10, random()) from "in.c-foo"."bar"', None),
+            ('select current_datetime() from "in.c-foo"."bar"', None),
+            ('select current_user, * from "in.c-foo"."bar"', None),
+            ('select * from "in.c-foo"."bar" join tmp_table using ("id")', None),
+            ('select * from "in.c-foo"."bar" a, tmp_table b', None),
+            ('select * from "in.c-foo"."bar" join "tmp_table" using ("id")', None),
+            ('select * from "in.c-foo"."bar" join "WORKSPACE"."tmp" using ("id")', None),
+            ('select * from "in.c-foo"."bar", table(flatten(input => "x"))', None),
+            ('select * from public.tmp join "in.c-foo"."bar" using ("id")', None),
+        ],
+    )
+    def test_get_read_tables(self, sql: str, expected: set[str] | None, manager: WorkspaceManager):
+        assert manager._get_read_tables(normalize_sql(sql)) == expected
+
+    @pytest.mark.asyncio
+    async def test_table_not_found(self, keboola_client: KeboolaClient, manager: WorkspaceManager):
+        keboola_client.storage_client.table_detail.side_effect = httpx.HTTPStatusError(
+            'Not found', request=httpx.Request('GET', 'foo'), response=httpx.Response(404)
+        )
+        sql = 'select * from "in.c-foo"."bar"'
+        await manager.execute_query(sql)
+        await manager.execute_query(sql)
+        assert keboola_client.storage_client.workspace_query.call_count == 2
+
+    def test_max_bytes(self):
+        def result(n: int) -> QueryResult:
+            return QueryResult(status='ok', data=SqlSelectData(columns=['a'], rows=[{'a': 'x' * 100}] * n))
+
+        cache = QueryResultCache(max_bytes=1500)
+        for i in range(4):
+            cache.put(i, result(3), {})
+        assert cache.total_bytes == 4 * len(json.dumps([['x' * 100]] * 3, separators=(',', ':')))
+        assert cache.get(0) is not None
+
+        cache.put(4, result(3), {})
+        assert cache.total_bytes <= 1500
+        assert cache.get(0) is not None  # recently used
+        assert cache.get(1) is None
+
+        # a result larger than a quarter of the cache is not cached
+        cache.put(5, result(10), {})
+        assert cache.get(5) is None
+
+
+class TestWorkspaceManagerPaging:
+
+    @pytest.fixture
+    def keboola_client(self, keboola_client: KeboolaClient) -> KeboolaClient:
+        keboola_client.storage_client.workspace_list.return_value = [
+            {
+                'id': 1234,
+                'connection': {'schema': 'workspace_1234', 'backend': 'snowflake', 'user': 'user_1234'},
+                'readOnlyStorageAccess': True,
+            }
+        ]
+
+        async def workspace_query(workspace_id: int, query: str, max_rows: int | None = None, **kwargs):
+            rows = [{'id': i} for i in range(25)]
+            if match := re.fullmatch(r'select \* from \(.+\) limit (\d+) offset (\d+)', query):
+                limit, offset = int(match.group(1)), int(match.group(2))
+                rows = rows[offset:offset + limit]
+            # the client drops the rows beyond the limit
+            truncated = max_rows is not None and len(rows) > max_rows
+            return {'status': 'ok', 'data': {'columns': ['id'], 'rows': rows[:max_rows], 'truncated': truncated}}
+
+        keboola_client.storage_client.workspace_query.side_effect = workspace_query
+        return keboola_client
+
+    @staticmethod
+    async def _read_pages(manager: WorkspaceManager, sql: str, page_size: int) -> list[QueryPage]:
+        pages = [await manager.execute_query_page(sql, page_size=page_size)]
+        while pages[-1].next_cursor:
+            pages.append(await manager.execute_query_page(sql, page_size=page_size, cursor=pages[-1].next_cursor))
+        return pages
+
+    @pytest.mark.asyncio
+    async def test_buffered_pages(self, keboola_client: KeboolaClient):
+        m = WorkspaceManager(
+            client=keboola_client, workspace_schema='workspace_1234', result_buffer=QueryResultBuffer()
+        )
+        pages = await self._read_pages(m, 'select "id" from "foo"', page_size=10)
+        assert [[row[0] for row in page.result.data.rows] for page in pages] == [
+            list(range(0, 10)),
+            list(range(10, 20)),
+            list(range(20, 25)),
+        ]
+        assert not any(page.truncated for page in pages)
+        keboola_client.storage_client.workspace_query.assert_called_once()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('result_buffer', [None, QueryResultBuffer(ttl=0.0), QueryResultBuffer(max_bytes=10)])
+    async def test_selected_pages(self, result_buffer: QueryResultBuffer | None, keboola_client: KeboolaClient):
+        m = WorkspaceManager(client=keboola_client, workspace_schema='workspace_1234', result_buffer=result_buffer)
+        pages = await self._read_pages(m, 'select "id" from "foo" -- all ids\norder by "id"', page_size=10)
+        assert [[row[0] for row in page.result.data.rows] for page in pages] == [
+            list(range(0, 10)),
+            list(range(10, 20)),
+            list(range(20, 25)),
+        ]
+        assert [c.kwargs['query'] for c in keboola_client.storage_client.workspace_query.call_args_list] == [
+            'select "id" from "foo" -- all ids\norder by "id"',
+            'select * from (select "id" from "foo" order by "id") limit 11 offset 10',
+            'select * from (select "id" from "foo" order by "id") limit 11 offset 20',
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        'sql',
+        [
+            'select "id" from "foo"',
+            'select "id", row_number() over (order by "id") from "foo"',
+            'select "id" from (select "id" from "foo" order by "id")',
+            'select "id" from "foo" where "name" = \'order by\'',
+        ],
+    )
+    async def test_selected_pages_unordered(self, sql: str, keboola_client: KeboolaClient):
+        m = WorkspaceManager(client=keboola_client, workspace_schema='workspace_1234')
+        page = await m.execute_query_page(sql, page_size=10)
+        # the rows of the query re-run for the next page could come in another order
+        with pytest.raises(ValueError, match='does not order its rows'):
+            await m.execute_query_page(sql, page_size=10, cursor=page.next_cursor)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('result_buffer', [None, QueryResultBuffer()])
+    async def test_truncated(self, result_buffer: QueryResultBuffer | None, keboola_client: KeboolaClient, mocker):
+        mocker.patch.object(WorkspaceManager, 'MAX_RESULT_ROWS', 15)
+        m = WorkspaceManager(client=keboola_client, workspace_schema='workspace_1234', result_buffer=result_buffer)
+        pages = await self._read_pages(m, 'select "id" from "foo" order by "id"', page_size=10)
+        assert [len(page.result.data.rows) for page in pages] == [10, 5]
+        assert pages[-1].truncated
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, keboola_client: KeboolaClient):
+        m = WorkspaceManager(
+            client=keboola_client, workspace_schema='workspace_1234', result_buffer=QueryResultBuffer()
+        )
+        page = await m.execute_query_page('select "id" from "foo"', page_size=10)
+
+        with pytest.raises(ValueError, match='different SQL query'):
+            await m.execute_query_page('select "id" from "bar"', page_size=10, cursor=page.next_cursor)
+        with pytest.raises(ValueError, match='Invalid cursor'):
+            await m.execute_query_page('select "id" from "foo"', page_size=10, cursor='foo')
+
+    def test_buffer_owner(self):
+        data = SqlSelectData(columns=['a'], rows=[(1,)])
+        buffer = QueryResultBuffer()
+        buffer_id = buffer.put(data, 10, owner='token-1')
+        assert buffer.get(buffer_id, owner='token-2') is None
+        assert buffer.get(buffer_id) is None
+        assert buffer.get(buffer_id, owner='token-1') == data
+
+    def test_buffer_max_bytes(self):
+        data = SqlSelectData(columns=['a'], rows=[(1,)])
+        buffer = QueryResultBuffer(max_bytes=100)
+        first_id = buffer.put(data, 60)
+        assert buffer.get(first_id) == data
+        assert buffer.put(data, 101) is None
+
+        second_id = buffer.put(data, 60)
+        assert buffer.get(first_id) is None
+        assert buffer.get(second_id) == data
+        assert buffer.total_bytes == 60
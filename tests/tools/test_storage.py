@@ -291,6 +291,57 @@ async def test_retrieve_bucket_tables_in_project(
     keboola_client.storage_client.bucket_table_list.assert_called_once_with('bucket-id', include=['metadata'])
 
 
+@pytest.mark.asyncio
+async def test_retrieve_bucket_tables_with_details(mocker: MockerFixture, mcp_context_client: Context) -> None:
+    """Test retrieve_bucket_tables tool with the table details."""
+    sapi_response = [
+        {
+            'id': 'in.c-bucket.foo',
+            'name': 'foo',
+            'displayName': 'foo',
+            'columns': ['id', 'name'],
+            'metadata': [{'key': 'KBC.description', 'value': 'Nice Foo'}],
+            'columnMetadata': {'name': [{'key': 'KBC.description', 'value': 'Name of foo'}]},
+        },
+        {'id': 'in.c-bucket.bar', 'name': 'bar', 'displayName': 'bar', 'columns': ['id'], 'columnMetadata': []},
+    ]
+    keboola_client = KeboolaClient.from_state(mcp_context_client.session.state)
+    keboola_client.storage_client.bucket_table_list = mocker.AsyncMock(return_value=sapi_response)
+
+    workspace_manager = WorkspaceManager.from_state(mcp_context_client.session.state)
+    workspace_manager.get_table_fqns.return_value = [
+        TableFqn('SAPI_TEST', 'in.c-bucket', 'foo', quote_char='#'),
+        None,
+    ]
+    workspace_manager.get_quoted_name.side_effect = lambda name: f'#{name}#'
+
+    result = await retrieve_bucket_tables('bucket-id', mcp_context_client, include_details=True)
+    assert result == [
+        TableDetail(
+            id='in.c-bucket.foo',
+            name='foo',
+            display_name='foo',
+            description='Nice Foo',
+            columns=[
+                TableColumnInfo(name='id', quoted_name='#id#'),
+                TableColumnInfo(name='name', quoted_name='#name#', description='Name of foo'),
+            ],
+            fully_qualified_name='#SAPI_TEST#.#in.c-bucket#.#foo#',
+        ),
+        TableDetail(
+            id='in.c-bucket.bar',
+            name='bar',
+            display_name='bar',
+            columns=[TableColumnInfo(name='id', quoted_name='#id#')],
+        ),
+    ]
+    keboola_client.storage_client.bucket_table_list.assert_called_once_with(
+        'bucket-id', include=['columns', 'metadata', 'columnMetadata']
+    )
+    workspace_manager.get_table_fqns.assert_called_once_with(sapi_response)
+    keboola_client.storage_client.table_detail.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_update_bucket_description_success(
     mocker: MockerFixture, mcp_context_client, mock_update_bucket_description_response